@@ -1,13 +1,95 @@
 import os
-import requests
 import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 
+from circuit import CircuitCall, circuit_allows
+from storage import atomic_open
 
-def get_ai_comment(prompt: str):
+AI_CACHE_FILE = "ai_cache.json"
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", "86400"))
+AI_NEGATIVE_TTL = int(os.getenv("AI_NEGATIVE_TTL", "900"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "512"))
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "15"))
+AI_CIRCUIT = "openrouter"
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1").rstrip("/")
+UNCACHED_STATUSES = ("no_key", "circuit_open")
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "20"))
+AI_BATCH_WINDOW = float(os.getenv("AI_BATCH_WINDOW", "0.2"))
+AI_BATCH_TOKENS_PER_ITEM = 80
+AI_ADVICE_MAX_CHARS = 400
+SYSTEM_PROMPT = "Ты бот-агроном. Дай одну короткую полезную фразу по уходу за комнатными растениями сегодня."
+BATCH_SYSTEM_PROMPT = (
+    "Ты бот-агроном. Для каждого сада ниже дай одну короткую полезную фразу по уходу за растениями сегодня. "
+    'Ответь только JSON-объектом вида {"g1": "совет", "g2": "совет"} с теми же id, без пояснений.'
+)
+AI_DEBUG = os.getenv("AI_DEBUG", "").strip() not in ("", "0", "false", "no")
+
+_cache = None
+_cache_lock = threading.Lock()
+_save_lock = threading.Lock()
+_inflight = {}
+_stats = {"hits": 0, "negative_hits": 0, "misses": 0, "saved_seconds": 0.0}
+
+
+def debug(message: str):
+    if AI_DEBUG:
+        print(f"AI debug: {message}")
+
+
+def guarded_call(system_prompt: str, prompt: str, max_tokens: int, call=None):
     api_key = os.getenv("OPENROUTER_API_KEY", "").strip()
     if not api_key:
-        print("AI debug: OPENROUTER_API_KEY missing")
-        return None
+        debug("OPENROUTER_API_KEY missing")
+        return None, "no_key"
+    if not circuit_allows(AI_CIRCUIT):
+        print("AI: OpenRouter временно отключён после серии ошибок")
+        return None, "circuit_open"
+
+    text, status = call_openrouter(system_prompt, prompt, api_key, max_tokens)
+    (call or CircuitCall(AI_CIRCUIT)).settle(status not in ("error", "rate_limited"))
+    return text, status
+
+
+def request_ai_comment(prompt: str, call=None):
+    return guarded_call(SYSTEM_PROMPT, prompt, 100, call)
+
+
+def parse_batch_advice(content: str, ids) -> dict:
+    if not content:
+        return {}
+    start, end = content.find("{"), content.rfind("}")
+    if start < 0 or end < start:
+        return {}
+    try:
+        data = json.loads(content[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    advice = {}
+    for item_id in ids:
+        text = data.get(item_id)
+        if isinstance(text, str) and text.strip() and len(text) <= AI_ADVICE_MAX_CHARS:
+            advice[item_id] = text.strip()
+    return advice
+
+
+def request_ai_batch(prompts: dict):
+    ids = {f"g{n}": key for n, key in enumerate(prompts, 1)}
+    prompt = "\n\n".join(f"### {item_id}\n{prompts[key]}" for item_id, key in ids.items())
+    content, status = guarded_call(BATCH_SYSTEM_PROMPT, prompt, AI_BATCH_TOKENS_PER_ITEM * len(ids))
+    advice = parse_batch_advice(content, ids)
+    if status == "ok" and len(advice) < len(ids):
+        print(f"AI batch: разобрано советов {len(advice)} из {len(ids)}")
+    return {ids[item_id]: text for item_id, text in advice.items()}, status
+
+
+def call_openrouter(system_prompt: str, prompt: str, api_key: str, max_tokens: int = 100):
+    import requests
 
     try:
         payload = {
@@ -15,7 +97,7 @@ def get_ai_comment(prompt: str):
             "messages": [
                 {
                     "role": "system",
-                    "content": "Ты бот-агроном. Дай одну короткую полезную фразу по уходу за комнатными растениями сегодня."
+                    "content": system_prompt
                 },
                 {
                     "role": "user",
@@ -24,44 +106,238 @@ def get_ai_comment(prompt: str):
             ],
             "temperature": 0.2,
             "top_p": 0.7,
-            "max_tokens": 100
+            "max_tokens": max_tokens
         }
 
         response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
+            url=f"{OPENROUTER_API_URL}/chat/completions",
             headers={
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json",
             },
             data=json.dumps(payload),
-            timeout=15,
+            timeout=AI_TIMEOUT,
         )
 
-        print(f"AI debug: status={response.status_code}")
+        debug(f"status={response.status_code}")
 
         if response.status_code == 429:
-            print("AI debug: rate-limited")
-            return None
+            print("AI: OpenRouter ответил 429, совет будет локальным")
+            return None, "rate_limited"
 
         response.raise_for_status()
         data = response.json()
-        print(f"AI debug: response={data}")
+        debug(f"response={data}")
 
         choices = data.get("choices", [])
         if not choices:
-            print("AI debug: no choices")
-            return None
+            debug("no choices")
+            return None, "empty"
 
         message = choices[0].get("message", {})
         content = message.get("content")
         if isinstance(content, str):
             text = content.strip()
-            print(f"AI debug: content={text!r}")
-            return text or None
+            debug(f"content={text!r}")
+            return text or None, "ok" if text else "empty"
 
-        print("AI debug: content missing or not string")
-        return None
+        debug("content missing or not string")
+        return None, "empty"
 
     except Exception as e:
         print(f"AI error: {e}")
-        return None
+        return None, "error"
+
+
+def load_ai_cache() -> OrderedDict:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OrderedDict()
+            try:
+                with open(AI_CACHE_FILE, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    _cache = OrderedDict(data)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Ошибка чтения {AI_CACHE_FILE}: {e}")
+        return _cache
+
+
+def save_ai_cache():
+    cache = load_ai_cache()
+    with _cache_lock:
+        now = time.time()
+        snapshot = {k: v for k, v in cache.items() if v.get("expires_at", 0) > now}
+    with _save_lock:
+        try:
+            with atomic_open(AI_CACHE_FILE) as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"Ошибка сохранения {AI_CACHE_FILE}: {e}")
+
+
+def ai_cache_stats() -> dict:
+    with _cache_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["hits"] + stats["negative_hits"]) / lookups if lookups else 0.0
+    return stats
+
+
+def lookup_cached(cache_key: str):
+    cache = load_ai_cache()
+    with _cache_lock:
+        entry = cache.get(cache_key)
+        if isinstance(entry, dict) and entry.get("expires_at", 0) > time.time():
+            cache.move_to_end(cache_key)
+            _stats["hits" if entry.get("text") else "negative_hits"] += 1
+            _stats["saved_seconds"] += entry.get("latency", 0.0)
+            return True, entry.get("text")
+    return False, None
+
+
+def store_cached(cache: OrderedDict, cache_key: str, text, status: str, latency: float):
+    if status in UNCACHED_STATUSES:
+        return
+    ttl = AI_CACHE_TTL if status == "ok" else AI_NEGATIVE_TTL
+    cache[cache_key] = {
+        "text": text,
+        "status": status,
+        "latency": latency,
+        "expires_at": time.time() + ttl,
+    }
+    cache.move_to_end(cache_key)
+    while len(cache) > AI_CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+
+
+def get_ai_comment(prompt: str, cache_key: str = None, persist: bool = True, call=None):
+    if cache_key is None:
+        return request_ai_comment(prompt, call)[0]
+
+    found, text = lookup_cached(cache_key)
+    if found:
+        return text
+
+    cache = load_ai_cache()
+    with _cache_lock:
+        slot = _inflight.get(cache_key)
+        owner = slot is None
+        if owner:
+            slot = _inflight[cache_key] = {"event": threading.Event(), "text": None, "latency": 0.0}
+            _stats["misses"] += 1
+
+    if not owner:
+        slot["event"].wait()
+        with _cache_lock:
+            _stats["hits" if slot["text"] else "negative_hits"] += 1
+            _stats["saved_seconds"] += slot["latency"]
+        return slot["text"]
+
+    started = time.perf_counter()
+    text, status = None, "error"
+    try:
+        text, status = request_ai_comment(prompt, call)
+    finally:
+        latency = time.perf_counter() - started
+        slot["text"], slot["latency"] = text, latency
+        with _cache_lock:
+            store_cached(cache, cache_key, text, status, latency)
+            _inflight.pop(cache_key, None)
+        slot["event"].set()
+
+    if persist and status not in UNCACHED_STATUSES:
+        save_ai_cache()
+    return text
+
+
+def get_ai_comments(prompts: dict, persist: bool = True) -> dict:
+    results = {}
+    misses = {}
+    for cache_key, prompt in prompts.items():
+        found, text = lookup_cached(cache_key)
+        if found:
+            results[cache_key] = text
+        else:
+            misses[cache_key] = prompt
+
+    keys = list(misses)
+    cache = load_ai_cache()
+    cacheable = False
+    for start in range(0, len(keys), max(AI_BATCH_SIZE, 1)):
+        chunk = {key: misses[key] for key in keys[start:start + max(AI_BATCH_SIZE, 1)]}
+        started = time.perf_counter()
+        if len(chunk) == 1:
+            key, prompt = next(iter(chunk.items()))
+            text, status = request_ai_comment(prompt)
+            advice = {key: text} if text else {}
+        else:
+            advice, status = request_ai_batch(chunk)
+        latency = (time.perf_counter() - started) / len(chunk)
+
+        with _cache_lock:
+            _stats["misses"] += len(chunk)
+            for key in chunk:
+                text = advice.get(key)
+                item_status = status if status != "ok" else "ok" if text else "empty"
+                store_cached(cache, key, text, item_status, latency)
+                results[key] = text
+        cacheable = cacheable or status not in UNCACHED_STATUSES
+
+    if persist and cacheable:
+        save_ai_cache()
+    return results
+
+
+class AiBatcher:
+    def __init__(self, window: float = AI_BATCH_WINDOW, size: int = AI_BATCH_SIZE):
+        self.window = window
+        self.size = max(size, 1)
+        self._pending = {}
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def submit(self, prompt: str, cache_key: str) -> Future:
+        future = Future()
+        found, text = lookup_cached(cache_key)
+        if found:
+            future.set_result(text)
+            return future
+
+        with self._lock:
+            entry = self._pending.setdefault(cache_key, (prompt, []))
+            entry[1].append(future)
+            full = sum(len(waiting) for _, waiting in self._pending.values()) >= self.size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+        return future
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+
+        try:
+            texts = get_ai_comments({key: prompt for key, (prompt, _) in pending.items()}, persist=False)
+        except Exception as e:
+            print(f"AI batch error: {e}")
+            texts = {}
+
+        for key, (_, futures) in pending.items():
+            text = texts.get(key)
+            if len(futures) > 1:
+                with _cache_lock:
+                    _stats["hits" if text else "negative_hits"] += len(futures) - 1
+            for future in futures:
+                future.set_result(text)
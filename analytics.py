@@ -0,0 +1,471 @@
+import argparse
+import csv
+import glob
+import gzip
+import io
+import json
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date, timedelta
+from operator import sub
+
+from catalog_set import file_stat
+from due_index import CARE_CONFIRM
+from send_tasks import PLANTS_FILE, load_plants, parse_iso_dt
+from storage import JOURNAL_DIR, STORAGE_BACKEND, atomic_open, get_storage, load_json_file, save_json_file
+
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "analytics")
+ANALYTICS_VERSION = 1
+OVERDUE_GRACE_DAYS = float(os.getenv("OVERDUE_GRACE_DAYS", "1"))
+KINDS = ("reminded", "watered", "fed")
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+QUERIES = ("build", "aggregate", "overdue", "adherence")
+GROUPS = ("plant", "feed", "kind", "month", "day")
+DAY = 86400
+EPOCH_DATE = date(1970, 1, 1)
+
+
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def is_bare_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value.strip())
+    except ValueError:
+        return False
+    return True
+
+
+def to_epoch(value, end_of_day: bool = False):
+    dt = parse_iso_dt(value) if isinstance(value, str) else None
+    if dt is None:
+        return None
+    if end_of_day and is_bare_date(value):
+        return int(dt.timestamp()) + DAY - 1
+    return int(dt.timestamp())
+
+
+class CareIndex:
+    def __init__(self):
+        self.plants = []
+        self.plant_codes = {}
+        self.feeds = [""]
+        self.feed_codes = {"": 0}
+        self.series = {}
+        self.sources = {}
+        self.events = 0
+
+    def code(self, values: list, codes: dict, value: str) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def add(self, kind: str, plant, feed, at) -> bool:
+        ts = to_epoch(at)
+        if ts is None or not isinstance(plant, str) or not isinstance(feed, str):
+            return False
+        key = (KIND_CODES[kind], self.code(self.plants, self.plant_codes, plant), self.code(self.feeds, self.feed_codes, feed))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = array("q")
+        if series and ts <= series[-1]:
+            return False
+        series.append(ts)
+        self.events += 1
+        return True
+
+    def add_history_entry(self, plant, entry):
+        if isinstance(entry, dict):
+            self.add("reminded", plant, "", entry.get("last_reminded"))
+            self.add("watered", plant, "", entry.get("last_watered"))
+
+    def add_feed_entry(self, plant, feed, entry):
+        if isinstance(entry, dict):
+            self.add("fed", plant, feed, entry.get("last_done"))
+
+    def add_state(self, history: dict, feed_history: dict):
+        for plant, entry in history.items():
+            self.add_history_entry(plant, entry)
+        for plant, feeds in feed_history.items():
+            if isinstance(feeds, dict):
+                for feed, entry in feeds.items():
+                    self.add_feed_entry(plant, feed, entry)
+
+    def add_event(self, event: dict):
+        kind = event.get("type")
+        if kind in ("reminded", "watered"):
+            self.add(kind, event.get("plant"), "", event.get("at"))
+        elif kind == "fed":
+            self.add("fed", event.get("plant"), event.get("feed"), event.get("at"))
+        elif kind == "history_set":
+            self.add_history_entry(event.get("plant"), event.get("entry"))
+        elif kind == "feed_set":
+            self.add_feed_entry(event.get("plant"), event.get("feed"), event.get("entry"))
+
+    def select(self, kinds=None, plant=None, feed=None):
+        plant_code = self.plant_codes.get(plant) if plant else None
+        feed_code = self.feed_codes.get(feed) if feed else None
+        if (plant and plant_code is None) or (feed and feed_code is None):
+            return
+        kind_codes = {KIND_CODES[kind] for kind in kinds} if kinds else None
+        for key, series in self.series.items():
+            kind, series_plant, series_feed = key
+            if kind_codes is not None and kind not in kind_codes:
+                continue
+            if plant_code is not None and series_plant != plant_code:
+                continue
+            if feed_code is not None and series_feed != feed_code:
+                continue
+            yield key, series
+
+    def save(self, directory: str = ANALYTICS_DIR):
+        os.makedirs(directory, exist_ok=True)
+        timestamps = array("q")
+        table = []
+        for key in sorted(self.series):
+            start = len(timestamps)
+            timestamps.extend(self.series[key])
+            table.append([*key, start, len(timestamps)])
+
+        data_file = os.path.join(directory, "timestamps.bin")
+        with atomic_open(data_file, "wb") as f:
+            timestamps.tofile(f)
+        save_json_file(os.path.join(directory, "index.json"), {
+            "version": ANALYTICS_VERSION,
+            "size": len(timestamps),
+            "sources": self.sources,
+            "plants": self.plants,
+            "feeds": self.feeds,
+            "series": table,
+        })
+
+    @classmethod
+    def load(cls, directory: str = ANALYTICS_DIR):
+        index = cls()
+        meta = load_json_file(os.path.join(directory, "index.json"), {})
+        if meta.get("version") != ANALYTICS_VERSION:
+            return index
+        timestamps = array("q")
+        try:
+            with open(os.path.join(directory, "timestamps.bin"), "rb") as f:
+                timestamps.frombytes(f.read())
+        except OSError:
+            return index
+        if len(timestamps) != meta.get("size"):
+            print(f"{directory}: индекс повреждён, строится заново")
+            return index
+
+        index.plants = meta["plants"]
+        index.plant_codes = {plant: code for code, plant in enumerate(index.plants)}
+        index.feeds = meta["feeds"]
+        index.feed_codes = {feed: code for code, feed in enumerate(index.feeds)}
+        for kind, plant, feed, start, end in meta["series"]:
+            index.series[(kind, plant, feed)] = timestamps[start:end]
+        index.sources = meta.get("sources", {})
+        index.events = len(timestamps)
+        return index
+
+
+def read_events(filepath: str):
+    opener = gzip.open if filepath.endswith(".gz") else open
+    try:
+        with opener(filepath, "rt", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"{filepath}:{line_no}: повреждённая запись пропущена")
+    except FileNotFoundError:
+        return
+
+
+def journal_sources(journal_dir: str) -> dict:
+    archives = sorted(glob.glob(os.path.join(journal_dir, "archive", "events-*.jsonl.gz")))
+    return {
+        "journal": os.path.abspath(journal_dir),
+        "archives": [os.path.basename(path) for path in archives],
+        "snapshot": file_stat(os.path.join(journal_dir, "snapshot.json")),
+        "events": file_stat(os.path.join(journal_dir, "events.jsonl")),
+    }
+
+
+def refresh(index: CareIndex, journal_dir: str = JOURNAL_DIR) -> int:
+    before = index.events
+    if not os.path.isdir(journal_dir):
+        storage = get_storage()
+        try:
+            index.add_state(storage.load_history(), storage.load_feed_history())
+        finally:
+            storage.close()
+        return index.events - before
+
+    sources = journal_sources(journal_dir)
+    if sources == index.sources:
+        return 0
+    done = set(index.sources.get("archives", [])) if index.sources.get("journal") == sources["journal"] else set()
+    for name in sources["archives"]:
+        if name not in done:
+            for event in read_events(os.path.join(journal_dir, "archive", name)):
+                index.add_event(event)
+    snapshot = load_json_file(os.path.join(journal_dir, "snapshot.json"), {})
+    index.add_state(snapshot.get("history", {}), snapshot.get("feed_history", {}))
+    for event in read_events(os.path.join(journal_dir, "events.jsonl")):
+        index.add_event(event)
+    index.sources = sources
+    return index.events - before
+
+
+def window(series, since=None, until=None):
+    lo = bisect_left(series, since) if since is not None else 0
+    hi = bisect_right(series, until) if until is not None else len(series)
+    return lo, hi
+
+
+def day_counts(windows: list) -> dict:
+    np = load_numpy()
+    if np is None:
+        counts = Counter()
+        for series, lo, hi in windows:
+            counts.update(ts // DAY for ts in series[lo:hi])
+        return counts
+    flat = np.concatenate([np.frombuffer(series, dtype=np.int64)[lo:hi] for series, lo, hi in windows])
+    days, counts = np.unique(flat // DAY, return_counts=True)
+    return dict(zip(days.tolist(), counts.tolist()))
+
+
+def bucket_label(day: int, by: str) -> str:
+    date = EPOCH_DATE + timedelta(days=day)
+    return date.isoformat() if by == "day" else date.strftime("%Y-%m")
+
+
+def aggregate(index: CareIndex, by: str = "plant", kinds=None, plant=None, feed=None, since=None, until=None) -> list:
+    counts = {}
+    windows = []
+    for (kind, plant_code, feed_code), series in index.select(kinds, plant, feed):
+        lo, hi = window(series, since, until)
+        if hi <= lo:
+            continue
+        if by in ("month", "day"):
+            windows.append((series, lo, hi))
+            continue
+        label = {"plant": index.plants[plant_code], "feed": index.feeds[feed_code], "kind": KINDS[kind]}[by]
+        counts[label] = counts.get(label, 0) + hi - lo
+
+    if by in ("month", "day"):
+        for day, count in (day_counts(windows) if windows else {}).items():
+            label = bucket_label(day, by)
+            counts[label] = counts.get(label, 0) + count
+        return [{by: label, "count": count} for label, count in sorted(counts.items())]
+    return [{by: label, "count": count} for label, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def stats_row(events: int, expected: int, limit: float, total: int, overdue: int, late: int, longest: int, open_gap: int) -> dict:
+    gaps = events - 1
+    span = gaps * DAY
+    return {
+        "events": events,
+        "expected_days": expected,
+        "mean_gap_days": round(total / span, 2) if gaps else None,
+        "ratio": round(total / span / expected, 2) if gaps else None,
+        "on_time_share": round(1 - overdue / gaps, 3) if gaps else None,
+        "overdue": overdue,
+        "overdue_days": round(late / DAY, 1),
+        "max_gap_days": round(longest / DAY, 1),
+        "overdue_now": open_gap > limit,
+    }
+
+
+def gap_stats(series, expected: int, grace: float, now: int) -> dict:
+    limit = (expected + grace) * DAY
+    gaps = list(map(sub, series[1:], series))
+    late = [gap for gap in gaps if gap > limit]
+    return stats_row(
+        len(series),
+        expected,
+        limit,
+        series[-1] - series[0],
+        len(late),
+        sum(late) - len(late) * expected * DAY,
+        max(gaps, default=0),
+        now - series[-1],
+    )
+
+
+def gap_table(windows: list, grace: float, now: int) -> list:
+    np = load_numpy()
+    if np is None or not windows:
+        return [gap_stats(series[lo:hi], expected, grace, now) for series, lo, hi, expected in windows]
+
+    flat = np.concatenate([np.frombuffer(series, dtype=np.int64)[lo:hi] for series, lo, hi, _ in windows])
+    counts = np.array([hi - lo for _, lo, hi, _ in windows], dtype=np.int64)
+    expected = np.array([days for _, _, _, days in windows], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ends = starts + counts - 1
+    limits = (expected + grace) * DAY
+
+    gaps = np.zeros(len(flat), dtype=np.int64)
+    gaps[:-1] = np.diff(flat)
+    gaps[ends] = 0
+    late = gaps > np.repeat(limits, counts)
+    overdue = np.add.reduceat(late, starts)
+    late_total = np.add.reduceat(np.where(late, gaps, 0), starts) - overdue * expected * DAY
+    longest = np.maximum.reduceat(gaps, starts)
+    columns = zip(
+        counts.tolist(),
+        expected.tolist(),
+        limits.tolist(),
+        (flat[ends] - flat[starts]).tolist(),
+        overdue.tolist(),
+        late_total.tolist(),
+        longest.tolist(),
+        (now - flat[ends]).tolist(),
+    )
+    return [stats_row(*column) for column in columns]
+
+
+def adherence(index: CareIndex, plants, kind: str = None, feeds: bool = True, since=None, until=None, grace: float = OVERDUE_GRACE_DAYS) -> list:
+    kind = kind or ("watered" if CARE_CONFIRM else "reminded")
+    catalog = {plant.id: plant for plant in plants}
+    intervals = {(plant.id, feed.id): feed.interval_days for plant in plants for feed in plant.feeds}
+    now = until if until is not None else int(time.time())
+    kinds = [kind, "fed"] if feeds else [kind]
+    rows = []
+    windows = []
+    for (kind_code, plant_code, feed_code), series in index.select(kinds):
+        plant_id = index.plants[plant_code]
+        plant = catalog.get(plant_id)
+        if plant is None:
+            continue
+        feed_id = index.feeds[feed_code]
+        expected = intervals.get((plant_id, feed_id)) if feed_id else plant.water_freq
+        if not expected:
+            continue
+        lo, hi = window(series, since, until)
+        if hi <= lo:
+            continue
+        rows.append({"plant": plant_id, "name": plant.name, "feed": feed_id, "kind": KINDS[kind_code]})
+        windows.append((series, lo, hi, expected))
+    for row, stats in zip(rows, gap_table(windows, grace, now)):
+        row.update(stats)
+    rows.sort(key=lambda row: (row["plant"], row["feed"]))
+    return rows
+
+
+def overdue(index: CareIndex, plants, kind: str = None, feeds: bool = False, since=None, until=None, grace: float = OVERDUE_GRACE_DAYS) -> list:
+    rows = [
+        row for row in adherence(index, plants, kind, feeds, since, until, grace)
+        if row["overdue"] or row["overdue_now"]
+    ]
+    rows.sort(key=lambda row: (-row["overdue"], -row["overdue_days"], row["plant"], row["feed"]))
+    return rows
+
+
+def format_rows(rows: list, fmt: str) -> str:
+    if fmt == "json":
+        return json.dumps(rows, ensure_ascii=False, indent=2) + "\n"
+    columns = list(rows[0]) if rows else []
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue()
+    if not rows:
+        return "Нет данных за выбранный период.\n"
+    cells = [columns] + [["" if row[column] is None else str(row[column]) for column in columns] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    return "".join("  ".join(value.ljust(width) for value, width in zip(line, widths)).rstrip() + "\n" for line in cells)
+
+
+def open_index(journal_dir: str, rebuild: bool = False):
+    index = CareIndex() if rebuild else CareIndex.load()
+    added = refresh(index, journal_dir)
+    if added or rebuild:
+        index.save()
+    return index, added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Аналитика полива и подкормок по истории и журналу событий")
+    parser.add_argument("query", choices=QUERIES)
+    parser.add_argument("--by", choices=GROUPS, default="plant", help="группировка для aggregate")
+    parser.add_argument("--kind", choices=KINDS, help="тип событий; для overdue/adherence — что считать поливом")
+    parser.add_argument("--plant", help="только это растение")
+    parser.add_argument("--feed", help="только эта подкормка")
+    parser.add_argument("--feeds", action="store_true", help="overdue: учитывать и подкормки")
+    parser.add_argument("--since", help="начало периода, ISO-дата")
+    parser.add_argument("--until", help="конец периода, ISO-дата")
+    parser.add_argument("--grace", type=float, default=OVERDUE_GRACE_DAYS, help="допустимое опоздание, дней")
+    parser.add_argument("--limit", type=int, help="вывести не больше N строк")
+    parser.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    parser.add_argument("--output", help="файл для результата; без него — вывод в консоль")
+    parser.add_argument("--journal", default=JOURNAL_DIR, help="папка журнала событий")
+    parser.add_argument("--plants", default=PLANTS_FILE)
+    parser.add_argument("--rebuild", action="store_true", help="перестроить индекс с нуля")
+    args = parser.parse_args(argv)
+
+    bounds = {}
+    for name in ("since", "until"):
+        value = getattr(args, name)
+        bounds[name] = to_epoch(value, end_of_day=name == "until") if value else None
+        if value and bounds[name] is None:
+            print(f"ERROR: --{name}: ожидается ISO-дата, например 2025-03-01")
+            sys.exit(2)
+
+    if not os.path.isdir(args.journal):
+        print(
+            f"WARNING: журнал {args.journal} не найден — в индекс попадут только последние отметки "
+            f"из STORAGE_BACKEND={STORAGE_BACKEND}; полная история есть только при STORAGE_BACKEND=journal"
+        )
+    elif STORAGE_BACKEND != "journal":
+        print(f"WARNING: STORAGE_BACKEND={STORAGE_BACKEND} — журнал {args.journal} не пополняется, свежие отметки в индекс не попадут")
+
+    started = time.perf_counter()
+    index, added = open_index(args.journal, args.rebuild)
+    loaded = time.perf_counter()
+    if args.query == "build":
+        print(
+            f"✅ {ANALYTICS_DIR}: событий {index.events} (новых {added}), растений {len(index.plants)}, "
+            f"рядов {len(index.series)}, {loaded - started:.2f} с"
+        )
+        return
+
+    if args.query == "aggregate":
+        rows = aggregate(index, args.by, [args.kind] if args.kind else None, args.plant, args.feed, bounds["since"], bounds["until"])
+    else:
+        plants = load_plants(args.plants)
+        if args.plant:
+            plants = [plant for plant in plants if plant.id == args.plant]
+        query = overdue if args.query == "overdue" else adherence
+        feeds = args.feeds if args.query == "overdue" else True
+        rows = query(index, plants, args.kind, feeds, bounds["since"], bounds["until"], args.grace)
+        if args.feed:
+            rows = [row for row in rows if row["feed"] == args.feed]
+    if args.limit is not None:
+        rows = rows[:args.limit]
+    elapsed = time.perf_counter() - loaded
+
+    text = format_rows(rows, args.format)
+    if not args.output:
+        sys.stdout.write(text)
+        if args.format == "table":
+            print(f"— строк {len(rows)}, событий в индексе {index.events}, загрузка {loaded - started:.2f} с, запрос {elapsed * 1000:.0f} мс")
+        return
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    print(f"✅ {args.output}: строк {len(rows)}, загрузка {loaded - started:.2f} с, запрос {elapsed * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from ai_client import AI_BATCH_SIZE, AiBatcher, save_ai_cache, ai_cache_stats
+from send_tasks import (
+    load_plants,
+    compute_delta_temp,
+    observe_weather,
+    plan_garden,
+    build_ai_prompt,
+    build_ai_cache_key,
+    weather_comment_fallback,
+    render_message,
+    mark_plan_done,
+    parse_iso_dt,
+)
+from locks import FileLock, parse_shard, shard_of
+from metrics import Metrics, profiled
+from sent_log import SKIP_UNCHANGED, is_unchanged, plan_digest, remember_sent, unchanged_delivery
+from due_index import index_signature, load_due_index, save_due_index, pop_due, reschedule
+from storage import get_storage
+from telegram_client import TelegramSender
+from updates import care_keyboard
+from weather import get_weather, prefetch_weather, weather_cache_stats
+
+DEFAULT_WORKERS = 8
+
+
+def resolve_garden(entry: dict, index: int, base_dir: str) -> dict:
+    if not isinstance(entry, dict):
+        raise ValueError(f"gardens[{index}] должен быть объектом")
+
+    garden_id = entry.get("id")
+    if not isinstance(garden_id, str) or not garden_id.strip():
+        raise ValueError(f"gardens[{index}].id обязателен и должен быть строкой")
+
+    chat_id = entry.get("chat_id")
+    if not isinstance(chat_id, (str, int)) or not str(chat_id).strip():
+        raise ValueError(f"{garden_id}: chat_id обязателен")
+
+    garden_dir = os.path.join(base_dir, entry.get("dir") or "")
+
+    def path_of(key, default_name):
+        return os.path.join(garden_dir, entry.get(key) or default_name)
+
+    return {
+        "id": garden_id,
+        "chat_id": str(chat_id),
+        "city": entry.get("city"),
+        "send_at": entry.get("send_at"),
+        "tz": entry.get("tz"),
+        "plants": path_of("plants", "plants.json"),
+        "history": path_of("history", "history.json"),
+        "feed_history": path_of("feed_history", "feed_history.json"),
+        "last_weather": path_of("last_weather", "last_weather.json"),
+        "due_index": path_of("due_index", "due_index.json"),
+        "journal": path_of("journal", "journal"),
+        "lock": path_of("lock", "run.lock"),
+        "sent_log": path_of("sent_log", "sent_log.json"),
+    }
+
+
+def load_manifest(filepath: str) -> list:
+    with open(filepath, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data.get("gardens", []) if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("manifest должен содержать список садов")
+
+    base_dir = os.path.dirname(os.path.abspath(filepath))
+    gardens = []
+    seen_ids = set()
+    for index, entry in enumerate(entries):
+        garden = resolve_garden(entry, index, base_dir)
+        if garden["id"] in seen_ids:
+            raise ValueError(f"Дублирующийся id сада '{garden['id']}'")
+        seen_ids.add(garden["id"])
+        gardens.append(garden)
+    return gardens
+
+
+class SharedClients:
+    def __init__(self, workers: int):
+        self.sender = TelegramSender(workers)
+        self.ai_batcher = AiBatcher(size=min(AI_BATCH_SIZE, max(workers, 1)))
+
+    def weather(self, city):
+        return get_weather(city, persist=False)
+
+    def ai_comment(self, prompt: str, cache_key: str):
+        return self.ai_batcher.submit(prompt, cache_key).result()
+
+    def send(self, text: str, chat_id: str, reply_markup=None) -> dict:
+        return self.sender.submit(text, chat_id, reply_markup).result()
+
+    def close(self):
+        self.ai_batcher.flush()
+        self.sender.close()
+
+
+def run_garden(garden: dict, clients: SharedClients, now_utc: datetime, metrics: Metrics) -> dict:
+    started = time.perf_counter()
+    result = {"id": garden["id"], "sent": False, "unchanged": False, "skipped": False, "reminded": 0, "feeds": 0, "error": None, "delivery": None}
+    storage = None
+    garden_lock = FileLock(garden["lock"])
+    if not garden_lock.acquire(blocking=False):
+        result["skipped"] = True
+        result["error"] = "сад уже обрабатывается другим процессом"
+        result["elapsed"] = time.perf_counter() - started
+        return result
+
+    try:
+        with metrics.span("plants"):
+            plants = load_plants(garden["plants"])
+        if not plants:
+            raise ValueError("список растений пуст")
+        metrics.incr("plants_total", len(plants))
+
+        storage = get_storage(
+            garden["history"],
+            garden["feed_history"],
+            garden["id"],
+            garden["last_weather"],
+            garden["journal"],
+        )
+        with metrics.span("state"):
+            history = storage.load_history()
+            feed_history = storage.load_feed_history()
+            last_temp = storage.load_last_temp()
+        with metrics.span("weather"):
+            weather = clients.weather(garden["city"])
+
+        delta_temp = compute_delta_temp(weather, last_temp)
+        trend = observe_weather(weather, now_utc)
+        storage.save_last_temp(weather.get("temp"))
+
+        with metrics.span("rules"):
+            signature = index_signature(garden["plants"], storage)
+            due_index = load_due_index(garden["due_index"], plants, history, parse_iso_dt, signature)
+            due = pop_due(due_index, now_utc.timestamp())
+            plan = plan_garden([plants[position] for position in due], history, feed_history, now_utc)
+        metrics.incr("plants_scanned", len(due))
+        metrics.incr("due_waterings", len(plan["plants_to_remind"]))
+        metrics.incr("due_feeds", len(plan["due_feeds_to_mark"]))
+
+        digest = plan_digest(plan, history, feed_history)
+        if SKIP_UNCHANGED and is_unchanged(garden["sent_log"], garden["chat_id"], digest):
+            metrics.incr("messages_unchanged")
+            delivery = unchanged_delivery(garden["chat_id"])
+        else:
+            plants_count = len(plan["plants_to_remind"])
+            with metrics.span("ai"):
+                ai_comment = clients.ai_comment(
+                    build_ai_prompt(weather, now_utc.month, delta_temp, plants_count, trend),
+                    build_ai_cache_key(weather, now_utc.month, delta_temp, plants_count, trend),
+                )
+            with metrics.span("render"):
+                comment = ai_comment or weather_comment_fallback(weather, now_utc.month, delta_temp, trend)
+                message = render_message(plan, weather, comment, now_utc)
+
+            with metrics.span("send"):
+                delivery = clients.send(message, garden["chat_id"], care_keyboard(plan))
+        result["delivery"] = delivery
+        metrics.incr("send_retries", delivery["retries"])
+        metrics.incr("messages_sent", delivery["sent_parts"])
+        if delivery["ok"]:
+            if SKIP_UNCHANGED and not delivery.get("unchanged"):
+                remember_sent(garden["sent_log"], garden["chat_id"], digest)
+            with metrics.span("persist"):
+                mark_plan_done(history, feed_history, plan, now_utc.isoformat())
+                storage.save_history(history)
+                storage.save_feed_history(feed_history)
+                reschedule(due_index, plants, due, history, parse_iso_dt)
+                save_due_index(due_index, garden["due_index"], index_signature(garden["plants"], storage))
+            result["sent"] = True
+            result["unchanged"] = delivery.get("unchanged", False)
+            result["reminded"] = len(plan["plants_to_remind"])
+            result["feeds"] = len(plan["due_feeds_to_mark"])
+        else:
+            result["error"] = f"сообщение не отправлено: {delivery['error']}"
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        if storage is not None:
+            storage.close()
+        garden_lock.release()
+
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+
+def run_batch(gardens: list, workers: int = DEFAULT_WORKERS, metrics: Metrics = None) -> dict:
+    metrics = metrics or Metrics()
+    now_utc = datetime.now(timezone.utc)
+    clients = SharedClients(workers)
+    started = time.perf_counter()
+
+    try:
+        with metrics.span("prefetch_weather"):
+            prefetch_weather([garden["city"] for garden in gardens], workers)
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            results = list(pool.map(lambda garden: run_garden(garden, clients, now_utc, metrics), gardens))
+    finally:
+        clients.close()
+        save_ai_cache()
+
+    elapsed = time.perf_counter() - started
+    sent = sum(1 for r in results if r["sent"])
+    skipped = sum(1 for r in results if r["skipped"])
+    unchanged = sum(1 for r in results if r["unchanged"])
+    ai_stats = ai_cache_stats()
+    weather_stats = weather_cache_stats()
+    metrics.incr("gardens", len(results))
+    metrics.incr("send_failures", len(results) - sent - skipped)
+    metrics.incr("gardens_skipped", skipped)
+    metrics.incr("ai_cache_hits", ai_stats["hits"] + ai_stats["negative_hits"])
+    metrics.incr("ai_cache_misses", ai_stats["misses"])
+    metrics.incr("weather_cache_hits", weather_stats["hits"])
+    metrics.incr("weather_cache_misses", weather_stats["misses"])
+    return {
+        "gardens": len(results),
+        "sent": sent,
+        "unchanged": unchanged,
+        "skipped": skipped,
+        "failed": len(results) - sent - skipped,
+        "elapsed": elapsed,
+        "gardens_per_sec": len(results) / elapsed if elapsed > 0 else 0.0,
+        "ai_cache": ai_stats,
+        "results": results,
+    }
+
+
+def print_report(report: dict):
+    for r in report["results"]:
+        if r["unchanged"]:
+            print(f"⏸ {r['id']}: план не изменился, сообщение не отправлялось.")
+        elif r["sent"]:
+            print(
+                f"✅ {r['id']}: {r['elapsed']:.3f} с, "
+                f"полив {r['reminded']}, подкормок {r['feeds']}"
+            )
+        elif r["skipped"]:
+            print(f"⏭ {r['id']}: {r['error']}, пропущен.")
+        else:
+            print(f"❌ {r['id']}: {r['elapsed']:.3f} с, {r['error']}. История не обновлялась.")
+
+    print(
+        f"Итого: садов {report['gardens']}, отправлено {report['sent'] - report['unchanged']}, "
+        f"без изменений {report['unchanged']}, "
+        f"пропущено {report['skipped']}, ошибок {report['failed']}, {report['elapsed']:.2f} с "
+        f"({report['gardens_per_sec']:.1f} садов/с)"
+    )
+    ai = report["ai_cache"]
+    print(
+        f"AI cache: попаданий {ai['hits'] + ai['negative_hits']}, промахов {ai['misses']}, "
+        f"hit rate {ai['hit_rate']:.0%}, сэкономлено {ai['saved_seconds']:.1f} с"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная рассылка планов для многих садов")
+    parser.add_argument("manifest", help="JSON-файл со списком садов")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--report", help="куда сохранить отчёт в JSON")
+    parser.add_argument("--profile", action="store_true", help="сохранить профиль cProfile и снимок tracemalloc")
+    parser.add_argument("--shard", help="обработать только свою часть садов, формат i/n (например 0/4)")
+    args = parser.parse_args(argv)
+
+    try:
+        gardens = load_manifest(args.manifest)
+        if args.shard:
+            index, count = parse_shard(args.shard)
+            gardens = [garden for garden in gardens if shard_of(garden["id"], count) == index]
+    except Exception as e:
+        print(f"ERROR: manifest не загружен — {e}")
+        sys.exit(1)
+
+    metrics = Metrics()
+    try:
+        with profiled(args.profile):
+            report = run_batch(gardens, args.workers, metrics)
+    finally:
+        metrics.write()
+    print_report(report)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
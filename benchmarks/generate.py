@@ -0,0 +1,172 @@
+import argparse
+import gzip
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+STAGE_WEIGHTS = [("foliage", 60), ("bloom", 20), ("dormant", 12), ("recover", 5), ("покой", 2), ("восстановление", 1)]
+WATER_FREQS = [(3, 10), (4, 20), (5, 15), (7, 30), (10, 10), (12, 8), (14, 5), (21, 2)]
+
+FEED_TEMPLATES = [
+    {"id": "osmocote", "name": "Осмокот", "dose": "1 внесение в грунт", "intervalDays": 180,
+     "months": [3, 4], "onlyStages": ["foliage"]},
+    {"id": "succinic", "name": "Янтарка", "dose": "1/1 мягкая доза", "intervalDays": 30,
+     "months": [3, 4, 5, 6, 7, 8, 9, 10], "onlyStages": ["foliage"], "conditions": ["active_growth"]},
+    {"id": "bona_forte", "name": "Bona Forte", "dose": "1/2 от инструкции", "intervalDays": 14,
+     "months": [3, 4, 5, 6, 7, 8], "onlyStages": ["foliage"]},
+    {"id": "akvarin", "name": "Акварин", "dose": "1/2 дозы", "intervalDays": 14,
+     "months": [1, 2, 3, 4, 5, 6, 7, 8], "onlyStages": ["foliage", "bloom"]},
+    {"id": "mkf", "name": "МКФ", "dose": "1/4–1/2 дозы", "intervalDays": 21,
+     "months": [2, 3, 4, 5, 6, 7, 8], "conditions": ["flower_spike"]},
+    {"id": "mkf_buds", "name": "МКФ (бутоны)", "dose": "1/2 дозы", "intervalDays": 14,
+     "months": [2, 3, 4, 5, 6, 7], "onlyStages": ["bloom"], "conditions": ["buds"]},
+    {"id": "succulent_feed", "name": "Подкормка для суккулентов", "dose": "1/2 слабой дозы", "intervalDays": 30,
+     "months": [3, 4, 5, 6, 7, 8], "onlyStages": ["foliage"]},
+]
+LATENESS_DAYS = [(0, 80), (1, 10), (2, 5), (4, 3), (7, 2)]
+JOURNAL_ARCHIVE_EVENTS = 100000
+FEED_COUNTS = [(0, 15), (1, 45), (2, 35), (3, 5)]
+NAMES = [
+    "Лимон", "Адениум (Молодой)", "Кактус", "Гранат комнатный", "Фиалка", "Орхидея", "Глоксиния",
+    "Замиокулькас", "Нолина (Бокарнея)", "Алоэ", "Фикус", "Монстера", "Сансевиерия", "Хлорофитум",
+]
+
+
+def weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def generate_plant(rng: random.Random, index: int) -> dict:
+    stage = weighted(rng, STAGE_WEIGHTS)
+    feeds = rng.sample(FEED_TEMPLATES, weighted(rng, FEED_COUNTS))
+    return {
+        "id": f"plant-{index}",
+        "name": f"{rng.choice(NAMES)} №{index}",
+        "waterFreq": weighted(rng, WATER_FREQS),
+        "stage": stage,
+        "flags": {
+            "active_growth": rng.random() < 0.8,
+            "buds": rng.random() < 0.2,
+            "flower_spike": rng.random() < 0.1,
+        },
+        "feeds": [dict(feed) for feed in feeds],
+    }
+
+
+def generate_garden(count: int, now_utc: datetime, seed: int = 42):
+    rng = random.Random(seed)
+    plants = []
+    history = {}
+    feed_history = {}
+
+    for index in range(count):
+        plant = generate_plant(rng, index)
+        plants.append(plant)
+
+        if rng.random() < 0.9:
+            ago = timedelta(seconds=rng.randint(0, plant["waterFreq"] * 2 * 86400))
+            history[plant["id"]] = {"last_reminded": (now_utc - ago).isoformat()}
+
+        feeds = {}
+        for feed in plant["feeds"]:
+            if rng.random() < 0.7:
+                ago = timedelta(seconds=rng.randint(0, feed["intervalDays"] * 2 * 86400))
+                feeds[feed["id"]] = {"last_done": (now_utc - ago).isoformat()}
+        if feeds:
+            feed_history[plant["id"]] = feeds
+
+    return plants, history, feed_history
+
+
+def write_garden(out_dir: str, count: int, now_utc: datetime, seed: int = 42) -> dict:
+    os.makedirs(out_dir, exist_ok=True)
+    plants, history, feed_history = generate_garden(count, now_utc, seed)
+    paths = {
+        "plants": os.path.join(out_dir, "plants.json"),
+        "history": os.path.join(out_dir, "history.json"),
+        "feed_history": os.path.join(out_dir, "feed_history.json"),
+    }
+    for key, data in (("plants", {"plants": plants}), ("history", history), ("feed_history", feed_history)):
+        with open(paths[key], "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    return paths
+
+
+def generate_journal(plants: list, days: int, now_utc: datetime, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    start = now_utc - timedelta(days=days)
+    events = []
+    for plant in plants:
+        series = [("reminded", None, plant["waterFreq"])]
+        series.extend(("fed", feed["id"], feed["intervalDays"]) for feed in plant["feeds"])
+        for kind, feed_id, interval in series:
+            at = start + timedelta(seconds=rng.randint(0, interval * 86400))
+            while at < now_utc:
+                event = {"type": kind, "plant": plant["id"], "at": at.isoformat()}
+                if feed_id:
+                    event["feed"] = feed_id
+                events.append(event)
+                at += timedelta(days=interval + weighted(rng, LATENESS_DAYS), seconds=rng.randint(-3600, 3600))
+    events.sort(key=lambda event: event["at"])
+    return events
+
+
+def write_journal(out_dir: str, plants: list, days: int, now_utc: datetime, seed: int = 42) -> int:
+    events = generate_journal(plants, days, now_utc, seed)
+    archive_dir = os.path.join(out_dir, "archive")
+    os.makedirs(archive_dir, exist_ok=True)
+    history = {}
+    feed_history = {}
+    archived = len(events) - len(events) % JOURNAL_ARCHIVE_EVENTS
+    for seq, event in enumerate(events, 1):
+        event["seq"] = seq
+
+    for first in range(0, archived, JOURNAL_ARCHIVE_EVENTS):
+        chunk = events[first:first + JOURNAL_ARCHIVE_EVENTS]
+        name = f"events-{first + 1:010d}-{first + len(chunk):010d}.jsonl.gz"
+        with gzip.open(os.path.join(archive_dir, name), "wt", encoding="utf-8") as f:
+            for event in chunk:
+                f.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+                if event["type"] == "fed":
+                    feed_history.setdefault(event["plant"], {})[event["feed"]] = {"last_done": event["at"]}
+                else:
+                    history[event["plant"]] = {"last_reminded": event["at"]}
+
+    with open(os.path.join(out_dir, "snapshot.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "seq": archived,
+            "history_seq": archived,
+            "created_at": now_utc.timestamp(),
+            "history": history,
+            "feed_history": feed_history,
+            "last_weather": {},
+        }, f, ensure_ascii=False)
+    with open(os.path.join(out_dir, "events.jsonl"), "w", encoding="utf-8") as f:
+        for event in events[archived:]:
+            f.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return len(events)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генератор синтетического сада для бенчмарков")
+    parser.add_argument("--plants", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench_garden")
+    parser.add_argument("--journal-days", type=int, default=0, help="сгенерировать журнал событий за N дней в <out>/journal")
+    args = parser.parse_args(argv)
+
+    now_utc = datetime.now(timezone.utc)
+    paths = write_garden(args.out, args.plants, now_utc, args.seed)
+    print(f"✅ Сгенерировано растений: {args.plants} → {paths['plants']}")
+    if args.journal_days > 0:
+        with open(paths["plants"], "r", encoding="utf-8") as f:
+            plants = json.load(f)["plants"]
+        journal_dir = os.path.join(args.out, "journal")
+        count = write_journal(journal_dir, plants, args.journal_days, now_utc, args.seed)
+        print(f"✅ Журнал за {args.journal_days} дн.: событий {count} → {journal_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.generate import write_garden
+from fake_servers import fake_env, start_fakes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_GARDENS = 1000
+DEFAULT_PLANTS = 20
+DEFAULT_CITIES = 50
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def write_fleet(base_dir: str, gardens: int, plants: int, cities: int, now_utc: datetime) -> list:
+    fleet = []
+    for n in range(gardens):
+        garden_id = f"garden-{n}"
+        write_garden(os.path.join(base_dir, garden_id), plants, now_utc, seed=n)
+        fleet.append({"id": garden_id, "dir": garden_id, "chat_id": str(100000 + n), "city": f"City-{n % cities}"})
+    with open(os.path.join(base_dir, "gardens.json"), "w", encoding="utf-8") as f:
+        json.dump({"gardens": fleet}, f, ensure_ascii=False)
+    return fleet
+
+
+def load_json(filepath: str) -> dict:
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def parse_at(value):
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def check_garden(garden_dir: str, messages: list, started: datetime, before: dict) -> str:
+    history = load_json(os.path.join(garden_dir, "history.json"))
+    updated = sum(
+        1 for entry in history.values()
+        if isinstance(entry, dict) and (parse_at(entry.get("last_reminded")) or started) > started
+    )
+    expected = sum(str(message.get("text", "")).count("📍") for message in messages)
+    if not messages:
+        return "ok" if history == before else "history_without_message"
+    if updated == expected:
+        return "ok"
+    return "unpersisted" if history == before else "history_mismatch"
+
+
+def run_batch_mode(base_dir: str, env: dict, workers: int) -> dict:
+    report_path = os.path.join(base_dir, "report.json")
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "batch.py"), "gardens.json", "--workers", str(workers), "--report", report_path],
+        cwd=base_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    report = load_json(report_path)
+    return {
+        "elapsed": elapsed,
+        "latencies": [r["elapsed"] for r in report.get("results", [])],
+        "exit_code": completed.returncode,
+        "output": completed.stdout[-2000:] + completed.stderr[-2000:],
+    }
+
+
+def run_main_mode(base_dir: str, env: dict, fleet: list, workers: int) -> dict:
+    def run_one(garden):
+        garden_env = dict(env, TELEGRAM_CHAT_ID=garden["chat_id"], CITY_NAME=garden["city"])
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, os.path.join(ROOT, "send_tasks.py")],
+            cwd=os.path.join(base_dir, garden["dir"]),
+            env=garden_env,
+            capture_output=True,
+            text=True,
+        )
+        return time.perf_counter() - started, completed.returncode
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        results = list(pool.map(run_one, fleet))
+    return {
+        "elapsed": time.perf_counter() - started,
+        "latencies": [elapsed for elapsed, _ in results],
+        "exit_code": max((code for _, code in results), default=0),
+        "output": "",
+    }
+
+
+def run_load(args) -> dict:
+    now_utc = datetime.now(timezone.utc)
+    with tempfile.TemporaryDirectory() as base_dir:
+        fleet = write_fleet(base_dir, args.gardens, args.plants, args.cities, now_utc)
+        before = {garden["id"]: load_json(os.path.join(base_dir, garden["dir"], "history.json")) for garden in fleet}
+        fakes = start_fakes(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            retry_after=args.retry_after,
+            seed=args.seed,
+        )
+        env = dict(
+            os.environ,
+            PYTHONPATH=ROOT,
+            TELEGRAM_TOKEN="load-test",
+            OPENWEATHER_API_KEY="load-test",
+            OPENROUTER_API_KEY="load-test",
+            TELEGRAM_GLOBAL_RATE=str(args.telegram_rate),
+            **fake_env(fakes),
+        )
+        try:
+            if args.mode == "batch":
+                run = run_batch_mode(base_dir, env, args.workers)
+            else:
+                run = run_main_mode(base_dir, env, fleet, args.workers)
+        finally:
+            for fake in fakes.values():
+                fake.stop()
+
+        by_chat = fakes["telegram"].messages_by_chat()
+        checks = {}
+        for garden in fleet:
+            status = check_garden(
+                os.path.join(base_dir, garden["dir"]),
+                by_chat.get(garden["chat_id"], []),
+                now_utc,
+                before[garden["id"]],
+            )
+            checks[status] = checks.get(status, 0) + 1
+
+    latencies = run["latencies"]
+    return {
+        "mode": args.mode,
+        "gardens": args.gardens,
+        "plants_per_garden": args.plants,
+        "cities": args.cities,
+        "workers": args.workers,
+        "faults": {
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+            "retry_after": args.retry_after,
+        },
+        "elapsed": run["elapsed"],
+        "gardens_per_sec": args.gardens / run["elapsed"] if run["elapsed"] > 0 else 0.0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+        "exit_code": run["exit_code"],
+        "checks": checks,
+        "requests": {name: dict(sorted(fake.stats.items())) for name, fake in fakes.items()},
+        "output": run["output"],
+    }
+
+
+def print_report(report: dict):
+    print(
+        f"— {report['mode']}: садов {report['gardens']} по {report['plants_per_garden']} растений, "
+        f"городов {report['cities']}, потоков {report['workers']}"
+    )
+    print(
+        f"  {report['elapsed']:.2f} с, {report['gardens_per_sec']:.1f} садов/с, "
+        f"p50 {report['p50'] * 1000:.0f} мс, p99 {report['p99'] * 1000:.0f} мс, max {report['max'] * 1000:.0f} мс"
+    )
+    for name, stats in report["requests"].items():
+        print(f"  {name}: ответов по кодам {stats}")
+    print(f"  Проверка истории: {report['checks']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон без сети: заглушки Telegram, OpenWeather и OpenRouter")
+    parser.add_argument("--mode", choices=["batch", "main"], default="batch")
+    parser.add_argument("--gardens", type=int, default=DEFAULT_GARDENS)
+    parser.add_argument("--plants", type=int, default=DEFAULT_PLANTS, help="растений в каждом саду")
+    parser.add_argument("--cities", type=int, default=DEFAULT_CITIES)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05, help="средняя задержка заглушек, секунд")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--telegram-rate", type=float, default=30, help="глобальный лимит сообщений в секунду")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="куда сохранить отчёт в JSON")
+    args = parser.parse_args(argv)
+
+    report = run_load(args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ Отчёт сохранён в {args.output}")
+
+    allowed = {"ok", "unpersisted"} if args.error_rate or args.rate_limit_rate else {"ok"}
+    if set(report["checks"]) - allowed:
+        print(report["output"])
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import send_tasks
+from benchmarks.generate import write_garden
+from catalog import compile_catalog
+from due_index import build_due_index, pop_due
+from rules import build_plant_block
+from send_tasks import (
+    md_escape,
+    parse_iso_dt,
+    days_since_last_reminder,
+    load_plants,
+    plan_garden,
+    render_message,
+)
+from validation import validate_plants
+
+DEFAULT_SIZES = [10, 1000, 100000]
+DEFAULT_TOLERANCE = 0.25
+MIN_REGRESSION_SECONDS = 0.001
+WEATHER = {"available": True, "temp": 18, "hum": 55, "desc": "ясно", "wind": 3.0, "city": "Moscow"}
+COMMENT = "Поливай утром тёплой водой."
+
+
+def best_of(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def repeats_for(size: int) -> int:
+    if size <= 1000:
+        return 5
+    if size <= 100000:
+        return 2
+    return 1
+
+
+def run_main_stubbed(garden_dir: str, now_utc: datetime):
+    stubs = {
+        "get_weather": lambda *args, **kwargs: dict(WEATHER),
+        "get_ai_comment": lambda *args, **kwargs: COMMENT,
+        "deliver_message": lambda text, *args, **kwargs: {
+            "chat_id": "bench", "ok": True, "parts": 1, "sent_parts": 1, "retries": 0, "error": None,
+        },
+    }
+    originals = {name: getattr(send_tasks, name) for name in stubs}
+    cwd = os.getcwd()
+    try:
+        for name, stub in stubs.items():
+            setattr(send_tasks, name, stub)
+        os.chdir(garden_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            send_tasks.main([])
+    finally:
+        os.chdir(cwd)
+        for name, original in originals.items():
+            setattr(send_tasks, name, original)
+
+
+def bench_size(size: int, now_utc: datetime) -> dict:
+    repeat = repeats_for(size)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = write_garden(tmp_dir, size, now_utc)
+        with open(paths["plants"], "r", encoding="utf-8") as f:
+            raw_plants = json.load(f)["plants"]
+        with open(paths["history"], "r", encoding="utf-8") as f:
+            history = json.load(f)
+        with open(paths["feed_history"], "r", encoding="utf-8") as f:
+            feed_history = json.load(f)
+
+        plants = compile_catalog(raw_plants, md_escape)
+        due = [plant for plant in plants if days_since_last_reminder(plant.id, history, now_utc) >= plant.water_freq]
+        plan = plan_garden(plants, history, feed_history, now_utc)
+        strings = [plant["name"] for plant in raw_plants]
+        strings.extend(feed.get("dose", "") for plant in raw_plants for feed in plant["feeds"])
+
+        def select_due():
+            return [
+                plant for plant in plants
+                if days_since_last_reminder(plant.id, history, now_utc) >= plant.water_freq
+            ]
+
+        def due_index():
+            index = build_due_index(plants, history, parse_iso_dt, "bench")
+            return pop_due(index, now_utc.timestamp())
+
+        def plant_blocks():
+            for plant in due:
+                build_plant_block(plant, feed_history, now_utc, parse_iso_dt)
+
+        def escape_all():
+            for text in strings:
+                md_escape(text)
+
+        results = {
+            "plants": size,
+            "due_plants": len(due),
+            "load_plants": best_of(lambda: load_plants(paths["plants"]), repeat),
+            "validate_plants": best_of(lambda: validate_plants(raw_plants), repeat),
+            "compile_catalog": best_of(lambda: compile_catalog(raw_plants, md_escape), repeat),
+            "select_due": best_of(select_due, repeat),
+            "due_index": best_of(due_index, repeat),
+            "build_plant_block": best_of(plant_blocks, repeat),
+            "md_escape": best_of(escape_all, repeat),
+            "render_message": best_of(lambda: render_message(plan, WEATHER, COMMENT, now_utc), repeat),
+            "plan_garden": best_of(lambda: plan_garden(plants, history, feed_history, now_utc), repeat),
+        }
+        results["main"] = best_of(lambda: run_main_stubbed(tmp_dir, now_utc), 1)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for size, stages in results["results"].items():
+        base_stages = baseline.get("results", {}).get(size)
+        if not base_stages:
+            continue
+        for stage, elapsed in stages.items():
+            base = base_stages.get(stage)
+            if stage in ("plants", "due_plants") or not isinstance(base, (int, float)) or base <= 0:
+                continue
+            ratio = elapsed / base
+            if ratio > 1 + tolerance and elapsed - base > MIN_REGRESSION_SECONDS:
+                regressions.append({"size": size, "stage": stage, "baseline": base, "current": elapsed, "ratio": ratio})
+    return regressions
+
+
+def print_results(results: dict):
+    for size, stages in results["results"].items():
+        print(f"— {size} растений (к поливу: {stages['due_plants']})")
+        for stage, elapsed in stages.items():
+            if stage not in ("plants", "due_plants"):
+                print(f"  {stage:<18} {elapsed * 1000:10.2f} мс")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки горячих путей send_tasks")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="размеры каталога через запятую, например 10,1000,100000,1000000",
+    )
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    now_utc = datetime.now(timezone.utc)
+    results = {
+        "created_at": now_utc.isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {},
+    }
+    for size in (int(value) for value in args.sizes.split(",") if value.strip()):
+        results["results"][str(size)] = bench_size(size, now_utc)
+
+    print_results(results)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"✅ Результаты сохранены в {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print(
+                f"❌ {r['size']} / {r['stage']}: {r['baseline'] * 1000:.2f} → {r['current'] * 1000:.2f} мс "
+                f"(x{r['ratio']:.2f})"
+            )
+        if regressions:
+            sys.exit(1)
+        print("✅ Регрессий относительно базового запуска нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["send_tasks", "planner", "daemon"]
+DEFAULT_BUDGET_MS = 100.0
+DEFAULT_REPEAT = 5
+LAZY_MODULES = ["requests", "urllib3", "charset_normalizer", "idna", "sqlite3", "multiprocessing", "numpy", "cProfile", "tracemalloc"]
+
+
+def import_profile(module: str) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "ошибка импорта")
+
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|", 2)
+        try:
+            cumulative[name.strip()] = int(total.strip())
+        except ValueError:
+            continue
+    return cumulative
+
+
+def measure(module: str, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        profile = import_profile(module)
+        elapsed_ms = profile.get(module, 0) / 1000
+        if best is None or elapsed_ms < best["ms"]:
+            best = {"ms": elapsed_ms, "lazy_loaded": sorted(name for name in LAZY_MODULES if name in profile)}
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка времени импорта через -X importtime")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="допустимое время импорта модуля")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        try:
+            result = measure(module, max(args.repeat, 1))
+        except RuntimeError as e:
+            print(f"❌ {module}: {e}")
+            failed = True
+            continue
+        if result["lazy_loaded"]:
+            print(f"❌ {module}: при старте загружены {', '.join(result['lazy_loaded'])}")
+            failed = True
+        elif result["ms"] > args.budget_ms:
+            print(f"❌ {module}: {result['ms']:.1f} мс, бюджет {args.budget_ms:g} мс")
+            failed = True
+        else:
+            print(f"✅ {module}: {result['ms']:.1f} мс (бюджет {args.budget_ms:g} мс)")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
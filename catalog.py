@@ -0,0 +1,152 @@
+import threading
+from functools import lru_cache
+from typing import NamedTuple
+
+ALL_MONTHS = sum(1 << month for month in range(1, 13))
+FRAGMENT_CACHE_SIZE = 4096
+
+STAGE_FOLIAGE = 0
+STAGE_BLOOM = 1
+STAGE_DORMANT = 2
+STAGE_RECOVER = 3
+
+_stage_ids = {
+    "foliage": STAGE_FOLIAGE,
+    "bloom": STAGE_BLOOM,
+    "dormant": STAGE_DORMANT,
+    "покой": STAGE_DORMANT,
+    "recover": STAGE_RECOVER,
+    "восстановление": STAGE_RECOVER,
+}
+_stage_lock = threading.Lock()
+
+COND_BUDS = 1
+COND_FLOWER_SPIKE = 2
+COND_ACTIVE_GROWTH = 4
+
+CONDITION_BITS = {
+    "buds": COND_BUDS,
+    "flower_spike": COND_FLOWER_SPIKE,
+    "active_growth": COND_ACTIVE_GROWTH,
+}
+
+
+class CompiledFeed(NamedTuple):
+    id: str
+    name: str
+    dose: str
+    interval_days: int
+    month_mask: int
+    stage_mask: int
+    cond_mask: int
+    conditions: tuple
+    msg_blocked: str
+    msg_off_season: str
+    msg_wrong_stage: str
+    msg_needs_buds: str
+    msg_needs_spike: str
+    msg_needs_conditions: str
+    msg_due: str
+    msg_wait_prefix: str
+
+
+class CompiledPlant(NamedTuple):
+    id: str
+    name: str
+    name_md: str
+    water_freq: int
+    stage: int
+    feeding_allowed: bool
+    flag_mask: int
+    feeds: tuple
+
+
+def intern_stage(stage) -> int:
+    key = str(stage or "").strip().lower()
+    with _stage_lock:
+        stage_id = _stage_ids.get(key)
+        if stage_id is None:
+            stage_id = _stage_ids[key] = len(set(_stage_ids.values()))
+        return stage_id
+
+
+def build_flag_mask(flags) -> int:
+    flags = flags if isinstance(flags, dict) else {}
+    mask = 0
+    if flags.get("buds", False):
+        mask |= COND_BUDS
+    if flags.get("flower_spike", False):
+        mask |= COND_FLOWER_SPIKE
+    if flags.get("active_growth", True):
+        mask |= COND_ACTIVE_GROWTH
+    return mask
+
+
+@lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def feed_messages(feed_name: str, dose: str, md_escape) -> dict:
+    return {
+        "msg_blocked": md_escape(f"{feed_name} — сейчас нельзя, растение в режиме покоя/восстановления"),
+        "msg_off_season": md_escape(f"{feed_name} — не сезон"),
+        "msg_wrong_stage": md_escape(f"{feed_name} — не подходит для текущей стадии"),
+        "msg_needs_buds": md_escape(f"{feed_name} — только если есть бутоны"),
+        "msg_needs_spike": md_escape(f"{feed_name} — только если есть цветонос"),
+        "msg_needs_conditions": md_escape(f"{feed_name} — пока не выполнены условия"),
+        "msg_due": md_escape(f"{feed_name} — {dose}, сделать сегодня"),
+        "msg_wait_prefix": md_escape(f"{feed_name} — {dose}, через "),
+    }
+
+
+def compile_feed(feed: dict, md_escape) -> CompiledFeed:
+    feed_name = feed.get("name", "Подкормка")
+    dose = feed.get("dose", "по инструкции")
+
+    month_mask = 0
+    for month in feed.get("months") or []:
+        month_mask |= 1 << month
+
+    stage_mask = 0
+    for stage in feed.get("onlyStages") or []:
+        stage_mask |= 1 << intern_stage(stage)
+
+    cond_mask = 0
+    conditions = []
+    for cond in feed.get("conditions") or []:
+        bit = CONDITION_BITS.get(str(cond or "").strip().lower(), 0)
+        if bit:
+            cond_mask |= bit
+            conditions.append(bit)
+
+    return CompiledFeed(
+        id=feed.get("id", "feed"),
+        name=feed_name,
+        dose=dose,
+        interval_days=int(feed.get("intervalDays", 999)),
+        month_mask=month_mask or ALL_MONTHS,
+        stage_mask=stage_mask,
+        cond_mask=cond_mask,
+        conditions=tuple(conditions),
+        **feed_messages(str(feed_name), str(dose), md_escape),
+    )
+
+
+def compile_plant(plant: dict, md_escape) -> CompiledPlant:
+    name = plant.get("name", "Без имени")
+    stage = intern_stage(plant.get("stage", ""))
+    feeds = plant.get("feeds", [])
+    if not isinstance(feeds, list):
+        feeds = []
+
+    return CompiledPlant(
+        id=plant.get("id", plant.get("name", "unknown")),
+        name=name,
+        name_md=md_escape(name),
+        water_freq=plant.get("waterFreq", 7),
+        stage=stage,
+        feeding_allowed=stage not in (STAGE_DORMANT, STAGE_RECOVER),
+        flag_mask=build_flag_mask(plant.get("flags")),
+        feeds=tuple(compile_feed(feed, md_escape) for feed in feeds if isinstance(feed, dict)),
+    )
+
+
+def compile_catalog(plants, md_escape) -> tuple:
+    return tuple(compile_plant(plant, md_escape) for plant in plants if isinstance(plant, dict))
@@ -0,0 +1,232 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+from catalog import compile_plant
+from plant_stream import is_jsonl_catalog
+from storage import file_sha256, load_json_file, locked_merge_save
+from validation import catalog_errors, is_non_empty_str, is_validated, mark_validated, print_errors
+
+CATALOG_MANIFEST_FILE = os.getenv("CATALOG_MANIFEST_FILE", "catalog_manifest.json")
+CATALOG_WORKERS = int(os.getenv("CATALOG_WORKERS", "0")) or os.cpu_count() or 1
+CATALOG_POOL_MIN_BYTES = int(os.getenv("CATALOG_POOL_MIN_BYTES", str(1 << 20)))
+CATALOG_SUFFIXES = (".json", ".jsonl")
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def is_catalog_set(path) -> bool:
+    path = str(path)
+    return os.path.isdir(path) or any(char in path for char in "*?[")
+
+
+def catalog_files(path: str) -> list:
+    if os.path.isdir(path):
+        names = (os.path.join(path, name) for name in os.listdir(path))
+    else:
+        names = glob.glob(path)
+    return sorted(
+        os.path.abspath(name) for name in names
+        if name.endswith(CATALOG_SUFFIXES) and os.path.isfile(name)
+    )
+
+
+def file_stat(filepath: str):
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def catalog_stat(path: str):
+    if not is_catalog_set(path):
+        stat = file_stat(path)
+        return None if stat is None else ((path, *stat),)
+    return tuple((filepath, *(file_stat(filepath) or [None, None])) for filepath in catalog_files(path))
+
+
+def parse_catalog(raw: bytes, filepath: str):
+    if not is_jsonl_catalog(filepath):
+        data = json.loads(raw)
+        if isinstance(data, dict):
+            return "$.plants", data.get("plants", [])
+        return "$", data if isinstance(data, list) else []
+
+    plants = []
+    for line_no, line in enumerate(raw.decode("utf-8").splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            plants.append(json.loads(line))
+        except ValueError as e:
+            raise ValueError(f"{filepath}:{line_no}: некорректный JSON — {e}")
+    return "$", plants
+
+
+def load_catalog_file(filepath: str, md_escape) -> dict:
+    result = {"path": filepath, "stat": file_stat(filepath), "sha256": "", "plants": (), "ids": [], "errors": [], "error": None}
+    try:
+        with open(filepath, "rb") as f:
+            raw = f.read()
+        result["sha256"] = hashlib.sha256(raw).hexdigest()
+        root, plants = parse_catalog(raw, filepath)
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    errors = [] if is_validated(result["sha256"]) else catalog_errors(plants, root)
+    if any(index is None for index, _, _ in errors):
+        plants = []
+    invalid = {index for index, _, _ in errors}
+    compiled = []
+    for index, plant in enumerate(plants):
+        if index in invalid:
+            continue
+        compiled.append(compile_plant(plant, md_escape))
+        result["ids"].append([f"{root}[{index}].id", plant["id"]])
+    result["plants"] = tuple(compiled)
+    result["errors"] = errors
+    return result
+
+
+def load_changed(paths: list, md_escape) -> list:
+    size = sum((file_stat(path) or [0, 0])[1] for path in paths)
+    workers = min(CATALOG_WORKERS, len(paths))
+    if workers < 2 or size < CATALOG_POOL_MIN_BYTES:
+        return [load_catalog_file(path, md_escape) for path in paths]
+
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        return list(pool.map(load_catalog_file, paths, [md_escape] * len(paths)))
+
+
+def cross_file_errors(entries: list) -> dict:
+    seen = {}
+    duplicates = {}
+    for entry in entries:
+        for position, (path, plant_id) in enumerate(entry["ids"]):
+            if not is_non_empty_str(plant_id):
+                continue
+            key = plant_id.strip().lower()
+            if key in seen:
+                duplicates.setdefault(entry["path"], []).append((
+                    position, path,
+                    f"дублирующийся id растения '{plant_id}' (уже есть в {os.path.basename(seen[key])})",
+                ))
+            else:
+                seen[key] = entry["path"]
+    return duplicates
+
+
+def save_manifest(entries: list, filepath: str = CATALOG_MANIFEST_FILE):
+    before = load_json_file(filepath, {})
+    after = dict(before)
+    for entry in entries:
+        if entry["stat"] is not None and entry["sha256"]:
+            after[entry["path"]] = {
+                "mtime_ns": entry["stat"][0],
+                "size": entry["stat"][1],
+                "sha256": entry["sha256"],
+                "plants": len(entry["plants"]),
+            }
+    if after != before:
+        locked_merge_save(filepath, before, after)
+
+
+def known_sha256(filepath: str, stat, manifest: dict) -> str:
+    with _loaded_lock:
+        entry = _loaded.get(filepath)
+    if entry is not None and entry["stat"] == stat:
+        return entry["sha256"]
+    known = manifest.get(filepath)
+    if stat is not None and isinstance(known, dict) and [known.get("mtime_ns"), known.get("size")] == stat:
+        return known.get("sha256") or file_sha256(filepath)
+    return file_sha256(filepath)
+
+
+def catalog_signature(path: str) -> str:
+    if not is_catalog_set(path):
+        return file_sha256(path)
+    manifest = load_json_file(CATALOG_MANIFEST_FILE, {})
+    digest = hashlib.sha256()
+    for filepath in catalog_files(path):
+        digest.update(f"{filepath}:{known_sha256(filepath, file_stat(filepath), manifest)};".encode())
+    return f"set:{digest.hexdigest()}"
+
+
+def load_catalog_set(path: str, md_escape, strict: bool = False, persist: bool = True):
+    files = catalog_files(path)
+    if not files:
+        print(f"ERROR: {path}: не найдено ни одного каталога ({', '.join(CATALOG_SUFFIXES)})")
+        if strict:
+            sys.exit(1)
+        return ()
+
+    with _loaded_lock:
+        changed = [filepath for filepath in files if filepath not in _loaded or _loaded[filepath]["stat"] != file_stat(filepath)]
+        if changed:
+            fresh = load_changed(changed, md_escape)
+            for entry in fresh:
+                _loaded[entry["path"]] = entry
+            if persist:
+                save_manifest(fresh)
+        entries = [_loaded[filepath] for filepath in files]
+
+    failed = False
+    duplicates = cross_file_errors(entries)
+    plants = []
+    for entry in entries:
+        if entry["error"]:
+            print(f"ERROR: {entry['path']} не загружен — {entry['error']}")
+            failed = True
+            continue
+        errors = entry["errors"] + [(None, error_path, message) for _, error_path, message in duplicates.get(entry["path"], [])]
+        if errors:
+            print_errors(entry["path"], errors)
+            failed = True
+        if persist and not entry["errors"] and entry["path"] in changed:
+            mark_validated(entry["sha256"])
+        skip = {position for position, _, _ in duplicates.get(entry["path"], [])}
+        plants.extend(plant for position, plant in enumerate(entry["plants"]) if position not in skip)
+
+    if failed:
+        if strict:
+            sys.exit(1)
+        print(f"WARNING: растения с ошибками пропущены, осталось {len(plants)}")
+    return tuple(plants)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Загрузка каталогов растений из папки или по маске")
+    parser.add_argument("path", help="папка с *.json/*.jsonl или маска, например 'rooms/*.json'")
+    parser.add_argument("--strict", action="store_true", help="код 1 при любой ошибке")
+    args = parser.parse_args(argv)
+
+    from send_tasks import md_escape
+
+    started = time.perf_counter()
+    files = catalog_files(args.path)
+    manifest = load_json_file(CATALOG_MANIFEST_FILE, {})
+    modified = sum(
+        1 for filepath in files
+        if [manifest.get(filepath, {}).get("mtime_ns"), manifest.get(filepath, {}).get("size")] != file_stat(filepath)
+    )
+    plants = load_catalog_set(args.path, md_escape, args.strict)
+    print(
+        f"✅ {args.path}: файлов {len(files)} (изменились с прошлой загрузки {modified}, разобраны все), "
+        f"растений {len(plants)}, процессов разбора до {CATALOG_WORKERS}, {time.perf_counter() - started:.2f} с"
+    )
+
+
+if __name__ == "__main__":
+    main()
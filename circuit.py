@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+from storage import load_json_file, save_json_file
+
+CIRCUIT_FILE = os.getenv("CIRCUIT_FILE", "circuits.json")
+CIRCUIT_THRESHOLD = int(os.getenv("CIRCUIT_THRESHOLD", "3"))
+CIRCUIT_COOLDOWN = int(os.getenv("CIRCUIT_COOLDOWN", "3600"))
+
+_circuits = None
+_lock = threading.Lock()
+
+
+class CircuitOpen(RuntimeError):
+    def __init__(self, name: str, open_until: float):
+        self.name = name
+        self.open_until = open_until
+        minutes = max(0, int((open_until - time.time()) // 60))
+        super().__init__(f"{name}: провайдер отключён после серии ошибок, повтор через {minutes} мин")
+
+
+class CircuitCall:
+    def __init__(self, name: str):
+        self.name = name
+        self.settled = False
+        self._lock = threading.Lock()
+
+    def settle(self, ok: bool):
+        with self._lock:
+            if self.settled:
+                return
+            self.settled = True
+        if ok:
+            record_success(self.name)
+        else:
+            record_failure(self.name)
+
+
+def load_circuits() -> dict:
+    global _circuits
+    if _circuits is None:
+        _circuits = load_json_file(CIRCUIT_FILE, {})
+    return _circuits
+
+
+def check_circuit(name: str):
+    with _lock:
+        entry = load_circuits().get(name, {})
+    open_until = entry.get("open_until", 0)
+    if time.time() < open_until:
+        raise CircuitOpen(name, open_until)
+
+
+def circuit_allows(name: str) -> bool:
+    try:
+        check_circuit(name)
+    except CircuitOpen:
+        return False
+    return True
+
+
+def record_success(name: str):
+    with _lock:
+        circuits = load_circuits()
+        if not circuits.get(name, {}).get("failures"):
+            return
+        circuits[name] = {"failures": 0, "open_until": 0}
+        save_json_file(CIRCUIT_FILE, circuits)
+    print(f"{name}: провайдер снова отвечает")
+
+
+def record_failure(name: str):
+    with _lock:
+        circuits = load_circuits()
+        entry = dict(circuits.get(name, {}))
+        entry["failures"] = entry.get("failures", 0) + 1
+        entry["last_failure"] = time.time()
+        opened = entry["failures"] >= CIRCUIT_THRESHOLD
+        if opened:
+            entry["open_until"] = time.time() + CIRCUIT_COOLDOWN
+        circuits[name] = entry
+        save_json_file(CIRCUIT_FILE, circuits)
+    if opened:
+        print(f"{name}: {entry['failures']} ошибок подряд, провайдер отключён на {CIRCUIT_COOLDOWN // 60} мин")
+
@@ -0,0 +1,342 @@
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from ai_client import save_ai_cache
+from batch import DEFAULT_WORKERS, SharedClients, load_manifest
+from catalog_set import catalog_signature, catalog_stat
+from due_index import DUE_INDEX_FILE, build_due_index, index_signature, keep_due, pop_due, reschedule, save_due_index
+from locks import FileLock
+from metrics import Metrics
+from sent_log import SENT_LOG_FILE, SKIP_UNCHANGED, is_unchanged, plan_digest, remember_sent, unchanged_delivery
+from send_tasks import (
+    PLANTS_FILE,
+    RUN_LOCK_FILE,
+    build_ai_cache_key,
+    build_ai_prompt,
+    compute_delta_temp,
+    observe_weather,
+    load_plants,
+    mark_plan_done,
+    parse_iso_dt,
+    plan_garden,
+    render_message,
+    weather_comment_fallback,
+)
+from storage import (
+    DEFAULT_GARDEN,
+    FEED_HISTORY_FILE,
+    HISTORY_FILE,
+    JOURNAL_DIR,
+    LAST_WEATHER_FILE,
+    get_storage,
+    load_json_file,
+    save_json_file,
+)
+from updates import UpdatePoller, care_keyboard
+from weather import save_weather_cache
+
+DAEMON_SEND_AT = os.getenv("DAEMON_SEND_AT", "06:00")
+DAEMON_TZ = os.getenv("DAEMON_TZ", "UTC")
+DAEMON_TICK = float(os.getenv("DAEMON_TICK", "30"))
+DAEMON_FLUSH = float(os.getenv("DAEMON_FLUSH", "300"))
+DAEMON_RETRY = float(os.getenv("DAEMON_RETRY", "600"))
+DAEMON_RETRY_MAX = float(os.getenv("DAEMON_RETRY_MAX", "3600"))
+DAEMON_STATE_FILE = os.getenv("DAEMON_STATE_FILE", "daemon_state.json")
+
+
+def parse_send_at(value) -> int:
+    try:
+        hours, minutes = (int(part) for part in str(value).split(":"))
+    except ValueError:
+        raise ValueError(f"время отправки '{value}' должно быть в формате ЧЧ:ММ")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"время отправки '{value}' вне диапазона 00:00–23:59")
+    return hours * 60 + minutes
+
+
+def parse_tz(value) -> ZoneInfo:
+    try:
+        return ZoneInfo(str(value).strip())
+    except (KeyError, ValueError):
+        raise ValueError(f"часовой пояс '{value}' не найден, ожидается имя вроде Europe/Moscow")
+
+
+def default_garden() -> dict:
+    return {
+        "id": DEFAULT_GARDEN,
+        "chat_id": None,
+        "city": None,
+        "send_at": None,
+        "tz": None,
+        "plants": PLANTS_FILE,
+        "history": HISTORY_FILE,
+        "feed_history": FEED_HISTORY_FILE,
+        "last_weather": LAST_WEATHER_FILE,
+        "due_index": DUE_INDEX_FILE,
+        "journal": JOURNAL_DIR,
+        "lock": RUN_LOCK_FILE,
+        "sent_log": SENT_LOG_FILE,
+    }
+
+
+class GardenState:
+    def __init__(self, garden: dict):
+        self.garden = garden
+        self.send_at = parse_send_at(garden.get("send_at") or DAEMON_SEND_AT)
+        self.tz = parse_tz(garden.get("tz") or DAEMON_TZ)
+        self.storage = get_storage(
+            garden["history"],
+            garden["feed_history"],
+            garden["id"],
+            garden["last_weather"],
+            garden["journal"],
+        )
+        self.plants = ()
+        self.plants_stat = None
+        self.plants_hash = None
+        self.due_index = None
+        self.index_dirty = False
+        self.retry_at = 0.0
+        self.failures = 0
+        self.pending_on = None
+        self.reload_state()
+        self.reload_plants()
+
+    def reload_state(self):
+        self.history = self.storage.load_history()
+        self.feed_history = self.storage.load_feed_history()
+        self.history_signature = self.storage.history_signature()
+        self.due_index = None
+
+    def reload_plants(self) -> bool:
+        filepath = self.garden["plants"]
+        stat_key = catalog_stat(filepath)
+        if not stat_key or stat_key == self.plants_stat:
+            return False
+        self.plants_stat = stat_key
+
+        digest = catalog_signature(filepath)
+        if digest == self.plants_hash:
+            return False
+        plants = load_plants(filepath, strict=None if self.plants_hash is None else False)
+        if not plants:
+            print(f"WARNING: {self.garden['id']}: {filepath} пуст или невалиден, каталог не обновлён")
+            return False
+
+        self.plants = plants
+        self.plants_hash = digest
+        self.due_index = None
+        print(f"🔄 {self.garden['id']}: каталог загружен, растений: {len(plants)}")
+        return True
+
+    def due_slot(self, now_utc: datetime, sent_on):
+        if time.monotonic() < self.retry_at:
+            return None
+        local = now_utc.astimezone(self.tz)
+        today = local.date().isoformat()
+        if local.hour * 60 + local.minute >= self.send_at and sent_on != today:
+            return today
+        if self.pending_on is not None and self.pending_on != sent_on:
+            return self.pending_on
+        return None
+
+    def sent(self):
+        self.failures = 0
+        self.pending_on = None
+        self.retry_at = 0.0
+
+    def retry_later(self, slot: str) -> float:
+        self.failures += 1
+        self.pending_on = slot
+        delay = min(DAEMON_RETRY * 2 ** (self.failures - 1), DAEMON_RETRY_MAX)
+        self.retry_at = time.monotonic() + delay
+        return delay
+
+    def run(self, clients: SharedClients, now_utc: datetime, metrics: Metrics) -> dict:
+        started = time.perf_counter()
+        result = {"id": self.garden["id"], "sent": False, "reminded": 0, "feeds": 0, "error": None}
+        garden_lock = FileLock(self.garden["lock"])
+        if not garden_lock.acquire(blocking=False):
+            result["error"] = "сад уже обрабатывается другим процессом"
+            result["elapsed"] = time.perf_counter() - started
+            return result
+
+        try:
+            if not self.plants:
+                raise ValueError("список растений пуст")
+            metrics.incr("plants_total", len(self.plants))
+
+            with metrics.span("state"):
+                if self.storage.history_signature() != self.history_signature:
+                    print(f"🔄 {self.garden['id']}: история изменена извне, перечитываю")
+                    self.reload_state()
+                last_temp = self.storage.load_last_temp()
+
+            with metrics.span("weather"):
+                weather = clients.weather(self.garden["city"])
+            delta_temp = compute_delta_temp(weather, last_temp)
+            trend = observe_weather(weather, now_utc)
+            self.storage.save_last_temp(weather.get("temp"))
+
+            with metrics.span("rules"):
+                if self.due_index is None:
+                    self.due_index = build_due_index(self.plants, self.history, parse_iso_dt, "")
+                due = pop_due(self.due_index, now_utc.timestamp())
+                plan = plan_garden([self.plants[position] for position in due], self.history, self.feed_history, now_utc)
+            self.index_dirty = True
+            metrics.incr("plants_scanned", len(due))
+            metrics.incr("due_waterings", len(plan["plants_to_remind"]))
+            metrics.incr("due_feeds", len(plan["due_feeds_to_mark"]))
+
+            digest = plan_digest(plan, self.history, self.feed_history)
+            if SKIP_UNCHANGED and is_unchanged(self.garden["sent_log"], self.garden["chat_id"], digest):
+                metrics.incr("messages_unchanged")
+                delivery = unchanged_delivery(self.garden["chat_id"])
+            else:
+                plants_count = len(plan["plants_to_remind"])
+                with metrics.span("ai"):
+                    ai_comment = clients.ai_comment(
+                        build_ai_prompt(weather, now_utc.month, delta_temp, plants_count, trend),
+                        build_ai_cache_key(weather, now_utc.month, delta_temp, plants_count, trend),
+                    )
+                with metrics.span("render"):
+                    comment = ai_comment or weather_comment_fallback(weather, now_utc.month, delta_temp, trend)
+                    message = render_message(plan, weather, comment, now_utc)
+
+                with metrics.span("send"):
+                    delivery = clients.send(message, self.garden["chat_id"], care_keyboard(plan))
+            metrics.incr("send_retries", delivery["retries"])
+            metrics.incr("messages_sent", delivery["sent_parts"])
+
+            if delivery["ok"]:
+                if SKIP_UNCHANGED and not delivery.get("unchanged"):
+                    remember_sent(self.garden["sent_log"], self.garden["chat_id"], digest)
+                with metrics.span("persist"):
+                    mark_plan_done(self.history, self.feed_history, plan, now_utc.isoformat())
+                    self.storage.save_history(self.history)
+                    self.storage.save_feed_history(self.feed_history)
+                    self.history_signature = self.storage.history_signature()
+                result["sent"] = True
+                result["reminded"] = len(plan["plants_to_remind"])
+                result["feeds"] = len(plan["due_feeds_to_mark"])
+                reschedule(self.due_index, self.plants, due, self.history, parse_iso_dt)
+            else:
+                metrics.incr("send_failures")
+                result["error"] = f"сообщение не отправлено: {delivery['error']}"
+                keep_due(self.due_index, due, now_utc.timestamp())
+        except Exception as e:
+            result["error"] = str(e)
+            self.due_index = None
+        finally:
+            garden_lock.release()
+
+        result["elapsed"] = time.perf_counter() - started
+        return result
+
+    def flush(self):
+        if self.index_dirty and self.due_index is not None:
+            signature = index_signature(self.garden["plants"], self.storage)
+            save_due_index(self.due_index, self.garden["due_index"], signature)
+            self.index_dirty = False
+
+    def close(self):
+        self.flush()
+        self.storage.close()
+
+
+class Daemon:
+    def __init__(self, gardens: list, workers: int = DEFAULT_WORKERS, tick: float = DAEMON_TICK, updates: bool = False):
+        self.states = [GardenState(garden) for garden in gardens]
+        self.poller = UpdatePoller(gardens) if updates else None
+        self.clients = SharedClients(workers)
+        self.pool = ThreadPoolExecutor(max_workers=max(workers, 1))
+        self.tick_seconds = tick
+        self.sent_on = load_json_file(DAEMON_STATE_FILE, {})
+        self.stop = threading.Event()
+        self.flushed_at = time.monotonic()
+
+    def tick(self, now_utc: datetime):
+        for state in self.states:
+            state.reload_plants()
+
+        due = []
+        for state in self.states:
+            slot = state.due_slot(now_utc, self.sent_on.get(state.garden["id"]))
+            if slot is not None:
+                due.append((state, slot))
+        if not due:
+            return
+
+        metrics = Metrics()
+        results = list(self.pool.map(lambda item: item[0].run(self.clients, now_utc, metrics), due))
+        for (state, slot), r in zip(due, results):
+            if r["sent"]:
+                self.sent_on[state.garden["id"]] = slot
+                state.sent()
+                print(f"✅ {r['id']}: {r['elapsed']:.3f} с, полив {r['reminded']}, подкормок {r['feeds']}")
+            else:
+                delay = state.retry_later(slot)
+                print(f"❌ {r['id']}: {r['error']}. Повтор через {delay:.0f} с.")
+        save_json_file(DAEMON_STATE_FILE, self.sent_on)
+        metrics.write()
+
+    def flush(self):
+        for state in self.states:
+            state.flush()
+        save_ai_cache()
+        save_weather_cache()
+        self.flushed_at = time.monotonic()
+
+    def request_stop(self, signum=None, frame=None):
+        self.stop.set()
+
+    def serve(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        print(f"🌿 Демон запущен: садов {len(self.states)}, проверка каждые {self.tick_seconds:g} с")
+        if self.poller is not None:
+            threading.Thread(target=self.poller.serve, args=(self.stop,), daemon=True).start()
+            print("📬 Приём нажатий «полил» и «подкормил» включён")
+        try:
+            while not self.stop.is_set():
+                self.tick(datetime.now(timezone.utc))
+                if time.monotonic() - self.flushed_at >= DAEMON_FLUSH:
+                    self.flush()
+                self.stop.wait(self.tick_seconds)
+        finally:
+            self.flush()
+            for state in self.states:
+                state.close()
+            self.pool.shutdown()
+            self.clients.close()
+            if self.poller is not None:
+                self.poller.close()
+            print("🌿 Демон остановлен, состояние сохранено.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Резидентный режим: каталог и история в памяти, отправка по расписанию")
+    parser.add_argument("manifest", nargs="?", help="JSON-файл со списком садов; без него — один сад из текущей папки")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--tick", type=float, default=DAEMON_TICK, help="интервал проверки расписания, секунд")
+    parser.add_argument("--updates", action="store_true", help="принимать нажатия кнопок через getUpdates")
+    args = parser.parse_args(argv)
+
+    try:
+        gardens = load_manifest(args.manifest) if args.manifest else [default_garden()]
+        daemon = Daemon(gardens, args.workers, args.tick, args.updates)
+    except Exception as e:
+        print(f"ERROR: демон не запущен — {e}")
+        sys.exit(1)
+    daemon.serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import json
+import os
+import sys
+from bisect import bisect_right, insort
+from heapq import merge
+
+from catalog_set import catalog_signature
+from storage import atomic_open
+
+DUE_INDEX_FILE = os.getenv("DUE_INDEX_FILE", "due_index.json")
+DAY_SECONDS = 86400
+NEVER_DUE = float(2 ** 62)
+MISSING_HISTORY_DAYS = 999
+CARE_CONFIRM = os.getenv("CARE_CONFIRM", "").strip() not in ("", "0", "false", "no")
+
+
+def last_care_at(entry):
+    if not isinstance(entry, dict):
+        return None
+    if CARE_CONFIRM:
+        return entry.get("last_watered")
+    return entry.get("last_reminded") or entry.get("last_watered")
+
+
+def next_water_ts(plant, history: dict, parse_iso_dt) -> float:
+    last = parse_iso_dt(last_care_at(history.get(plant.id)))
+    if last is None:
+        return 0.0 if plant.water_freq <= MISSING_HISTORY_DAYS else NEVER_DUE
+    return last.timestamp() + plant.water_freq * DAY_SECONDS
+
+
+def build_due_index(plants, history: dict, parse_iso_dt, signature: str) -> dict:
+    entries = sorted(
+        [next_water_ts(plant, history, parse_iso_dt), position]
+        for position, plant in enumerate(plants)
+    )
+    return {"signature": signature, "size": len(plants), "entries": entries}
+
+
+def index_signature(plants_file: str, storage) -> str:
+    return f"{catalog_signature(plants_file)}:{storage.history_signature()}"
+
+
+def load_due_index(filepath: str, plants, history: dict, parse_iso_dt, signature: str) -> dict:
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if (
+            isinstance(index, dict)
+            and index.get("signature") == signature
+            and index.get("size") == len(plants)
+            and isinstance(index.get("entries"), list)
+        ):
+            return index
+        print(f"{filepath}: plants.json или история изменились, индекс перестраивается")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Ошибка чтения {filepath}: {e}")
+    return build_due_index(plants, history, parse_iso_dt, signature)
+
+
+def save_due_index(index: dict, filepath: str = DUE_INDEX_FILE, signature: str = None):
+    if signature is not None:
+        index["signature"] = signature
+    try:
+        with atomic_open(filepath) as f:
+            json.dump(index, f, separators=(",", ":"))
+    except Exception as e:
+        print(f"Ошибка сохранения {filepath}: {e}")
+
+
+def pop_due(index: dict, now_ts: float) -> list:
+    entries = index["entries"]
+    count = bisect_right(entries, [now_ts, float("inf")])
+    positions = sorted(position for _, position in entries[:count])
+    del entries[:count]
+    return positions
+
+
+def reschedule(index: dict, plants, positions, history: dict, parse_iso_dt):
+    insert_entries(index, [[next_water_ts(plants[position], history, parse_iso_dt), position] for position in positions])
+
+
+def keep_due(index: dict, positions, due_ts: float):
+    insert_entries(index, [[due_ts, position] for position in positions])
+
+
+def insert_entries(index: dict, entries: list):
+    scheduled = sorted(entries)
+    if len(scheduled) <= 64:
+        for entry in scheduled:
+            insort(index["entries"], entry)
+    else:
+        index["entries"] = list(merge(index["entries"], scheduled))
+
+
+def main(argv=None):
+    from send_tasks import PLANTS_FILE, load_plants, parse_iso_dt
+    from storage import get_storage
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] != ["rebuild"]:
+        print("Использование: python due_index.py rebuild")
+        sys.exit(2)
+
+    plants = load_plants()
+    if not plants:
+        print("ERROR: Список растений пуст.")
+        sys.exit(1)
+
+    storage = get_storage()
+    try:
+        history = storage.load_history()
+        index = build_due_index(plants, history, parse_iso_dt, index_signature(PLANTS_FILE, storage))
+    finally:
+        storage.close()
+    save_due_index(index)
+    print(f"✅ Индекс пересобран: {len(index['entries'])} растений.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+TELEGRAM_PATH = re.compile(r"^/bot[^/]+/(\w+)$")
+BATCH_ITEM = re.compile(r"^### (g\d+)$", re.MULTILINE)
+DEFAULT_PORTS = {"telegram": 8081, "weather": 8082, "openrouter": 8083}
+URL_ENV = {"telegram": "TELEGRAM_API_URL", "weather": "OPENWEATHER_API_URL", "openrouter": "OPENROUTER_API_URL"}
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_params(self) -> dict:
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length)
+            try:
+                params.update(json.loads(body))
+            except ValueError:
+                params.update(parse_qsl(body.decode("utf-8")))
+        return params
+
+    def reply(self, status: int, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def dispatch(self):
+        params = self.read_params()
+        fake = self.server.fake
+        fault = fake.inject_fault()
+        if fault is not None:
+            status, payload, headers = fault
+        else:
+            status, payload = fake.handle(urlsplit(self.path).path, params)
+            headers = None
+        fake.count(status)
+        self.reply(status, payload, headers)
+
+
+class FakeServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = None,
+    ):
+        self.httpd = ThreadingHTTPServer((host, port), FakeHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.thread = None
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, status: int):
+        with self.stats_lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+    def rate_limited_payload(self) -> dict:
+        return {"error": {"code": 429, "message": "Too Many Requests"}}
+
+    def error_payload(self) -> dict:
+        return {"error": {"code": 503, "message": "Service Unavailable"}}
+
+    def inject_fault(self):
+        if self.latency > 0:
+            time.sleep(self.latency * (0.5 + self.rng.random()))
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return 429, self.rate_limited_payload(), {"Retry-After": str(self.retry_after)}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503, self.error_payload(), None
+        return None
+
+    def handle(self, path: str, params: dict):
+        return 404, {"ok": False, "description": "Not Found"}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeTelegram(FakeServer):
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **faults):
+        super().__init__(host, port, **faults)
+        self.lock = threading.Condition()
+        self.updates = []
+        self.next_update_id = 1
+        self.next_message_id = 1
+        self.messages = []
+        self.answered = []
+
+    def rate_limited_payload(self) -> dict:
+        return {
+            "ok": False,
+            "error_code": 429,
+            "description": f"Too Many Requests: retry after {self.retry_after}",
+            "parameters": {"retry_after": self.retry_after},
+        }
+
+    def error_payload(self) -> dict:
+        return {"ok": False, "error_code": 503, "description": "Service Unavailable"}
+
+    def messages_by_chat(self) -> dict:
+        with self.lock:
+            grouped = {}
+            for message in self.messages:
+                grouped.setdefault(str(message.get("chat_id")), []).append(message)
+            return grouped
+
+    def push_update(self, update: dict) -> int:
+        with self.lock:
+            update = dict(update, update_id=self.next_update_id)
+            self.next_update_id += 1
+            self.updates.append(update)
+            self.lock.notify_all()
+            return update["update_id"]
+
+    def push_callback(self, chat_id, data: str, duplicate: bool = False) -> int:
+        update_id = self.push_update({
+            "callback_query": {
+                "id": f"cq{self.next_update_id}",
+                "data": data,
+                "message": {"message_id": 1, "chat": {"id": chat_id}},
+            },
+        })
+        if duplicate:
+            with self.lock:
+                self.updates.append(dict(self.updates[-1]))
+        return update_id
+
+    def get_updates(self, params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        deadline = time.monotonic() + float(params.get("timeout") or 0)
+        with self.lock:
+            while True:
+                self.updates = [update for update in self.updates if update["update_id"] >= offset]
+                if self.updates or time.monotonic() >= deadline:
+                    return self.updates[:limit]
+                self.lock.wait(deadline - time.monotonic())
+
+    def handle(self, path: str, params: dict):
+        match = TELEGRAM_PATH.match(path)
+        method = match.group(1) if match else None
+        if method == "getUpdates":
+            return 200, {"ok": True, "result": self.get_updates(params)}
+        if method == "sendMessage":
+            with self.lock:
+                message = dict(params, message_id=self.next_message_id)
+                self.next_message_id += 1
+                self.messages.append(message)
+            return 200, {"ok": True, "result": {"message_id": message["message_id"]}}
+        if method == "answerCallbackQuery":
+            with self.lock:
+                self.answered.append(params.get("callback_query_id"))
+            return 200, {"ok": True, "result": True}
+        return super().handle(path, params)
+
+
+class FakeOpenWeather(FakeServer):
+    def weather_for(self, city: str) -> dict:
+        rng = random.Random(city.casefold())
+        return {
+            "name": city,
+            "main": {"temp": round(rng.uniform(-10, 30), 1), "humidity": rng.randint(20, 95)},
+            "weather": [{"description": rng.choice(["ясно", "облачно", "небольшой дождь", "снег"])}],
+            "wind": {"speed": round(rng.uniform(0, 15), 1)},
+        }
+
+    def handle(self, path: str, params: dict):
+        if path.endswith("/weather"):
+            if not params.get("q"):
+                return 400, {"cod": "400", "message": "Nothing to geocode"}
+            return 200, self.weather_for(params["q"])
+        return 404, {"cod": "404", "message": "Not Found"}
+
+
+class FakeOpenRouter(FakeServer):
+    def completion(self, content: str) -> dict:
+        return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+    def handle(self, path: str, params: dict):
+        if not path.endswith("/chat/completions"):
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        messages = params.get("messages") or [{}]
+        prompt = str(messages[-1].get("content") or "")
+        ids = BATCH_ITEM.findall(prompt)
+        if ids:
+            advice = {item_id: f"Совет для {item_id}: проверь влажность грунта." for item_id in ids}
+            return 200, self.completion(json.dumps(advice, ensure_ascii=False))
+        return 200, self.completion("Проверь влажность грунта перед поливом.")
+
+
+FAKES = {"telegram": FakeTelegram, "weather": FakeOpenWeather, "openrouter": FakeOpenRouter}
+
+
+def start_fakes(services=FAKES, host: str = "127.0.0.1", ports=None, **faults) -> dict:
+    ports = ports or {}
+    return {name: FAKES[name](host, ports.get(name, 0), **faults).start() for name in services}
+
+
+def fake_env(fakes: dict) -> dict:
+    return {URL_ENV[name]: fake.url for name, fake in fakes.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальные заглушки внешних API для проверки без сети")
+    parser.add_argument("service", choices=[*FAKES, "all"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="порт (для all — порт Telegram, остальные следом)")
+    parser.add_argument("--latency", type=float, default=0.0, help="средняя задержка ответа, секунд")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429, секунд")
+    parser.add_argument("--chat", default="1", help="chat_id для сгенерированных нажатий")
+    parser.add_argument("--callbacks", nargs="*", default=[], help="callback_data, которые положить в очередь getUpdates")
+    parser.add_argument("--repeat", type=int, default=1, help="сколько раз повторить набор нажатий")
+    args = parser.parse_args(argv)
+
+    services = list(FAKES) if args.service == "all" else [args.service]
+    ports = {}
+    for offset, name in enumerate(services):
+        ports[name] = args.port + offset if args.port else DEFAULT_PORTS[name]
+    fakes = start_fakes(
+        services,
+        args.host,
+        ports,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+    )
+
+    telegram = fakes.get("telegram")
+    if telegram is not None:
+        for _ in range(args.repeat):
+            for data in args.callbacks:
+                telegram.push_callback(args.chat, data)
+    for name, url in fake_env(fakes).items():
+        print(f"export {name}={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for name, fake in fakes.items():
+            fake.stop()
+            print(f"🧪 {name}: ответов по кодам {dict(sorted(fake.stats.items()))}")
+        if telegram is not None:
+            print(f"🧪 Сообщений принято: {len(telegram.messages)}, ответов на нажатия: {len(telegram.answered)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import copy
+import gzip
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+from locks import FileLock
+from storage import JOURNAL_DIR, load_json_file, save_json_file
+
+JOURNAL_COMPACT_BYTES = int(os.getenv("JOURNAL_COMPACT_BYTES", str(1 << 20)))
+JOURNAL_COMPACT_AGE = int(os.getenv("JOURNAL_COMPACT_AGE", str(30 * 86400)))
+JOURNAL_ARCHIVE = os.getenv("JOURNAL_ARCHIVE", "1").strip() not in ("", "0", "false", "no")
+
+
+def file_key(filepath: str):
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def apply_reminded(entry: dict, at: str) -> dict:
+    entry = dict(entry)
+    entry["last_reminded"] = at
+    return entry
+
+
+def apply_watered(entry: dict, at: str) -> dict:
+    entry = dict(entry)
+    entry["last_watered"] = at
+    return entry
+
+
+def apply_fed(entry: dict, at: str) -> dict:
+    entry = dict(entry)
+    entry["last_done"] = at
+    return entry
+
+
+def apply_event(state: dict, event: dict):
+    kind = event.get("type")
+    plant = event.get("plant")
+    history = state["history"]
+    feed_history = state["feed_history"]
+
+    if kind == "reminded":
+        history[plant] = apply_reminded(history.get(plant, {}), event["at"])
+    elif kind == "watered":
+        history[plant] = apply_watered(history.get(plant, {}), event["at"])
+    elif kind == "history_set":
+        history[plant] = dict(event["entry"])
+    elif kind == "history_removed":
+        history.pop(plant, None)
+    elif kind == "fed":
+        feeds = feed_history.setdefault(plant, {})
+        feeds[event["feed"]] = apply_fed(feeds.get(event["feed"], {}), event["at"])
+    elif kind == "feed_set":
+        feed_history.setdefault(plant, {})[event["feed"]] = dict(event["entry"])
+    elif kind == "feed_removed":
+        feed_history.get(plant, {}).pop(event["feed"], None)
+    elif kind == "weather":
+        state["last_weather"] = {"temp": event["temp"], "saved_at": event["at"]}
+
+
+def history_events(old: dict, new: dict) -> list:
+    events = []
+    for plant, entry in new.items():
+        if not isinstance(entry, dict):
+            continue
+        before = old.get(plant, {})
+        if entry == before:
+            continue
+        at = entry.get("last_reminded")
+        watered_at = entry.get("last_watered")
+        if at and apply_reminded(before, at) == entry:
+            events.append({"type": "reminded", "plant": plant, "at": at})
+        elif watered_at and apply_watered(before, watered_at) == entry:
+            events.append({"type": "watered", "plant": plant, "at": watered_at})
+        else:
+            events.append({"type": "history_set", "plant": plant, "entry": dict(entry)})
+    for plant in old:
+        if plant not in new:
+            events.append({"type": "history_removed", "plant": plant})
+    return events
+
+
+def feed_history_events(old: dict, new: dict) -> list:
+    events = []
+    for plant, feeds in new.items():
+        if not isinstance(feeds, dict):
+            continue
+        old_feeds = old.get(plant, {})
+        for feed, entry in feeds.items():
+            if not isinstance(entry, dict):
+                continue
+            before = old_feeds.get(feed, {})
+            if entry == before:
+                continue
+            at = entry.get("last_done")
+            if at and apply_fed(before, at) == entry:
+                events.append({"type": "fed", "plant": plant, "feed": feed, "at": at})
+            else:
+                events.append({"type": "feed_set", "plant": plant, "feed": feed, "entry": dict(entry)})
+        for feed in old_feeds:
+            if feed not in feeds:
+                events.append({"type": "feed_removed", "plant": plant, "feed": feed})
+    for plant, old_feeds in old.items():
+        if plant not in new:
+            for feed in old_feeds:
+                events.append({"type": "feed_removed", "plant": plant, "feed": feed})
+    return events
+
+
+class JournalStorage:
+    def __init__(self, journal_dir=JOURNAL_DIR):
+        self.journal_dir = journal_dir
+        self.snapshot_file = os.path.join(journal_dir, "snapshot.json")
+        self.log_file = os.path.join(journal_dir, "events.jsonl")
+        self.lock_file = f"{self.log_file}.lock"
+        self.archive_dir = os.path.join(journal_dir, "archive")
+        os.makedirs(journal_dir, exist_ok=True)
+        self.state = None
+        self.seq = 0
+        self.history_seq = 0
+        self.snapshot_seq = 0
+        self.snapshot_at = time.time()
+        self.snapshot_stat = None
+        self.log_inode = None
+        self.log_offset = 0
+        self._history_before = None
+        self._feed_before = None
+
+    def replay(self):
+        self.snapshot_stat = file_key(self.snapshot_file)
+        snapshot = load_json_file(self.snapshot_file, {})
+        self.state = {
+            "history": snapshot.get("history", {}),
+            "feed_history": snapshot.get("feed_history", {}),
+            "last_weather": snapshot.get("last_weather", {}),
+        }
+        self.seq = self.snapshot_seq = snapshot.get("seq", 0)
+        self.history_seq = snapshot.get("history_seq", self.seq)
+        self.snapshot_at = snapshot.get("created_at", time.time())
+        self.log_inode = None
+        self.log_offset = 0
+        self.read_tail()
+
+    def read_tail(self):
+        try:
+            with open(self.log_file, "rb") as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if self.log_inode is not None and inode != self.log_inode:
+                    self.log_offset = 0
+                f.seek(self.log_offset)
+                data = f.read()
+        except OSError:
+            return
+        self.log_inode = inode
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                print(f"{self.log_file}: повреждённая запись пропущена")
+                continue
+            if event.get("seq", 0) <= self.seq:
+                continue
+            self.apply(event)
+        self.log_offset += len(complete)
+
+    def sync(self):
+        if self.state is None or file_key(self.snapshot_file) != self.snapshot_stat:
+            self.replay()
+        else:
+            self.read_tail()
+        return self.state
+
+    def apply(self, event: dict):
+        apply_event(self.state, event)
+        self.seq = event["seq"]
+        if event.get("type") != "weather":
+            self.history_seq = self.seq
+
+    def ensure_state(self):
+        if self.state is None:
+            self.replay()
+        return self.state
+
+    def repair_tail(self):
+        try:
+            size = os.path.getsize(self.log_file)
+        except OSError:
+            return
+        if size > self.log_offset:
+            print(f"WARNING: {self.log_file}: недописанная последняя запись ({size - self.log_offset} байт) удалена")
+            with open(self.log_file, "r+b") as f:
+                f.truncate(self.log_offset)
+
+    def append(self, events: list):
+        if not events:
+            return
+        with FileLock(self.lock_file):
+            self.sync()
+            self.repair_tail()
+            lines = []
+            for event in events:
+                event["seq"] = self.seq + 1
+                self.apply(event)
+                lines.append(json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            with open(self.log_file, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                self.log_inode = os.fstat(f.fileno()).st_ino
+            self.log_offset += len(data)
+            self.maybe_compact()
+
+    def load_history(self):
+        history = copy.deepcopy(self.sync()["history"])
+        self._history_before = copy.deepcopy(history)
+        return history
+
+    def save_history(self, history):
+        before = self._history_before if self._history_before is not None else self.ensure_state()["history"]
+        self.append(history_events(before, history))
+        self._history_before = copy.deepcopy(history)
+
+    def load_feed_history(self):
+        feed_history = copy.deepcopy(self.sync()["feed_history"])
+        self._feed_before = copy.deepcopy(feed_history)
+        return feed_history
+
+    def save_feed_history(self, feed_history):
+        before = self._feed_before if self._feed_before is not None else self.ensure_state()["feed_history"]
+        self.append(feed_history_events(before, feed_history))
+        self._feed_before = copy.deepcopy(feed_history)
+
+    def load_last_temp(self):
+        return self.sync()["last_weather"].get("temp")
+
+    def save_last_temp(self, temp):
+        if temp is None:
+            return
+        self.append([{"type": "weather", "temp": temp, "at": datetime.now(timezone.utc).isoformat()}])
+
+    def history_signature(self) -> str:
+        self.sync()
+        return f"journal:{self.history_seq}"
+
+    def maybe_compact(self):
+        if self.log_offset >= JOURNAL_COMPACT_BYTES or time.time() - self.snapshot_at >= JOURNAL_COMPACT_AGE:
+            self.rotate()
+
+    def compact(self):
+        with FileLock(self.lock_file):
+            self.sync()
+            self.repair_tail()
+            self.rotate()
+
+    def rotate(self):
+        state = self.state
+        save_json_file(self.snapshot_file, {
+            "seq": self.seq,
+            "history_seq": self.history_seq,
+            "created_at": time.time(),
+            "history": state["history"],
+            "feed_history": state["feed_history"],
+            "last_weather": state["last_weather"],
+        })
+
+        if os.path.exists(self.log_file):
+            if JOURNAL_ARCHIVE:
+                os.makedirs(self.archive_dir, exist_ok=True)
+                archive_file = os.path.join(
+                    self.archive_dir, f"events-{self.snapshot_seq + 1:010d}-{self.seq:010d}.jsonl.gz"
+                )
+                with open(self.log_file, "rb") as src, gzip.open(archive_file, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            os.remove(self.log_file)
+
+        self.snapshot_seq = self.seq
+        self.snapshot_at = time.time()
+        self.snapshot_stat = file_key(self.snapshot_file)
+        self.log_inode = None
+        self.log_offset = 0
+
+    def close(self):
+        pass
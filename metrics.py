@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from storage import atomic_open
+
+METRICS_FILE = os.getenv("METRICS_FILE", "metrics.json")
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", "metrics.prom")
+PROFILE_FILE = "profile.pstats"
+MEMORY_SNAPSHOT_FILE = "memory.tracemalloc"
+METRIC_PREFIX = "garden_bot"
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.spans[name] = self.spans.get(name, 0.0) + elapsed
+
+    def incr(self, name: str, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "run_seconds": time.perf_counter() - self._started,
+                "spans": dict(self.spans),
+                "counters": dict(self.counters),
+            }
+
+    def to_prometheus(self) -> str:
+        data = self.to_dict()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Время этапа запуска, секунд",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds gauge",
+        ]
+        for stage, seconds in sorted(data["spans"].items()):
+            lines.append(f'{METRIC_PREFIX}_stage_seconds{{stage="{stage}"}} {seconds:.6f}')
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            lines.append(f"{METRIC_PREFIX}_{name} {value}")
+        lines.extend([
+            f"# TYPE {METRIC_PREFIX}_run_seconds gauge",
+            f"{METRIC_PREFIX}_run_seconds {data['run_seconds']:.6f}",
+            f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge",
+            f"{METRIC_PREFIX}_last_run_timestamp_seconds {data['started_at']:.0f}",
+        ])
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_file: str = METRICS_FILE, prom_file: str = METRICS_PROM_FILE):
+        for filepath, content in (
+            (json_file, json.dumps(self.to_dict(), ensure_ascii=False, indent=2)),
+            (prom_file, self.to_prometheus()),
+        ):
+            if not filepath:
+                continue
+            try:
+                with atomic_open(filepath) as f:
+                    f.write(content)
+            except Exception as e:
+                print(f"Ошибка сохранения {filepath}: {e}")
+
+
+@contextmanager
+def profiled(enabled: bool, profile_file: str = PROFILE_FILE, memory_file: str = MEMORY_SNAPSHOT_FILE):
+    if not enabled:
+        yield
+        return
+
+    import cProfile
+    import tracemalloc
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_file)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot.dump(memory_file)
+
+        print(f"Профиль: {profile_file}, снимок памяти: {memory_file}, пик {peak / 1024 / 1024:.1f} МБ")
+        for stat in snapshot.statistics("lineno")[:10]:
+            print(f"  {stat}")
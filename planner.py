@@ -0,0 +1,184 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from due_index import MISSING_HISTORY_DAYS, last_care_at
+from send_tasks import PLANTS_FILE, load_plants, parse_iso_dt
+from storage import get_storage
+
+DEFAULT_DAYS = 30
+ICAL_LINE_LIMIT = 75
+
+
+def days_since(value, now_utc: datetime):
+    last = parse_iso_dt(value)
+    return None if last is None else (now_utc - last).days
+
+
+def first_water_day(plant, history: dict, now_utc: datetime):
+    since = days_since(last_care_at(history.get(plant.id)), now_utc)
+    if since is None:
+        return None if plant.water_freq > MISSING_HISTORY_DAYS else 0
+    return max(0, plant.water_freq - since)
+
+
+def feed_slots(plant, feed_history: dict, now_utc: datetime) -> list:
+    if not plant.feeding_allowed:
+        return []
+    plant_feeds = feed_history.get(plant.id, {})
+    plant_feeds = plant_feeds if isinstance(plant_feeds, dict) else {}
+    slots = []
+    for feed in plant.feeds:
+        if feed.stage_mask and not feed.stage_mask & (1 << plant.stage):
+            continue
+        if feed.cond_mask & ~plant.flag_mask:
+            continue
+        entry = plant_feeds.get(feed.id)
+        done = days_since(entry.get("last_done"), now_utc) if isinstance(entry, dict) else None
+        slots.append([0 if done is None else feed.interval_days - done, feed])
+    return slots
+
+
+def build_calendar(plants, history: dict, feed_history: dict, now_utc: datetime, days: int = DEFAULT_DAYS) -> list:
+    month_bits = [1 << (now_utc + timedelta(days=day)).month for day in range(days)]
+    calendar = [[] for _ in range(days)]
+    for plant in plants:
+        first_day = first_water_day(plant, history, now_utc)
+        if first_day is None:
+            continue
+        watering = (plant, ())
+        slots = feed_slots(plant, feed_history, now_utc)
+        water_days = range(first_day, days, max(plant.water_freq, 1))
+        if not slots:
+            for day in water_days:
+                calendar[day].append(watering)
+            continue
+        for day in water_days:
+            due_feeds = []
+            for slot in slots:
+                feed = slot[1]
+                if day >= slot[0] and feed.month_mask & month_bits[day]:
+                    due_feeds.append(feed)
+                    slot[0] = day + feed.interval_days
+            calendar[day].append((plant, tuple(due_feeds)) if due_feeds else watering)
+    return calendar
+
+
+def calendar_to_json(calendar: list, now_utc: datetime) -> dict:
+    result = []
+    for day, entries in enumerate(calendar):
+        if not entries:
+            continue
+        result.append({
+            "date": (now_utc + timedelta(days=day)).date().isoformat(),
+            "water": [{"id": plant.id, "name": plant.name} for plant, _ in entries],
+            "feed": [
+                {"id": plant.id, "name": plant.name, "feed": feed.id, "feed_name": feed.name, "dose": feed.dose}
+                for plant, due_feeds in entries
+                for feed in due_feeds
+            ],
+        })
+    return {"start": now_utc.isoformat(), "days": len(calendar), "calendar": result}
+
+
+def ical_escape(text) -> str:
+    return (
+        str(text)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def ical_fold(line: str) -> str:
+    encoded = line.encode("utf-8")
+    if len(encoded) <= ICAL_LINE_LIMIT:
+        return line
+    parts = []
+    start = 0
+    limit = ICAL_LINE_LIMIT
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        start = end
+        limit = ICAL_LINE_LIMIT - 1
+    return "\r\n ".join(parts)
+
+
+def calendar_to_ical(calendar: list, now_utc: datetime) -> str:
+    stamp = now_utc.strftime("%Y%m%dT%H%M%SZ")
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//my-garden//planner//RU", "CALSCALE:GREGORIAN"]
+    for day, entries in enumerate(calendar):
+        if not entries:
+            continue
+        date = (now_utc + timedelta(days=day)).date()
+        feeds = [(plant, feed) for plant, due_feeds in entries for feed in due_feeds]
+        summary = f"🌿 Полив: {len(entries)}" + (f", подкормок: {len(feeds)}" if feeds else "")
+        description = [f"💧 {plant.name}" for plant, _ in entries]
+        description.extend(f"🧪 {plant.name}: {feed.name} — {feed.dose}" for plant, feed in feeds)
+        lines.extend([
+            "BEGIN:VEVENT",
+            f"UID:{date.strftime('%Y%m%d')}@my-garden",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{date.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(date + timedelta(days=1)).strftime('%Y%m%d')}",
+            f"SUMMARY:{ical_escape(summary)}",
+            f"DESCRIPTION:{ical_escape(chr(10).join(description))}",
+            "END:VEVENT",
+        ])
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(ical_fold(line) for line in lines) + "\r\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Календарь полива и подкормок на N дней вперёд")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    parser.add_argument("--format", choices=["json", "ical"], default="json")
+    parser.add_argument("--output", help="файл для результата; без него — вывод в консоль")
+    parser.add_argument("--plants", default=PLANTS_FILE)
+    args = parser.parse_args(argv)
+
+    if args.days <= 0:
+        print("ERROR: --days должен быть больше нуля")
+        sys.exit(2)
+
+    plants = load_plants(args.plants)
+    if not plants:
+        print("ERROR: Список растений пуст.")
+        sys.exit(1)
+    storage = get_storage()
+    try:
+        history = storage.load_history()
+        feed_history = storage.load_feed_history()
+    finally:
+        storage.close()
+
+    now_utc = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    calendar = build_calendar(plants, history, feed_history, now_utc, args.days)
+    if args.format == "json":
+        text = json.dumps(calendar_to_json(calendar, now_utc), ensure_ascii=False, indent=2)
+    else:
+        text = calendar_to_ical(calendar, now_utc)
+    elapsed = time.perf_counter() - started
+
+    if not args.output:
+        sys.stdout.write(text if text.endswith("\n") else f"{text}\n")
+        return
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    waterings = sum(len(entries) for entries in calendar)
+    feeds = sum(len(due_feeds) for entries in calendar for _, due_feeds in entries)
+    print(
+        f"✅ {args.output}: {args.days} дн., поливов {waterings}, подкормок {feeds}, "
+        f"растений {len(plants)}, {elapsed * 1000:.0f} мс"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import json
+import re
+import sys
+
+from catalog import compile_plant
+from storage import atomic_open, file_sha256
+from validation import is_non_empty_str, is_validated, mark_validated, plant_errors, print_errors
+
+STREAM_CHUNK = 1 << 16
+JSON_SPACE = " \t\r\n,"
+
+
+def is_jsonl_catalog(filepath: str) -> bool:
+    return str(filepath).endswith(".jsonl")
+
+
+def iter_jsonl(filepath: str):
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{filepath}:{line_no}: некорректный JSON — {e}")
+
+
+def iter_json_array(filepath: str, key: str = "plants"):
+    decoder = json.JSONDecoder()
+    key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    with open(filepath, "r", encoding="utf-8") as f:
+        buf, more = "", True
+        while True:
+            stripped = buf.lstrip()
+            if stripped.startswith("["):
+                pos = len(buf) - len(stripped) + 1
+                break
+            match = key_pattern.search(buf)
+            if match:
+                pos = match.end()
+                break
+            if not more:
+                raise ValueError(f"{filepath}: не найден список '{key}'")
+            chunk = f.read(STREAM_CHUNK)
+            more = bool(chunk)
+            buf += chunk
+
+        while True:
+            while True:
+                while pos < len(buf) and buf[pos] in JSON_SPACE:
+                    pos += 1
+                if pos < len(buf) or not more:
+                    break
+                chunk = f.read(STREAM_CHUNK)
+                more = bool(chunk)
+                buf, pos = buf[pos:] + chunk, 0
+            if pos >= len(buf):
+                raise ValueError(f"{filepath}: неожиданный конец файла")
+            if buf[pos] == "]":
+                return
+
+            while True:
+                try:
+                    item, pos = decoder.raw_decode(buf, pos)
+                    break
+                except ValueError:
+                    if not more:
+                        raise
+                    chunk = f.read(STREAM_CHUNK)
+                    more = bool(chunk)
+                    buf, pos = buf[pos:] + chunk, 0
+            yield item
+            if pos > STREAM_CHUNK:
+                buf, pos = buf[pos:], 0
+
+
+def iter_catalog(filepath: str):
+    if is_jsonl_catalog(filepath):
+        return iter_jsonl(filepath)
+    return iter_json_array(filepath)
+
+
+def scan_catalog(filepath: str, md_escape, keep=None, strict: bool = False, persist: bool = True):
+    digest = file_sha256(filepath)
+    validated = is_validated(digest)
+    root = "$" if is_jsonl_catalog(filepath) else "$.plants"
+    seen_ids = {}
+    errors = []
+    kept = []
+    total = 0
+
+    for index, plant in enumerate(iter_catalog(filepath)):
+        total += 1
+        if not validated:
+            path = f"{root}[{index}]"
+            found = plant_errors(plant, path)
+            if isinstance(plant, dict) and is_non_empty_str(plant.get("id")):
+                plant_id = plant["id"].strip().lower()
+                if plant_id in seen_ids:
+                    found.append((
+                        f"{path}.id",
+                        f"дублирующийся id растения '{plant['id']}' (уже есть в {root}[{seen_ids[plant_id]}])",
+                    ))
+                else:
+                    seen_ids[plant_id] = index
+            if found:
+                errors.extend((index, error_path, message) for error_path, message in found)
+                continue
+
+        compiled = compile_plant(plant, md_escape)
+        if keep is None or keep(compiled):
+            kept.append(compiled)
+
+    if errors:
+        print_errors(filepath, errors)
+        if strict:
+            sys.exit(1)
+        print(f"WARNING: растения с ошибками пропущены, осталось {total - len({index for index, _, _ in errors})}")
+    elif not validated and persist:
+        mark_validated(digest)
+    return kept, total
+
+
+def convert_to_jsonl(source: str, target: str) -> int:
+    count = 0
+    with atomic_open(target) as f:
+        for plant in iter_json_array(source):
+            f.write(json.dumps(plant, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3 or argv[0] != "convert":
+        print("Использование: python plant_stream.py convert plants.json plants.jsonl")
+        sys.exit(2)
+
+    try:
+        count = convert_to_jsonl(argv[1], argv[2])
+    except Exception as e:
+        print(f"ERROR: конвертация не удалась — {e}")
+        sys.exit(1)
+    print(f"✅ {argv[1]} → {argv[2]}: {count} растений.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,162 +1,117 @@
-from telegram_client import send_to_telegram
-from weather import get_weather
-from storage import (
-    load_history,
-    save_history,
-    load_feed_history,
-    save_feed_history,
-    load_last_temp,
-    save_last_temp,
-)
+from telegram_client import deliver_message
+from weather import WEATHER_CIRCUIT, fallback_weather, get_weather, weather_cache_stats
+from storage import STATE_PART, get_storage, owned_plants
 from rules import build_plant_block
-from ai_client import get_ai_comment
-
+from catalog import compile_catalog
+from catalog_set import is_catalog_set, load_catalog_set
+from due_index import (
+    CARE_CONFIRM,
+    DUE_INDEX_FILE,
+    last_care_at,
+    index_signature,
+    load_due_index,
+    save_due_index,
+    pop_due,
+    reschedule,
+)
+from ai_client import AI_CIRCUIT, get_ai_comment, ai_cache_stats
+from circuit import CircuitCall
+from metrics import Metrics, profiled
+from weather_series import record_observation, weather_trend
+from plant_stream import is_jsonl_catalog, scan_catalog
+from locks import FileLock
+from sent_log import SENT_LOG_FILE, SKIP_UNCHANGED, is_unchanged, plan_digest, remember_sent, unchanged_delivery
+from updates import CARE_BUTTONS, care_buttons, care_keyboard
+from validation import catalog_errors, drop_invalid, is_validated, mark_validated, print_errors
+
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from datetime import datetime, timezone
+import argparse
+import hashlib
 import json
 import os
+import re
 import sys
+import threading
+import time
+
+PLANTS_FILE = os.getenv("PLANTS_FILE", "plants.json")
+RUN_DEADLINE = float(os.getenv("RUN_DEADLINE", "45"))
+WEATHER_SLOT = float(os.getenv("WEATHER_SLOT", "10"))
+AI_SLOT = float(os.getenv("AI_SLOT", "8"))
+SEND_RESERVE = float(os.getenv("SEND_RESERVE", "15"))
+RUN_LOCK_FILE = os.getenv("RUN_LOCK_FILE", "send_tasks.lock")
+PLANTS_STRICT = os.getenv("PLANTS_STRICT", "").strip() not in ("", "0", "false", "no")
+RULES_ENGINE = os.getenv("RULES_ENGINE", "python").strip().lower()
+MD_SPECIAL = re.compile(r"[\\_*\[\]()~`>#+\-=|{}.!]")
+
 
-PLANTS_FILE = "plants.json"
-VALID_STAGES = {"foliage", "bloom", "dormant", "recover", "покой", "восстановление"}
-VALID_CONDITIONS = {"buds", "flower_spike", "active_growth"}
+def md_escape_char(match) -> str:
+    return "\\" + match.group()
 
 
 def md_escape(text) -> str:
     if text is None:
         return ""
-    s = str(text)
-    s = s.replace("\\", "\\\\")
-    for char in '_*[]()~`>#+-=|{}.!':
-        s = s.replace(char, f'\\{char}')
-    return s
+    return MD_SPECIAL.sub(md_escape_char, str(text))
 
 
 def check_file_exists(filepath):
-    if not os.path.exists(filepath):
+    if not os.path.exists(filepath) and not is_catalog_set(filepath):
         print(f"ERROR: Файл не найден: {filepath}")
         sys.exit(1)
 
 
-def validate_feed(plant_name: str, feed: dict, index: int):
-    if not isinstance(feed, dict):
-        raise ValueError(f"{plant_name}: feeds[{index}] должен быть объектом")
-
-    feed_id = feed.get("id")
-    if not isinstance(feed_id, str) or not feed_id.strip():
-        raise ValueError(f"{plant_name}: feeds[{index}].id обязателен и должен быть строкой")
-
-    feed_name = feed.get("name")
-    if not isinstance(feed_name, str) or not feed_name.strip():
-        raise ValueError(f"{plant_name}: feeds[{index}].name обязателен и должен быть строкой")
-
-    interval_days = feed.get("intervalDays")
-    if not isinstance(interval_days, int) or interval_days <= 0:
-        raise ValueError(f"{plant_name}: feeds[{index}].intervalDays должен быть целым числом > 0")
-
-    months = feed.get("months", [])
-    if months is not None:
-        if not isinstance(months, list):
-            raise ValueError(f"{plant_name}: feeds[{index}].months должен быть списком")
-        for month in months:
-            if not isinstance(month, int) or month < 1 or month > 12:
-                raise ValueError(f"{plant_name}: feeds[{index}].months содержит недопустимый месяц {month}")
-
-    only_stages = feed.get("onlyStages", [])
-    if only_stages is not None:
-        if not isinstance(only_stages, list):
-            raise ValueError(f"{plant_name}: feeds[{index}].onlyStages должен быть списком")
-        for stage in only_stages:
-            if not isinstance(stage, str) or not stage.strip():
-                raise ValueError(f"{plant_name}: feeds[{index}].onlyStages содержит некорректное значение")
-
-    conditions = feed.get("conditions", [])
-    if conditions is not None:
-        if not isinstance(conditions, list):
-            raise ValueError(f"{plant_name}: feeds[{index}].conditions должен быть списком")
-        for cond in conditions:
-            if not isinstance(cond, str) or not cond.strip():
-                raise ValueError(f"{plant_name}: feeds[{index}].conditions содержит некорректное значение")
-            if cond.strip().lower() not in VALID_CONDITIONS:
-                raise ValueError(f"{plant_name}: feeds[{index}].conditions содержит неизвестное условие '{cond}'")
-
-
-def validate_plant(plant: dict, index: int):
-    if not isinstance(plant, dict):
-        raise ValueError(f"plants[{index}] должен быть объектом")
-
-    plant_id = plant.get("id")
-    if not isinstance(plant_id, str) or not plant_id.strip():
-        raise ValueError(f"plants[{index}].id обязателен и должен быть строкой")
-
-    name = plant.get("name")
-    if not isinstance(name, str) or not name.strip():
-        raise ValueError(f"plants[{index}].name обязателен и должен быть строкой")
-
-    water_freq = plant.get("waterFreq")
-    if not isinstance(water_freq, int) or water_freq <= 0:
-        raise ValueError(f"{name}: waterFreq должен быть целым числом > 0")
-
-    stage = plant.get("stage")
-    if not isinstance(stage, str) or not stage.strip():
-        raise ValueError(f"{name}: stage обязателен и должен быть строкой")
-    if stage.strip().lower() not in VALID_STAGES:
-        raise ValueError(f"{name}: неизвестная стадия '{stage}'")
-
-    flags = plant.get("flags", {})
-    if flags is not None and not isinstance(flags, dict):
-        raise ValueError(f"{name}: flags должен быть объектом")
-
-    feeds = plant.get("feeds", [])
-    if feeds is None:
-        feeds = []
-    if not isinstance(feeds, list):
-        raise ValueError(f"{name}: feeds должен быть списком")
-
-    seen_feed_ids = set()
-    for feed_index, feed in enumerate(feeds):
-        validate_feed(name, feed, feed_index)
-        feed_id = feed.get("id", "").strip().lower()
-        if feed_id in seen_feed_ids:
-            raise ValueError(f"{name}: дублирующийся id подкормки '{feed.get('id')}'")
-        seen_feed_ids.add(feed_id)
-
-
-def validate_plants(plants):
-    if not isinstance(plants, list):
-        raise ValueError("plants.json должен содержать список растений")
-
-    seen_ids = set()
-    for index, plant in enumerate(plants):
-        validate_plant(plant, index)
-        plant_id = plant["id"].strip().lower()
-        if plant_id in seen_ids:
-            raise ValueError(f"Дублирующийся id растения '{plant['id']}'")
-        seen_ids.add(plant_id)
-
-
-def load_plants():
+def load_plants(filepath=PLANTS_FILE, strict=None, persist: bool = True):
+    strict = PLANTS_STRICT if strict is None else strict
+    if is_catalog_set(filepath):
+        return load_catalog_set(filepath, md_escape, strict, persist)
+    if is_jsonl_catalog(filepath):
+        try:
+            return tuple(scan_catalog(filepath, md_escape, strict=strict, persist=persist)[0])
+        except (OSError, ValueError) as e:
+            print(f"ERROR: {filepath} не загружен — {e}")
+            if strict:
+                sys.exit(1)
+            return []
+
     try:
-        with open(PLANTS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            plants = data
-        elif isinstance(data, dict):
-            plants = data.get("plants", [])
-            if not plants:
-                print("WARNING: plants.json — словарь без ключа 'plants'")
-        else:
-            plants = []
-        validate_plants(plants)
-        return plants
+        with open(filepath, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
     except Exception as e:
         print(f"ERROR: plants.json не загружен — {e}")
+        if strict:
+            sys.exit(1)
         return []
 
+    root = "$"
+    if isinstance(data, dict):
+        root = "$.plants"
+        plants = data.get("plants", [])
+        if not plants:
+            print("WARNING: plants.json — словарь без ключа 'plants'")
+    elif isinstance(data, list):
+        plants = data
+    else:
+        plants = []
+
+    digest = hashlib.sha256(raw).hexdigest()
+    if not is_validated(digest):
+        errors = catalog_errors(plants, root)
+        if errors:
+            print_errors(filepath, errors)
+            if strict:
+                sys.exit(1)
+            plants = drop_invalid(plants, errors)
+            print(f"WARNING: растения с ошибками пропущены, осталось {len(plants)}")
+        elif persist:
+            mark_validated(digest)
+    return compile_catalog(plants, md_escape)
+
 
 def get_last_event_ts(entry: dict):
-    if not isinstance(entry, dict):
-        return None
-    return entry.get("last_reminded") or entry.get("last_watered")
+    return last_care_at(entry)
 
 
 def parse_iso_dt(value: str):
@@ -171,13 +126,13 @@ def parse_iso_dt(value: str):
         return None
 
 
-def days_since_last_reminder(plant_id: str, history: dict) -> int:
+def days_since_last_reminder(plant_id: str, history: dict, now: datetime = None) -> int:
     entry = history.get(plant_id, {})
     last = get_last_event_ts(entry)
     if not last:
         return 999
     try:
-        now = datetime.now(timezone.utc)
+        now = now or datetime.now(timezone.utc)
         last_dt = parse_iso_dt(last)
         if last_dt is None:
             return 999
@@ -187,17 +142,27 @@ def days_since_last_reminder(plant_id: str, history: dict) -> int:
         return 999
 
 
-def weather_comment_fallback(weather, month, delta_temp=None):
+def weather_comment_fallback(weather, month, delta_temp=None, trend=None):
     if not weather.get("available"):
         return "Погода недоступна — ориентируйся на сухость грунта и состояние листьев."
 
     temp = weather.get("temp", 0)
     wind = weather.get("wind", 0)
+    trend = trend or {}
 
     if delta_temp is not None and abs(delta_temp) >= 8:
         direction = "потепление" if delta_temp > 0 else "похолодание"
         return f"Резкое {direction} ({delta_temp:+}°C)."
 
+    temp_change = trend.get("temp_change")
+    if temp_change is not None and abs(temp_change) >= 8:
+        direction = "теплеет" if temp_change > 0 else "холодает"
+        return f"За последние дни заметно {direction} ({temp_change:+.0f}°C) — подстрой полив."
+
+    hum_mean = trend.get("hum_mean")
+    if hum_mean is not None and trend.get("samples", 0) >= 3 and hum_mean <= 30:
+        return "Несколько дней сухой воздух — опрыскивай листья и проверяй грунт чаще."
+
     if wind >= 12:
         return "Сильный ветер — растения теряют влагу быстрее."
 
@@ -215,7 +180,7 @@ def build_weather_line(weather):
     return f"🌡 {md_escape(str(weather['temp']))}°C \\| 💧 {md_escape(str(weather['hum']))}%\n"
 
 
-def build_ai_prompt(weather, month, delta_temp, plants_count):
+def build_ai_prompt(weather, month, delta_temp, plants_count, trend=None):
     parts = [
         f"Месяц: {month}",
         f"Температура: {weather.get('temp')}",
@@ -226,92 +191,362 @@ def build_ai_prompt(weather, month, delta_temp, plants_count):
     ]
     if delta_temp is not None:
         parts.append(f"Изменение температуры к прошлому запуску: {delta_temp:+}°C")
+    trend = trend or {}
+    if trend.get("temp_mean") is not None:
+        parts.append(f"Средняя температура за 3 дня: {trend['temp_mean']}°C")
+    if trend.get("temp_change") is not None:
+        parts.append(f"Изменение температуры за 3 дня: {trend['temp_change']:+}°C")
+    if trend.get("hum_mean") is not None:
+        parts.append(f"Средняя влажность за 3 дня: {trend['hum_mean']}%")
     parts.append("Дай короткий практический совет по поливу/уходу для домашнего сада на сегодня.")
     return "\n".join(parts)
 
 
-def main():
-    check_file_exists(PLANTS_FILE)
-
-    plants = load_plants()
-    if not plants:
-        print("ERROR: Список растений пуст.")
-        return
+def bucket_value(value, step):
+    if value is None:
+        return None
+    return int(value // step * step)
+
+
+def bucket_plants_count(count: int) -> str:
+    if count <= 0:
+        return "0"
+    if count <= 3:
+        return "1-3"
+    if count <= 9:
+        return "4-9"
+    return "10+"
+
+
+def build_ai_cache_key(weather, month, delta_temp, plants_count, trend=None) -> str:
+    desc = " ".join(str(weather.get("desc") or "").split()).casefold()
+    trend = trend or {}
+    return "|".join(str(part) for part in (
+        month,
+        bucket_value(weather.get("temp"), 2),
+        bucket_value(weather.get("hum"), 10),
+        bucket_value(weather.get("wind"), 2),
+        desc,
+        bucket_value(delta_temp, 2),
+        bucket_plants_count(plants_count),
+        bucket_value(trend.get("temp_mean"), 2),
+        bucket_value(trend.get("temp_change"), 2),
+        bucket_value(trend.get("hum_mean"), 10),
+    ))
+
+
+def observe_weather(weather: dict, now_utc: datetime) -> dict:
+    try:
+        record_observation(weather, now_utc.timestamp())
+        return weather_trend(weather.get("city"), now_utc.timestamp())
+    except Exception as e:
+        print(f"Ошибка ряда погоды: {e}")
+        return {}
 
-    history = load_history()
-    feed_history = load_feed_history()
-    weather = get_weather()
-    last_temp = load_last_temp()
 
+def compute_delta_temp(weather, last_temp):
     current_temp = weather.get("temp")
-    delta_temp = None
     if current_temp is not None and last_temp is not None:
-        delta_temp = current_temp - last_temp
+        return current_temp - last_temp
+    return None
 
-    save_last_temp(current_temp)
 
-    now_utc = datetime.now(timezone.utc)
-    now_iso = now_utc.isoformat()
-    today_str = now_utc.strftime("%d.%m")
+_numpy_missing_reported = False
 
-    text_parts = [f"🌿 *ПЛАН САДА — {md_escape(today_str)}*\n"]
-    text_parts.append(build_weather_line(weather))
 
-    plants_to_remind = []
-    due_feeds_to_mark = []
+def vector_engine(rules_engine: str = None):
+    global _numpy_missing_reported
+    if (rules_engine or RULES_ENGINE) != "numpy":
+        return None
+    import vector_rules
+    if vector_rules.np is None:
+        if not _numpy_missing_reported:
+            print("RULES_ENGINE=numpy: numpy не установлен, сроки считаются через rules.py")
+            _numpy_missing_reported = True
+        return None
+    return vector_rules
 
-    for plant in plants:
-        if not isinstance(plant, dict):
-            continue
 
-        plant_id = plant.get("id", plant.get("name", "unknown"))
-        water_freq = plant.get("waterFreq", 7)
+def select_due_plants(plants, history: dict, now_utc: datetime, rules_engine: str = None) -> list:
+    engine = vector_engine(rules_engine)
+    if engine is not None and plants:
+        return [plants[position] for position in engine.due_plant_positions(plants, history, now_utc, parse_iso_dt)]
+    return [plant for plant in plants if days_since_last_reminder(plant.id, history, now_utc) >= plant.water_freq]
 
-        if days_since_last_reminder(plant_id, history) < water_freq:
-            continue
 
-        block, due_feeds = build_plant_block(plant, feed_history, now_utc, md_escape, parse_iso_dt)
-        plants_to_remind.append(plant_id)
-        text_parts.append(block)
-        text_parts.append("\n\n")
+def plan_garden(plants, history: dict, feed_history: dict, now_utc: datetime, rules_engine: str = None) -> dict:
+    blocks = []
+    buttons = []
+    plants_to_remind = []
+    due_feeds_to_mark = []
+
+    for plant in select_due_plants(plants, history, now_utc, rules_engine):
+        block, due_feeds = build_plant_block(plant, feed_history, now_utc, parse_iso_dt)
+        plants_to_remind.append(plant.id)
+        blocks.append(block)
+        if CARE_BUTTONS:
+            buttons.append(care_buttons(plant, due_feeds))
 
         for feed_id in due_feeds:
             if feed_id:
-                due_feeds_to_mark.append((plant_id, feed_id))
+                due_feeds_to_mark.append((plant.id, feed_id))
+
+    return {
+        "blocks": blocks,
+        "buttons": buttons,
+        "plants_to_remind": plants_to_remind,
+        "due_feeds_to_mark": due_feeds_to_mark,
+    }
+
+
+def render_message(plan: dict, weather, comment, now_utc: datetime) -> str:
+    today_str = now_utc.strftime("%d.%m")
 
-    ai_comment = get_ai_comment(
-        build_ai_prompt(weather, now_utc.month, delta_temp, len(plants_to_remind))
-    )
-    comment = ai_comment or weather_comment_fallback(weather, now_utc.month, delta_temp)
+    text_parts = [f"🌿 *ПЛАН САДА — {md_escape(today_str)}*\n"]
+    text_parts.append(build_weather_line(weather))
     if comment:
-        text_parts.insert(2, f"🤖 _{md_escape(comment)}_\n\n")
+        text_parts.append(f"🤖 _{md_escape(comment)}_\n\n")
 
-    if not plants_to_remind:
+    for block in plan["blocks"]:
+        text_parts.append(block)
+        text_parts.append("\n\n")
+
+    if not plan["plants_to_remind"]:
         text_parts.append("✅ Полив никому не требуется\\. Отдыхаем\\!")
 
-    message = "".join(text_parts).rstrip()
-
-    if send_to_telegram(message):
-        for pid in plants_to_remind:
-            if pid not in history or not isinstance(history[pid], dict):
-                history[pid] = {}
-            history[pid]["last_reminded"] = now_iso
-            history[pid].pop("last_watered", None)
-
-        for plant_id, feed_id in due_feeds_to_mark:
-            if plant_id not in feed_history or not isinstance(feed_history[plant_id], dict):
-                feed_history[plant_id] = {}
-            if feed_id not in feed_history[plant_id] or not isinstance(feed_history[plant_id][feed_id], dict):
-                feed_history[plant_id][feed_id] = {}
-            feed_history[plant_id][feed_id]["last_done"] = now_iso
-
-        save_history(history)
-        save_feed_history(feed_history)
-        print(f"✅ Готово. Напоминаний по поливу: {len(plants_to_remind)}.")
-        print(f"✅ Отмечено подкормок как выполненных: {len(due_feeds_to_mark)}.")
+    return "".join(text_parts).rstrip()
+
+
+def mark_plan_done(history: dict, feed_history: dict, plan: dict, now_iso: str):
+    for pid in plan["plants_to_remind"]:
+        if pid not in history or not isinstance(history[pid], dict):
+            history[pid] = {}
+        history[pid]["last_reminded"] = now_iso
+
+    if CARE_CONFIRM:
+        return
+
+    for plant_id, feed_id in plan["due_feeds_to_mark"]:
+        if plant_id not in feed_history or not isinstance(feed_history[plant_id], dict):
+            feed_history[plant_id] = {}
+        if feed_id not in feed_history[plant_id] or not isinstance(feed_history[plant_id][feed_id], dict):
+            feed_history[plant_id][feed_id] = {}
+        feed_history[plant_id][feed_id]["last_done"] = now_iso
+
+
+def start_background(fn, *args, **kwargs) -> Future:
+    future = Future()
+
+    def target():
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+
+def result_within(future: Future, timeout: float, default):
+    try:
+        return future.result(timeout=max(timeout, 0))
+    except FutureTimeout:
+        return default
+
+
+def slot_seconds(deadline: float, slot: float) -> float:
+    return min(slot, deadline - time.monotonic() - SEND_RESERVE)
+
+
+def stream_due_plants(filepath: str, history: dict, now_utc: datetime, strict=None, persist: bool = True):
+    strict = PLANTS_STRICT if strict is None else strict
+    try:
+        return scan_catalog(
+            filepath,
+            md_escape,
+            keep=lambda plant: days_since_last_reminder(plant.id, history, now_utc) >= plant.water_freq,
+            strict=strict,
+            persist=persist,
+        )
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {filepath} не загружен — {e}")
+        if strict:
+            sys.exit(1)
+        return [], 0
+
+
+def run(metrics: Metrics, strict: bool = None, dry_run: bool = False):
+    check_file_exists(PLANTS_FILE)
+    deadline = time.monotonic() + RUN_DEADLINE
+    streaming = is_jsonl_catalog(PLANTS_FILE) and not is_catalog_set(PLANTS_FILE)
+    weather_call = CircuitCall(WEATHER_CIRCUIT)
+    weather_future = None if dry_run else start_background(get_weather, call=weather_call)
+
+    if not streaming:
+        with metrics.span("plants"):
+            plants = load_plants(PLANTS_FILE, strict=strict, persist=not dry_run)
+        if not plants:
+            print("ERROR: Список растений пуст.")
+            return
+        metrics.incr("plants_total", len(plants))
+
+    storage = get_storage(part=STATE_PART)
+    if not streaming:
+        plants = owned_plants(storage, plants)
+    with metrics.span("state"):
+        history = storage.load_history()
+        feed_history = storage.load_feed_history()
+        last_temp = storage.load_last_temp()
+
+    now_utc = datetime.now(timezone.utc)
+    if streaming:
+        with metrics.span("plants"):
+            due_plants, total = stream_due_plants(PLANTS_FILE, history, now_utc, strict, not dry_run)
+            due_plants = owned_plants(storage, due_plants)
+        if not total:
+            print("ERROR: Список растений пуст.")
+            storage.close()
+            return
+        metrics.incr("plants_total", total)
+
+    if dry_run:
+        weather = fallback_weather()
+        trend = {}
+    else:
+        with metrics.span("weather"):
+            weather = result_within(weather_future, slot_seconds(deadline, WEATHER_SLOT), None)
+    if weather is None:
+        print(f"Погода: нет ответа за {WEATHER_SLOT:g} с, используется запасной вариант")
+        metrics.incr("weather_timeouts")
+        weather_call.settle(False)
+        weather = fallback_weather()
+    delta_temp = compute_delta_temp(weather, last_temp)
+    if not dry_run:
+        trend = observe_weather(weather, now_utc)
+        storage.save_last_temp(weather.get("temp"))
+
+    with metrics.span("rules"):
+        if streaming:
+            due_index = None
+            scanned = total
+        else:
+            signature = index_signature(PLANTS_FILE, storage)
+            due_index = load_due_index(DUE_INDEX_FILE, plants, history, parse_iso_dt, signature)
+            due = pop_due(due_index, now_utc.timestamp())
+            due_plants = [plants[position] for position in due]
+            scanned = len(due)
+        plan = plan_garden(due_plants, history, feed_history, now_utc)
+    metrics.incr("plants_scanned", scanned)
+    metrics.incr("due_waterings", len(plan["plants_to_remind"]))
+    metrics.incr("due_feeds", len(plan["due_feeds_to_mark"]))
+
+    if dry_run:
+        comment = weather_comment_fallback(weather, now_utc.month, delta_temp, trend)
+        print(render_message(plan, weather, comment, now_utc))
+        storage.close()
+        return
+
+    chat_id = os.getenv("TELEGRAM_CHAT_ID")
+    digest = plan_digest(plan, history, feed_history)
+    if SKIP_UNCHANGED and is_unchanged(SENT_LOG_FILE, chat_id, digest):
+        metrics.incr("messages_unchanged")
+        delivery = unchanged_delivery(chat_id)
     else:
+        plants_count = len(plan["plants_to_remind"])
+        ai_call = CircuitCall(AI_CIRCUIT)
+        with metrics.span("ai"):
+            ai_future = start_background(
+                get_ai_comment,
+                build_ai_prompt(weather, now_utc.month, delta_temp, plants_count, trend),
+                cache_key=build_ai_cache_key(weather, now_utc.month, delta_temp, plants_count, trend),
+                call=ai_call,
+            )
+            ai_comment = result_within(ai_future, slot_seconds(deadline, AI_SLOT), None)
+        if not ai_future.done():
+            print(f"AI: нет ответа за {AI_SLOT:g} с, используется локальный совет")
+            metrics.incr("ai_timeouts")
+            ai_call.settle(False)
+        ai_stats = ai_cache_stats()
+        weather_stats = weather_cache_stats()
+        metrics.incr("ai_cache_hits", ai_stats["hits"] + ai_stats["negative_hits"])
+        metrics.incr("ai_cache_misses", ai_stats["misses"])
+        metrics.incr("weather_cache_hits", weather_stats["hits"])
+        metrics.incr("weather_cache_misses", weather_stats["misses"])
+        if ai_stats["hits"] or ai_stats["negative_hits"]:
+            print(f"AI cache: попадание, сэкономлено {ai_stats['saved_seconds']:.2f} с")
+
+        with metrics.span("render"):
+            comment = ai_comment or weather_comment_fallback(weather, now_utc.month, delta_temp, trend)
+            message = render_message(plan, weather, comment, now_utc)
+
+        with metrics.span("send"):
+            delivery = deliver_message(message, deadline=deadline, reply_markup=care_keyboard(plan))
+    metrics.incr("send_retries", delivery["retries"])
+    metrics.incr("messages_sent", delivery["sent_parts"])
+
+    if delivery["ok"]:
+        if delivery.get("unchanged"):
+            print("⏸ План не изменился с прошлой отправки, сообщение не отправлялось.")
+        else:
+            print(f"✅ Сообщение отправлено! Частей: {delivery['parts']}, повторов: {delivery['retries']}.")
+            if SKIP_UNCHANGED:
+                remember_sent(SENT_LOG_FILE, chat_id, digest)
+        with metrics.span("persist"):
+            mark_plan_done(history, feed_history, plan, now_utc.isoformat())
+            storage.save_history(history)
+            storage.save_feed_history(feed_history)
+            if due_index is not None:
+                reschedule(due_index, plants, due, history, parse_iso_dt)
+                save_due_index(due_index, DUE_INDEX_FILE, index_signature(PLANTS_FILE, storage))
+        print(f"✅ Готово. Напоминаний по поливу: {len(plan['plants_to_remind'])}.")
+        if CARE_CONFIRM:
+            print(f"✅ Подкормок ждут подтверждения кнопкой: {len(plan['due_feeds_to_mark'])}.")
+        else:
+            print(f"✅ Отмечено подкормок как выполненных: {len(plan['due_feeds_to_mark'])}.")
+    else:
+        metrics.incr("send_failures")
+        print(f"❌ Ошибка Telegram: {delivery['error']}")
+        if delivery["sent_parts"]:
+            print(f"❌ Отправлено частей: {delivery['sent_parts']} из {delivery['parts']}.")
         print("❌ Сообщение не отправлено. История полива и подкормок не обновлялась.")
 
+    storage.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ежедневный план сада в Telegram")
+    parser.add_argument("--profile", action="store_true", help="сохранить профиль cProfile и снимок tracemalloc")
+    parser.add_argument("--strict", action="store_true", default=None, help="завершиться с ошибкой, если plants.json невалиден")
+    parser.add_argument("--validate-only", action="store_true", help="только проверить plants.json и выйти")
+    parser.add_argument("--dry-run", action="store_true", help="вывести сообщение без сети и без записи истории")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.validate_only:
+        check_file_exists(PLANTS_FILE)
+        plants = load_plants(PLANTS_FILE, strict=True)
+        if not plants:
+            print("ERROR: Список растений пуст.")
+            sys.exit(1)
+        print(f"✅ {PLANTS_FILE}: растений {len(plants)}, ошибок нет.")
+        return
+
+    if args.dry_run:
+        run(Metrics(), args.strict, dry_run=True)
+        return
+
+    run_lock = FileLock(RUN_LOCK_FILE)
+    if not run_lock.acquire(blocking=False):
+        print("WARNING: предыдущий запуск ещё не завершён, этот пропущен, чтобы не задвоить отправку.")
+        return
+
+    metrics = Metrics()
+    try:
+        with profiled(args.profile):
+            run(metrics, args.strict)
+    finally:
+        metrics.write()
+        run_lock.release()
+
 
 if __name__ == "__main__":
     main()
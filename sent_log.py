@@ -0,0 +1,33 @@
+import hashlib
+import json
+import os
+
+from locks import FileLock
+from storage import load_json_file, save_json_file
+
+SKIP_UNCHANGED = os.getenv("SKIP_UNCHANGED", "").strip() not in ("", "0", "false", "no")
+SENT_LOG_FILE = os.getenv("SENT_LOG_FILE", "sent_log.json")
+
+
+def plan_digest(plan: dict, history: dict, feed_history: dict) -> str:
+    state = [[plant_id, history.get(plant_id)] for plant_id in plan["plants_to_remind"]]
+    for plant_id, feed_id in plan["due_feeds_to_mark"]:
+        plant_feeds = feed_history.get(plant_id)
+        state.append([plant_id, feed_id, plant_feeds.get(feed_id) if isinstance(plant_feeds, dict) else None])
+    payload = json.dumps([plan["blocks"], plan["buttons"], state], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_unchanged(filepath: str, chat_id, digest: str) -> bool:
+    return load_json_file(filepath, {}).get(str(chat_id)) == digest
+
+
+def remember_sent(filepath: str, chat_id, digest: str):
+    with FileLock(f"{filepath}.lock"):
+        sent = load_json_file(filepath, {})
+        sent[str(chat_id)] = digest
+        save_json_file(filepath, sent)
+
+
+def unchanged_delivery(chat_id) -> dict:
+    return {"chat_id": chat_id, "ok": True, "unchanged": True, "parts": 0, "sent_parts": 0, "retries": 0, "error": None}
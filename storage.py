@@ -1,10 +1,45 @@
+import argparse
+import copy
+import hashlib
 import json
 import os
+import sys
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
+from locks import FileLock, parse_shard, shard_of
+
 LAST_WEATHER_FILE = "last_weather.json"
 HISTORY_FILE = "history.json"
 FEED_HISTORY_FILE = "feed_history.json"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").strip().lower() or "json"
+STORAGE_DB_FILE = os.getenv("STORAGE_DB", "garden.db")
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "journal")
+STATE_DIR = os.getenv("STATE_DIR", "state")
+STATE_SHARDS = int(os.getenv("STATE_SHARDS", "16"))
+STATE_PART = os.getenv("STATE_PART", "").strip() or None
+DEFAULT_GARDEN = "default"
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    garden TEXT NOT NULL,
+    plant TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (garden, plant)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS feed_history (
+    garden TEXT NOT NULL,
+    plant TEXT NOT NULL,
+    feed TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (garden, plant, feed)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS versions (
+    garden TEXT PRIMARY KEY,
+    history_version INTEGER NOT NULL DEFAULT 0
+);
+"""
 
 
 def load_json_file(filepath, default):
@@ -19,51 +54,453 @@ def load_json_file(filepath, default):
         return default
 
 
+@contextmanager
+def atomic_open(filepath, mode="w"):
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(filepath)}.", suffix=".tmp", dir=os.path.dirname(filepath) or "."
+    )
+    try:
+        with open(fd, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 def save_json_file(filepath, data):
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
+        with atomic_open(filepath) as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
     except Exception as e:
         print(f"Ошибка сохранения {filepath}: {e}")
 
 
-def load_history():
-    data = load_json_file(HISTORY_FILE, {})
+def file_sha256(filepath) -> str:
+    digest = hashlib.sha256()
+    try:
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return ""
+    return digest.hexdigest()
+
+
+def load_history(filepath=HISTORY_FILE):
+    data = load_json_file(filepath, {})
     return data if isinstance(data, dict) else {}
 
 
-def save_history(history):
-    save_json_file(HISTORY_FILE, history)
+def save_history(history, filepath=HISTORY_FILE):
+    save_json_file(filepath, history)
 
 
-def load_feed_history():
-    data = load_json_file(FEED_HISTORY_FILE, {})
+def load_feed_history(filepath=FEED_HISTORY_FILE):
+    data = load_json_file(filepath, {})
     return data if isinstance(data, dict) else {}
 
 
-def save_feed_history(feed_history):
-    save_json_file(FEED_HISTORY_FILE, feed_history)
+def save_feed_history(feed_history, filepath=FEED_HISTORY_FILE):
+    save_json_file(filepath, feed_history)
 
 
-def load_last_temp():
+def load_last_temp(filepath=LAST_WEATHER_FILE):
     try:
-        with open(LAST_WEATHER_FILE, "r", encoding="utf-8") as f:
+        with open(filepath, "r", encoding="utf-8") as f:
             data = json.load(f)
         return data.get("temp") if isinstance(data, dict) else None
     except Exception:
         return None
 
 
-def save_last_temp(temp):
+def save_last_temp(temp, filepath=LAST_WEATHER_FILE):
     if temp is None:
         return
-    try:
-        with open(LAST_WEATHER_FILE, "w", encoding="utf-8") as f:
-            json.dump(
-                {"temp": temp, "saved_at": datetime.now(timezone.utc).isoformat()},
-                f,
-                ensure_ascii=False,
-                indent=2
+    save_json_file(filepath, {"temp": temp, "saved_at": datetime.now(timezone.utc).isoformat()})
+
+
+def merge_changes(current: dict, before: dict, after: dict, depth: int = 1) -> dict:
+    for key, value in after.items():
+        old = before.get(key, {})
+        if key in before and value == old:
+            continue
+        if depth > 1 and isinstance(value, dict) and isinstance(old, dict) and isinstance(current.get(key), dict):
+            merge_changes(current[key], old, value, depth - 1)
+        else:
+            current[key] = copy.deepcopy(value)
+    for key in before:
+        if key not in after:
+            current.pop(key, None)
+    return current
+
+
+def locked_merge_save(filepath: str, before: dict, after: dict, depth: int = 1):
+    with FileLock(f"{filepath}.lock"):
+        current = load_json_file(filepath, {})
+        save_json_file(filepath, merge_changes(current, before, after, depth))
+
+
+def dump_row(entry) -> str:
+    return json.dumps(entry, ensure_ascii=False, sort_keys=True)
+
+
+class JsonStorage:
+    def __init__(
+        self,
+        history_file=HISTORY_FILE,
+        feed_history_file=FEED_HISTORY_FILE,
+        last_weather_file=LAST_WEATHER_FILE,
+    ):
+        self.history_file = history_file
+        self.feed_history_file = feed_history_file
+        self.last_weather_file = last_weather_file
+        self._history_before = {}
+        self._feed_before = {}
+
+    def load_history(self):
+        history = load_history(self.history_file)
+        self._history_before = copy.deepcopy(history)
+        return history
+
+    def save_history(self, history):
+        locked_merge_save(self.history_file, self._history_before, history, depth=2)
+        self._history_before = copy.deepcopy(history)
+
+    def load_feed_history(self):
+        feed_history = load_feed_history(self.feed_history_file)
+        self._feed_before = copy.deepcopy(feed_history)
+        return feed_history
+
+    def save_feed_history(self, feed_history):
+        locked_merge_save(self.feed_history_file, self._feed_before, feed_history, depth=3)
+        self._feed_before = copy.deepcopy(feed_history)
+
+    def load_last_temp(self):
+        return load_last_temp(self.last_weather_file)
+
+    def save_last_temp(self, temp):
+        save_last_temp(temp, self.last_weather_file)
+
+    def history_signature(self) -> str:
+        return file_sha256(self.history_file)
+
+    def close(self):
+        pass
+
+
+class SqliteStorage:
+    def __init__(self, db_path=STORAGE_DB_FILE, garden=DEFAULT_GARDEN, last_weather_file=LAST_WEATHER_FILE):
+        import sqlite3
+
+        self.db_path = db_path
+        self.garden = garden
+        self.last_weather_file = last_weather_file
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self._history_rows = {}
+        self._feed_rows = {}
+
+    def load_history(self):
+        rows = self.conn.execute(
+            "SELECT plant, data FROM history WHERE garden = ?", (self.garden,)
+        )
+        self._history_rows = dict(rows)
+        return {plant: json.loads(data) for plant, data in self._history_rows.items()}
+
+    def save_history(self, history):
+        rows = {
+            plant: dump_row(entry)
+            for plant, entry in history.items()
+            if isinstance(entry, dict)
+        }
+        plants = [plant for plant, data in rows.items() if self._history_rows.get(plant) != data]
+        removed = [(self.garden, plant) for plant in self._history_rows if plant not in rows]
+        if not plants and not removed:
+            return
+
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            changed = []
+            for plant in plants:
+                row = self.conn.execute(
+                    "SELECT data FROM history WHERE garden = ? AND plant = ?", (self.garden, plant)
+                ).fetchone()
+                before = json.loads(self._history_rows[plant]) if plant in self._history_rows else {}
+                rows[plant] = dump_row(merge_changes(json.loads(row[0]) if row else {}, before, history[plant]))
+                changed.append((self.garden, plant, rows[plant]))
+            self.conn.executemany(
+                "INSERT INTO history (garden, plant, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (garden, plant) DO UPDATE SET data = excluded.data",
+                changed,
+            )
+            self.conn.executemany("DELETE FROM history WHERE garden = ? AND plant = ?", removed)
+            self.conn.execute(
+                "INSERT INTO versions (garden, history_version) VALUES (?, 1) "
+                "ON CONFLICT (garden) DO UPDATE SET history_version = history_version + 1",
+                (self.garden,),
+            )
+        self._history_rows = rows
+
+    def load_feed_history(self):
+        rows = self.conn.execute(
+            "SELECT plant, feed, data FROM feed_history WHERE garden = ?", (self.garden,)
+        )
+        self._feed_rows = {}
+        feed_history = {}
+        for plant, feed, data in rows:
+            self._feed_rows[(plant, feed)] = data
+            feed_history.setdefault(plant, {})[feed] = json.loads(data)
+        return feed_history
+
+    def save_feed_history(self, feed_history):
+        rows = {}
+        for plant, feeds in feed_history.items():
+            if not isinstance(feeds, dict):
+                continue
+            for feed, entry in feeds.items():
+                if isinstance(entry, dict):
+                    rows[(plant, feed)] = dump_row(entry)
+
+        keys = [key for key, data in rows.items() if self._feed_rows.get(key) != data]
+        removed = [(self.garden, plant, feed) for (plant, feed) in self._feed_rows if (plant, feed) not in rows]
+        if not keys and not removed:
+            return
+
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            changed = []
+            for plant, feed in keys:
+                row = self.conn.execute(
+                    "SELECT data FROM feed_history WHERE garden = ? AND plant = ? AND feed = ?",
+                    (self.garden, plant, feed),
+                ).fetchone()
+                before = json.loads(self._feed_rows[(plant, feed)]) if (plant, feed) in self._feed_rows else {}
+                rows[(plant, feed)] = dump_row(merge_changes(json.loads(row[0]) if row else {}, before, feed_history[plant][feed]))
+                changed.append((self.garden, plant, feed, rows[(plant, feed)]))
+            self.conn.executemany(
+                "INSERT INTO feed_history (garden, plant, feed, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (garden, plant, feed) DO UPDATE SET data = excluded.data",
+                changed,
             )
+            self.conn.executemany(
+                "DELETE FROM feed_history WHERE garden = ? AND plant = ? AND feed = ?", removed
+            )
+        self._feed_rows = rows
+
+    def load_last_temp(self):
+        return load_last_temp(self.last_weather_file)
+
+    def save_last_temp(self, temp):
+        save_last_temp(temp, self.last_weather_file)
+
+    def history_signature(self) -> str:
+        row = self.conn.execute(
+            "SELECT history_version FROM versions WHERE garden = ?", (self.garden,)
+        ).fetchone()
+        return f"sqlite:{self.garden}:{row[0] if row else 0}"
+
+    def close(self):
+        self.conn.close()
+
+
+def owned_shards(part, shards: int) -> list:
+    if part is None:
+        return list(range(shards))
+    index, count = parse_shard(part)
+    return [shard for shard in range(shards) if shard % count == index]
+
+
+def owned_plants(storage, plants) -> list:
+    owns = getattr(storage, "owns", None)
+    if owns is None:
+        return plants
+    return [plant for plant in plants if owns(plant.id)]
+
+
+class ShardedStorage:
+    def __init__(self, state_dir=STATE_DIR, garden=DEFAULT_GARDEN, shards=STATE_SHARDS, last_weather_file=LAST_WEATHER_FILE, part=None):
+        self.garden_dir = os.path.join(state_dir, garden)
+        self.last_weather_file = last_weather_file
+        os.makedirs(self.garden_dir, exist_ok=True)
+
+        meta_file = os.path.join(self.garden_dir, "shards.json")
+        with FileLock(f"{meta_file}.lock"):
+            meta = load_json_file(meta_file, {})
+            if not isinstance(meta.get("shards"), int) or meta["shards"] <= 0:
+                meta = {"shards": shards}
+                save_json_file(meta_file, meta)
+        self.shards = meta["shards"]
+        self.owned = owned_shards(part, self.shards)
+        self._owned = set(self.owned)
+        self._before = None
+
+    def shard_file(self, shard: int) -> str:
+        return os.path.join(self.garden_dir, f"{shard:03d}.json")
+
+    def owns(self, plant) -> bool:
+        return shard_of(plant, self.shards) in self._owned
+
+    def load_shards(self):
+        self._before = {}
+        for shard in self.owned:
+            data = load_json_file(self.shard_file(shard), {})
+            self._before[shard] = {
+                "history": data.get("history", {}),
+                "feed_history": data.get("feed_history", {}),
+            }
+
+    def ensure_loaded(self):
+        if self._before is None:
+            self.load_shards()
+        return self._before
+
+    def partition(self, data: dict) -> dict:
+        parts = {shard: {} for shard in self.owned}
+        for plant, entry in data.items():
+            part = parts.get(shard_of(plant, self.shards))
+            if part is not None:
+                part[plant] = entry
+        return parts
+
+    def combined(self, key: str) -> dict:
+        result = {}
+        for shard in self.ensure_loaded().values():
+            result.update(copy.deepcopy(shard[key]))
+        return result
+
+    def save_part(self, key: str, data: dict, depth: int):
+        before = self.ensure_loaded()
+        for shard, part in self.partition(data).items():
+            if part == before[shard][key]:
+                continue
+            filepath = self.shard_file(shard)
+            with FileLock(f"{filepath}.lock"):
+                current = load_json_file(filepath, {})
+                current[key] = merge_changes(current.get(key, {}), before[shard][key], part, depth)
+                current["version"] = current.get("version", 0) + 1
+                save_json_file(filepath, current)
+            before[shard][key] = copy.deepcopy(part)
+
+    def load_history(self):
+        self.load_shards()
+        return self.combined("history")
+
+    def save_history(self, history):
+        self.save_part("history", history, 2)
+
+    def load_feed_history(self):
+        return self.combined("feed_history")
+
+    def save_feed_history(self, feed_history):
+        self.save_part("feed_history", feed_history, 3)
+
+    def load_last_temp(self):
+        return load_last_temp(self.last_weather_file)
+
+    def save_last_temp(self, temp):
+        save_last_temp(temp, self.last_weather_file)
+
+    def history_signature(self) -> str:
+        digest = hashlib.sha256()
+        for shard in self.owned:
+            try:
+                st = os.stat(self.shard_file(shard))
+                digest.update(f"{shard}:{st.st_mtime_ns}:{st.st_size};".encode())
+            except OSError:
+                digest.update(f"{shard}:-;".encode())
+        return f"sharded:{digest.hexdigest()}"
+
+    def close(self):
+        pass
+
+
+def get_storage(
+    history_file=HISTORY_FILE,
+    feed_history_file=FEED_HISTORY_FILE,
+    garden=DEFAULT_GARDEN,
+    last_weather_file=LAST_WEATHER_FILE,
+    journal_dir=JOURNAL_DIR,
+    part=None,
+):
+    if part is not None and STORAGE_BACKEND != "sharded":
+        print(f"WARNING: STATE_PART={part} действует только при STORAGE_BACKEND=sharded")
+    if STORAGE_BACKEND == "sqlite":
+        return SqliteStorage(STORAGE_DB_FILE, garden, last_weather_file)
+    if STORAGE_BACKEND == "journal":
+        from journal import JournalStorage
+        return JournalStorage(journal_dir)
+    if STORAGE_BACKEND == "sharded":
+        return ShardedStorage(STATE_DIR, garden, STATE_SHARDS, last_weather_file, part)
+    if STORAGE_BACKEND != "json":
+        print(f"WARNING: неизвестный STORAGE_BACKEND '{STORAGE_BACKEND}', используется json")
+    return JsonStorage(history_file, feed_history_file, last_weather_file)
+
+
+def migrate(source, target):
+    target.load_history()
+    target.load_feed_history()
+    history = source.load_history()
+    feed_history = source.load_feed_history()
+    target.save_history(history)
+    target.save_feed_history(feed_history)
+    if target.load_last_temp() is None:
+        target.save_last_temp(source.load_last_temp())
+    return len(history), sum(len(feeds) for feeds in feed_history.values() if isinstance(feeds, dict))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Перенос истории между JSON, SQLite, журналом событий и шардами")
+    parser.add_argument(
+        "direction",
+        choices=[
+            "json-to-sqlite", "sqlite-to-json",
+            "json-to-journal", "journal-to-json", "compact-journal",
+            "json-to-sharded", "sharded-to-json",
+        ],
+    )
+    parser.add_argument("--db", default=STORAGE_DB_FILE)
+    parser.add_argument("--journal", default=JOURNAL_DIR)
+    parser.add_argument("--state-dir", default=STATE_DIR)
+    parser.add_argument("--shards", type=int, default=STATE_SHARDS)
+    parser.add_argument("--garden", default=DEFAULT_GARDEN)
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--feed-history", default=FEED_HISTORY_FILE)
+    args = parser.parse_args(argv)
+
+    from journal import JournalStorage
+
+    if args.direction == "compact-journal":
+        JournalStorage(args.journal).compact()
+        print(f"✅ Журнал {args.journal} сжат в снимок.")
+        return
+
+    json_storage = JsonStorage(args.history, args.feed_history)
+    if "sqlite" in args.direction:
+        other = SqliteStorage(args.db, args.garden)
+    elif "sharded" in args.direction:
+        other = ShardedStorage(args.state_dir, args.garden, args.shards)
+    else:
+        other = JournalStorage(args.journal)
+    try:
+        if args.direction.startswith("json-to-"):
+            plants, feeds = migrate(json_storage, other)
+        else:
+            plants, feeds = migrate(other, json_storage)
     except Exception as e:
-        print(f"Ошибка сохранения {LAST_WEATHER_FILE}: {e}")
+        print(f"ERROR: перенос не выполнен — {e}")
+        sys.exit(1)
+    finally:
+        other.close()
+
+    print(f"✅ Перенесено: растений {plants}, подкормок {feeds}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,205 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+MESSAGE_LIMIT = 4096
+MAX_RETRIES = 3
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+POOL_SIZE = 16
+SEND_TIMEOUT = 15
 
+_session = None
+_session_lock = threading.Lock()
+_chat_buckets = {}
+_chat_buckets_lock = threading.Lock()
 
-def send_to_telegram(text: str):
-    token = os.getenv("TELEGRAM_TOKEN")
-    chat_id = os.getenv("TELEGRAM_CHAT_ID")
-    if not token or not chat_id:
-        print("ERROR: Нет токена или ID чата")
-        return False
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {"chat_id": chat_id, "text": text, "parse_mode": "MarkdownV2"}
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def block(self, seconds: float):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+_global_bucket = TokenBucket(GLOBAL_RATE)
+
+
+def get_session():
+    import requests
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
 
+def get_chat_bucket(chat_id) -> TokenBucket:
+    with _chat_buckets_lock:
+        bucket = _chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = _chat_buckets[chat_id] = TokenBucket(CHAT_RATE)
+        return bucket
+
+
+def tg_len(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def safe_cut(text: str, end: int) -> int:
+    backslashes = 0
+    i = end - 1
+    while i >= 0 and text[i] == "\\":
+        backslashes += 1
+        i -= 1
+    return end - 1 if backslashes % 2 else end
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> list:
+    parts = []
+    rest = text
+    while tg_len(rest) > limit:
+        end = limit
+        while tg_len(rest[:end]) > limit:
+            end -= tg_len(rest[:end]) - limit
+        window = rest[:end]
+
+        cut = window.rfind("\n\n")
+        if cut <= 0:
+            cut = window.rfind("\n")
+        if cut <= 0:
+            cut = safe_cut(rest, end)
+
+        parts.append(rest[:cut].rstrip("\n"))
+        rest = rest[cut:].lstrip("\n")
+    if rest:
+        parts.append(rest)
+    return parts
+
+
+def get_retry_after(response) -> float:
+    try:
+        data = response.json()
+        retry_after = data.get("parameters", {}).get("retry_after")
+        if retry_after is not None:
+            return float(retry_after)
+    except Exception:
+        pass
     try:
-        response = requests.post(url, json=payload, timeout=15)
+        return float(response.headers.get("Retry-After", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def api_url(method: str, token: str = None) -> str:
+    return f"{TELEGRAM_API_URL}/bot{token or os.getenv('TELEGRAM_TOKEN')}/{method}"
+
+
+def post_message(session, url: str, chat_id, text: str, result: dict, deadline: float = None, reply_markup=None) -> bool:
+    import requests
+
+    chat_bucket = get_chat_bucket(chat_id)
+    payload = {"chat_id": chat_id, "text": text, "parse_mode": "MarkdownV2"}
+    if reply_markup:
+        payload["reply_markup"] = reply_markup
+
+    for attempt in range(MAX_RETRIES + 1):
+        timeout = SEND_TIMEOUT
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if attempt and remaining <= 0:
+                result["error"] = f"{result['error']} (время запуска истекло)"
+                return False
+            timeout = min(SEND_TIMEOUT, max(remaining, 1.0))
+        _global_bucket.acquire()
+        chat_bucket.acquire()
+        try:
+            response = session.post(url, json=payload, timeout=timeout)
+        except requests.RequestException as e:
+            result["error"] = str(e)
+            if attempt < MAX_RETRIES:
+                result["retries"] += 1
+                time.sleep(2 ** attempt)
+            continue
+
         if response.status_code == 200:
-            print("✅ Сообщение отправлено!")
             return True
-        print(f"❌ Ошибка Telegram: {response.text[:500]}")
-        return False
-    except Exception as e:
-        print(f"❌ Исключение при отправке: {e}")
-        return False
+
+        result["error"] = response.text[:500]
+        if response.status_code == 429:
+            retry_after = get_retry_after(response)
+            if deadline is not None and time.monotonic() + retry_after > deadline:
+                return False
+            chat_bucket.block(retry_after)
+        elif response.status_code < 500:
+            return False
+        elif attempt < MAX_RETRIES:
+            time.sleep(2 ** attempt)
+        if attempt < MAX_RETRIES:
+            result["retries"] += 1
+
+    return False
+
+
+def deliver_message(text: str, chat_id=None, session=None, deadline: float = None, reply_markup=None) -> dict:
+    token = os.getenv("TELEGRAM_TOKEN")
+    chat_id = chat_id or os.getenv("TELEGRAM_CHAT_ID")
+    result = {"chat_id": chat_id, "ok": False, "parts": 0, "sent_parts": 0, "retries": 0, "error": None}
+    if not token or not chat_id:
+        result["error"] = "Нет токена или ID чата"
+        return result
+
+    url = api_url("sendMessage", token)
+    session = session or get_session()
+    parts = split_message(text)
+    result["parts"] = len(parts)
+
+    for number, part in enumerate(parts, 1):
+        markup = reply_markup if number == len(parts) else None
+        if not post_message(session, url, chat_id, part, result, deadline, markup):
+            return result
+        result["sent_parts"] += 1
+
+    result["ok"] = True
+    result["error"] = None
+    return result
+
+
+class TelegramSender:
+    def __init__(self, workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max(workers, 1))
+
+    def submit(self, text: str, chat_id, reply_markup=None):
+        return self._pool.submit(deliver_message, text, chat_id, reply_markup=reply_markup)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
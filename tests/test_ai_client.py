@@ -0,0 +1,109 @@
+import pytest
+
+import ai_client
+from ai_client import get_ai_comment, get_ai_comments, parse_batch_advice
+
+
+@pytest.fixture
+def openrouter(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_client, "AI_CACHE_FILE", str(tmp_path / "ai_cache.json"))
+    monkeypatch.setattr(ai_client, "_cache", None)
+    monkeypatch.setattr(ai_client, "_inflight", {})
+    monkeypatch.setattr(ai_client, "_stats", {"hits": 0, "negative_hits": 0, "misses": 0, "saved_seconds": 0.0})
+    replies = {}
+    calls = []
+
+    def request(prompt, call=None):
+        calls.append(prompt)
+        return replies.get(prompt, (f"совет: {prompt}", "ok"))
+
+    monkeypatch.setattr(ai_client, "request_ai_comment", request)
+    return replies, calls
+
+
+def test_cache_evicts_least_recently_used(openrouter, monkeypatch):
+    _, calls = openrouter
+    monkeypatch.setattr(ai_client, "AI_CACHE_MAX_ENTRIES", 2)
+
+    get_ai_comment("a", "a")
+    get_ai_comment("b", "b")
+    assert get_ai_comment("a", "a") == "совет: a"
+    get_ai_comment("c", "c")
+
+    assert list(ai_client.load_ai_cache()) == ["a", "c"]
+    assert calls == ["a", "b", "c"]
+    get_ai_comment("b", "b")
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_failures_are_cached_briefly(openrouter, monkeypatch):
+    replies, calls = openrouter
+    replies["x"] = (None, "error")
+
+    assert get_ai_comment("x", "x") is None
+    assert get_ai_comment("x", "x") is None
+    assert calls == ["x"]
+    assert ai_client.ai_cache_stats()["negative_hits"] == 1
+
+    monkeypatch.setattr(ai_client, "AI_NEGATIVE_TTL", -1)
+    ai_client.load_ai_cache().clear()
+    assert get_ai_comment("x", "x") is None
+    assert get_ai_comment("x", "x") is None
+    assert calls == ["x", "x", "x"]
+
+
+def test_missing_key_is_never_cached(openrouter):
+    replies, calls = openrouter
+    replies["x"] = (None, "no_key")
+
+    get_ai_comment("x", "x")
+    get_ai_comment("x", "x")
+
+    assert calls == ["x", "x"]
+    assert not ai_client.load_ai_cache()
+
+
+def test_batch_parse_miss_falls_back_per_garden(openrouter, monkeypatch, capsys):
+    _, calls = openrouter
+    monkeypatch.setattr(
+        ai_client, "guarded_call",
+        lambda system, prompt, max_tokens, call=None: ('Вот ответ: {"g1": "Полейте утром", "g3": "лишний"} Удачи!', "ok"),
+    )
+
+    texts = get_ai_comments({"k1": "p1", "k2": "p2"}, persist=False)
+
+    assert texts == {"k1": "Полейте утром", "k2": None}
+    assert "разобрано советов 1 из 2" in capsys.readouterr().out
+    assert ai_client.lookup_cached("k2") == (True, None)
+    assert get_ai_comments({"k1": "p1", "k2": "p2"}, persist=False) == texts
+    assert calls == []
+
+
+@pytest.mark.parametrize("content", [None, "", "нет JSON", "{не json}", '["g1"]', '{"g1": 5}', '{"g1": "   "}', '{"g1": "' + "x" * 401 + '"}'])
+def test_unusable_batch_answers_yield_no_advice(content):
+    assert parse_batch_advice(content, ["g1"]) == {}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": "Полейте фикус"}}]}
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_debug_output_needs_ai_debug(monkeypatch, capsys, enabled):
+    requests = pytest.importorskip("requests")
+    monkeypatch.setattr(requests, "post", lambda **kwargs: FakeResponse())
+    monkeypatch.setattr(ai_client, "AI_DEBUG", enabled)
+
+    assert ai_client.call_openrouter("system", "prompt", "key") == ("Полейте фикус", "ok")
+    monkeypatch.delenv("OPENROUTER_API_KEY", raising=False)
+    assert ai_client.guarded_call("system", "prompt", 100) == (None, "no_key")
+
+    out = capsys.readouterr().out
+    assert ("AI debug:" in out) is enabled
+    assert ("Полейте фикус" in out) is enabled
@@ -0,0 +1,100 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import analytics
+from analytics import DAY, CareIndex, adherence, aggregate, refresh
+from benchmarks import generate
+from benchmarks.generate import generate_garden, generate_journal, write_journal
+from catalog import compile_plant
+from send_tasks import md_escape
+
+NOW = datetime(2025, 10, 1, 6, tzinfo=timezone.utc)
+GRACE = 1.0
+
+
+@pytest.fixture
+def garden(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate, "JOURNAL_ARCHIVE_EVENTS", 400)
+    raw, _, _ = generate_garden(40, NOW, seed=25)
+    write_journal(str(tmp_path / "journal"), raw, 365, NOW, seed=25)
+    index = CareIndex()
+    refresh(index, str(tmp_path / "journal"))
+    return raw, [compile_plant(plant, md_escape) for plant in raw], index
+
+
+def expected_rows(raw: list) -> dict:
+    series = {}
+    for event in generate_journal(raw, 365, NOW, seed=25):
+        ts = int(datetime.fromisoformat(event["at"]).timestamp())
+        series.setdefault((event["plant"], event.get("feed", "")), []).append(ts)
+    intervals = {(plant["id"], ""): plant["waterFreq"] for plant in raw}
+    intervals.update({(plant["id"], feed["id"]): feed["intervalDays"] for plant in raw for feed in plant["feeds"]})
+
+    rows = {}
+    for key, stamps in series.items():
+        expected = intervals[key]
+        gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+        late = [gap for gap in gaps if gap > (expected + GRACE) * DAY]
+        rows[key] = {
+            "events": len(stamps),
+            "mean_gap_days": round((stamps[-1] - stamps[0]) / len(gaps) / DAY, 2) if gaps else None,
+            "overdue": len(late),
+            "overdue_days": round(sum(gap - expected * DAY for gap in late) / DAY, 1),
+            "max_gap_days": round(max(gaps, default=0) / DAY, 1),
+        }
+    return rows
+
+
+def test_archives_snapshot_and_tail_are_all_indexed(garden, tmp_path):
+    raw, _, index = garden
+    assert len(list((tmp_path / "journal" / "archive").iterdir())) > 1
+    assert index.events == len(generate_journal(raw, 365, NOW, seed=25))
+    assert sum(row["count"] for row in aggregate(index, "kind")) == index.events
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_adherence_matches_brute_force(garden, monkeypatch, numpy):
+    raw, plants, index = garden
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(analytics, "load_numpy", lambda: None)
+
+    rows = adherence(index, plants, "reminded", until=int(NOW.timestamp()), grace=GRACE)
+    expected = expected_rows(raw)
+
+    assert len(rows) == len(expected)
+    for row in rows:
+        assert {key: row[key] for key in expected[(row["plant"], row["feed"])]} == expected[(row["plant"], row["feed"])]
+
+
+def test_saved_index_is_reused(garden, tmp_path):
+    _, plants, index = garden
+    index.save(str(tmp_path / "analytics"))
+    loaded = CareIndex.load(str(tmp_path / "analytics"))
+
+    assert refresh(loaded, str(tmp_path / "journal")) == 0
+    assert adherence(loaded, plants, "reminded", until=int(NOW.timestamp())) == adherence(index, plants, "reminded", until=int(NOW.timestamp()))
+
+
+def test_bare_until_date_includes_whole_day():
+    assert analytics.to_epoch("2025-09-30", end_of_day=True) == int(datetime(2025, 10, 1, tzinfo=timezone.utc).timestamp()) - 1
+    assert analytics.to_epoch("2025-09-30T12:00:00+00:00", end_of_day=True) == int(datetime(2025, 9, 30, 12, tzinfo=timezone.utc).timestamp())
+    assert analytics.to_epoch("2025-09-30") == int(datetime(2025, 9, 30, tzinfo=timezone.utc).timestamp())
+
+
+@pytest.mark.parametrize("backend", ["journal", "json"])
+def test_cli_until_date_is_inclusive(garden, tmp_path, monkeypatch, capsys, backend):
+    raw, _, _ = garden
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(analytics, "STORAGE_BACKEND", backend)
+    last_day = (NOW - timedelta(days=1)).date()
+    expected = sum(1 for event in generate_journal(raw, 365, NOW, seed=25) if datetime.fromisoformat(event["at"]).date() <= last_day)
+    output = tmp_path / "kinds.json"
+
+    analytics.main(["aggregate", "--by", "kind", "--format", "json", "--journal", "journal", "--until", last_day.isoformat(), "--output", str(output)])
+
+    assert sum(row["count"] for row in json.loads(output.read_text(encoding="utf-8"))) == expected
+    assert ("WARNING" in capsys.readouterr().out) is (backend != "journal")
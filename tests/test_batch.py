@@ -0,0 +1,38 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ai_client
+from ai_client import AI_BATCH_SIZE
+from batch import SharedClients
+
+
+def test_batch_size_is_clamped_to_workers():
+    clients = SharedClients(3)
+    try:
+        assert clients.ai_batcher.size == min(AI_BATCH_SIZE, 3)
+    finally:
+        clients.close()
+
+
+def test_waiting_workers_fill_a_batch_without_the_window(monkeypatch):
+    calls = []
+
+    def fake_comments(prompts, persist=True):
+        calls.append(sorted(prompts))
+        return {key: f"совет {key}" for key in prompts}
+
+    monkeypatch.setattr(ai_client, "get_ai_comments", fake_comments)
+    monkeypatch.setattr(ai_client, "lookup_cached", lambda cache_key: (False, None))
+    clients = SharedClients(4)
+    clients.ai_batcher.window = 30
+    keys = ["a", "b", "b", "c"]
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            texts = list(pool.map(lambda key: clients.ai_comment(f"prompt {key}", key), keys))
+    finally:
+        clients.close()
+
+    assert time.monotonic() - started < 5
+    assert calls == [["a", "b", "c"]]
+    assert texts == [f"совет {key}" for key in keys]
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+import circuit
+import weather
+from circuit import CircuitCall
+from send_tasks import result_within, start_background
+
+
+@pytest.fixture
+def circuits(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(circuit, "CIRCUIT_FILE", str(tmp_path / "circuits.json"))
+    monkeypatch.setattr(circuit, "_circuits", None)
+    return lambda name: circuit.load_circuits().get(name, {}).get("failures", 0)
+
+
+def test_call_is_settled_once(circuits):
+    call = CircuitCall("test")
+    call.settle(False)
+    call.settle(False)
+    call.settle(True)
+    assert circuits("test") == 1
+
+
+def test_timed_out_weather_counts_one_failure(circuits, monkeypatch):
+    release = threading.Event()
+
+    def slow_fetch(city, api_key):
+        release.wait(5)
+        raise RuntimeError("timeout")
+
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "test")
+    monkeypatch.setattr(weather, "fetch_weather", slow_fetch)
+    monkeypatch.setattr(weather, "_cache", {})
+    call = CircuitCall(weather.WEATHER_CIRCUIT)
+    future = start_background(weather.get_weather, "Тест", persist=False, call=call)
+
+    assert result_within(future, 0.05, None) is None
+    call.settle(False)
+    release.set()
+    future.result(5)
+
+    assert circuits(weather.WEATHER_CIRCUIT) == 1
+
+
+def test_late_success_does_not_reset_after_timeout(circuits, monkeypatch):
+    circuit.record_failure(weather.WEATHER_CIRCUIT)
+    release = threading.Event()
+
+    def slow_fetch(city, api_key):
+        release.wait(5)
+        return {"available": True, "city": city, "temp": 10}
+
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "test")
+    monkeypatch.setattr(weather, "fetch_weather", slow_fetch)
+    monkeypatch.setattr(weather, "_cache", {})
+    call = CircuitCall(weather.WEATHER_CIRCUIT)
+    future = start_background(weather.get_weather, "Тест", persist=False, call=call)
+
+    assert result_within(future, 0.05, None) is None
+    call.settle(False)
+    release.set()
+    future.result(5)
+
+    assert circuits(weather.WEATHER_CIRCUIT) == 2
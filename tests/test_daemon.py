@@ -0,0 +1,77 @@
+import os
+import shutil
+from datetime import datetime, timezone
+
+import pytest
+
+import daemon
+import validation
+from daemon import GardenState, default_garden
+from weather import unavailable_weather
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FailingClients:
+    def __init__(self):
+        self.sent = []
+
+    def weather(self, city):
+        return unavailable_weather("Москва")
+
+    def ai_comment(self, prompt, cache_key):
+        return None
+
+    def send(self, text, chat_id, reply_markup=None):
+        self.sent.append(text)
+        return {"chat_id": chat_id, "ok": False, "parts": 1, "sent_parts": 0, "retries": 0, "error": "503"}
+
+
+@pytest.fixture
+def garden(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(ROOT, "plants.json"), tmp_path / "plants.json")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(validation, "_validated", None)
+    return dict(default_garden(), plants="plants.json", send_at="06:00", tz="Europe/Moscow")
+
+
+def test_send_time_follows_garden_timezone(garden):
+    state = GardenState(garden)
+
+    assert state.due_slot(datetime(2025, 10, 1, 2, 59, tzinfo=timezone.utc), None) is None
+    assert state.due_slot(datetime(2025, 10, 1, 3, 0, tzinfo=timezone.utc), None) == "2025-10-01"
+    assert state.due_slot(datetime(2025, 10, 1, 3, 0, tzinfo=timezone.utc), "2025-10-01") is None
+    assert state.due_slot(datetime(2025, 10, 1, 22, 0, tzinfo=timezone.utc), "2025-10-01") is None
+    state.close()
+
+
+def test_unknown_timezone_is_rejected(garden):
+    with pytest.raises(ValueError):
+        GardenState(dict(garden, tz="Марс/Олимп"))
+
+
+def test_failed_send_keeps_plants_due_with_backoff(garden, monkeypatch):
+    monkeypatch.setattr(daemon, "DAEMON_RETRY", 60)
+    monkeypatch.setattr(daemon, "DAEMON_RETRY_MAX", 150)
+    state = GardenState(garden)
+    clients = FailingClients()
+    now_utc = datetime(2025, 10, 1, 20, 30, tzinfo=timezone.utc)
+
+    result = state.run(clients, now_utc, daemon.Metrics())
+
+    assert not result["sent"]
+    assert state.history == {}
+    assert len(state.due_index["entries"]) == len(state.plants)
+    assert all(ts <= now_utc.timestamp() for ts, _ in state.due_index["entries"])
+    assert [state.retry_later("2025-10-01") for _ in range(3)] == [60, 120, 150]
+
+    state.retry_at = 0.0
+    after_midnight = datetime(2025, 10, 1, 21, 30, tzinfo=timezone.utc)
+    assert state.due_slot(after_midnight, "2025-09-30") == "2025-10-01"
+    state.run(clients, after_midnight, daemon.Metrics())
+    assert len(clients.sent) == 2
+    assert clients.sent[0].count("📍") == clients.sent[1].count("📍") == len(state.plants)
+
+    state.sent()
+    assert state.due_slot(after_midnight, "2025-10-01") is None
+    state.close()
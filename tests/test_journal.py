@@ -0,0 +1,112 @@
+import json
+import os
+
+import storage
+
+from journal import JournalStorage
+
+
+def events(journal_dir):
+    with open(journal_dir / "events.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_concurrent_writers_get_unique_seq(tmp_path):
+    sender = JournalStorage(str(tmp_path))
+    poller = JournalStorage(str(tmp_path))
+    history = sender.load_history()
+    history["p"] = {"last_reminded": "2025-10-01T06:00:00+00:00"}
+    sender.save_history(history)
+
+    history = sender.load_history()
+    watered = poller.load_history()
+    watered["p"]["last_watered"] = "2025-10-02T09:00:00+00:00"
+    poller.save_history(watered)
+    history["p"]["last_reminded"] = "2025-10-05T06:00:00+00:00"
+    sender.save_history(history)
+
+    assert [event["seq"] for event in events(tmp_path)] == [1, 2, 3]
+    assert JournalStorage(str(tmp_path)).load_history()["p"] == {
+        "last_reminded": "2025-10-05T06:00:00+00:00",
+        "last_watered": "2025-10-02T09:00:00+00:00",
+    }
+
+
+def test_signature_follows_external_writes(tmp_path):
+    daemon = JournalStorage(str(tmp_path))
+    poller = JournalStorage(str(tmp_path))
+    daemon.load_history()
+    signature = daemon.history_signature()
+
+    poller.save_last_temp(12.5)
+    assert daemon.history_signature() == signature
+
+    history = poller.load_history()
+    history["p"] = {"last_watered": "2025-10-02T09:00:00+00:00"}
+    poller.save_history(history)
+    assert daemon.history_signature() != signature
+    assert daemon.load_history() == history
+
+
+def test_torn_tail_is_dropped_before_append(tmp_path):
+    storage = JournalStorage(str(tmp_path))
+    storage.save_last_temp(10)
+    with open(tmp_path / "events.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"type":"weather","temp":99,"se')
+
+    other = JournalStorage(str(tmp_path))
+    assert other.load_last_temp() == 10
+    other.save_last_temp(11)
+
+    assert [event["temp"] for event in events(tmp_path)] == [10, 11]
+    assert JournalStorage(str(tmp_path)).load_last_temp() == 11
+
+
+def test_compaction_by_another_process(tmp_path):
+    first = JournalStorage(str(tmp_path))
+    second = JournalStorage(str(tmp_path))
+    history = first.load_history()
+    history["p"] = {"last_reminded": "2025-10-01T06:00:00+00:00"}
+    first.save_history(history)
+    second.load_history()
+
+    first.compact()
+    assert not (tmp_path / "events.jsonl").exists()
+    assert len(list((tmp_path / "archive").iterdir())) == 1
+
+    history = second.load_history()
+    history["q"] = {"last_reminded": "2025-10-03T06:00:00+00:00"}
+    second.save_history(history)
+
+    assert [event["seq"] for event in events(tmp_path)] == [2]
+    assert sorted(JournalStorage(str(tmp_path)).load_history()) == ["p", "q"]
+
+
+def test_state_survives_compaction_and_restart(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history = {"p": {"last_reminded": "2025-10-01T06:00:00+00:00"}, "q": {"last_watered": "2025-10-02T06:00:00+00:00"}}
+    feed_history = {"p": {"succinic": {"last_done": "2025-09-20T06:00:00+00:00"}}}
+    with open("history.json", "w", encoding="utf-8") as f:
+        json.dump(history, f)
+    with open("feed_history.json", "w", encoding="utf-8") as f:
+        json.dump(feed_history, f)
+    with open("last_weather.json", "w", encoding="utf-8") as f:
+        json.dump({"temp": 7}, f)
+    storage.main(["json-to-journal"])
+
+    run = JournalStorage("journal")
+    state = run.load_history()
+    state["p"]["last_reminded"] = "2025-10-05T06:00:00+00:00"
+    run.save_history(state)
+    run.save_last_temp(9)
+    storage.main(["compact-journal"])
+    assert not os.path.exists("journal/events.jsonl")
+
+    restarted = JournalStorage("journal")
+    assert restarted.load_history() == state
+    assert restarted.load_feed_history() == feed_history
+    assert restarted.load_last_temp() == 9
+
+    state["q"]["last_reminded"] = "2025-10-06T06:00:00+00:00"
+    restarted.save_history(state)
+    assert JournalStorage("journal").load_history() == state
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from catalog import compile_catalog, feed_messages
+from send_tasks import md_escape
+
+SPECIAL = "\\_*[]()~`>#+-=|{}.!"
+
+
+def reference_escape(text) -> str:
+    if text is None:
+        return ""
+    s = str(text).replace("\\", "\\\\")
+    for char in SPECIAL[1:]:
+        s = s.replace(char, f"\\{char}")
+    return s
+
+
+@pytest.mark.parametrize("char", list(SPECIAL))
+def test_every_special_character_is_escaped(char):
+    assert md_escape(char) == "\\" + char
+    assert md_escape(f"а{char}б") == f"а\\{char}б"
+
+
+def test_plain_text_is_unchanged():
+    assert md_escape("Фикус 12 🌿 «Бенджамина»: 1/2 дозы") == "Фикус 12 🌿 «Бенджамина»: 1/2 дозы"
+    assert md_escape(None) == ""
+    assert md_escape(3.5) == "3\\.5"
+
+
+def test_matches_reference_on_random_text():
+    rng = random.Random(23)
+    alphabet = SPECIAL + "abcXYZ абвЖЯ 0123456789🌿—\n"
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        assert md_escape(text) == reference_escape(text)
+
+
+def test_feed_fragments_are_escaped_once():
+    feed_messages.cache_clear()
+    feed = {"id": "mkf", "name": "МКФ (бутоны)", "dose": "1/4–1/2 дозы!", "intervalDays": 14}
+    plants = [{"id": f"p{number}", "name": f"Растение {number}", "waterFreq": 3, "stage": "bloom", "feeds": [feed]} for number in range(100)]
+
+    catalog = compile_catalog(plants, md_escape)
+
+    info = feed_messages.cache_info()
+    assert (info.misses, info.hits) == (1, 99)
+    assert catalog[0].feeds[0].msg_due == "МКФ \\(бутоны\\) — 1/4–1/2 дозы\\!, сделать сегодня"
+    assert catalog[0].feeds[0].msg_due is catalog[-1].feeds[0].msg_due
+
+    compile_catalog([dict(plants[0], feeds=[dict(feed, dose="1 доза")])], md_escape)
+    assert feed_messages.cache_info().misses == 2
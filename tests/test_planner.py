@@ -0,0 +1,75 @@
+import copy
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.generate import generate_garden
+from catalog import compile_plant
+from planner import ICAL_LINE_LIMIT, build_calendar, calendar_to_ical, calendar_to_json
+from send_tasks import mark_plan_done, md_escape, plan_garden
+
+NOW = datetime(2025, 2, 20, 6, tzinfo=timezone.utc)
+
+
+def compiled(plants):
+    return [compile_plant(plant, md_escape) for plant in plants]
+
+
+def test_calendar_matches_daily_runs():
+    raw, history, feed_history = generate_garden(200, NOW, seed=3)
+    plants = compiled(raw)
+    calendar = build_calendar(plants, history, feed_history, NOW, days=60)
+
+    history, feed_history = copy.deepcopy(history), copy.deepcopy(feed_history)
+    for day, entries in enumerate(calendar):
+        now_utc = NOW + timedelta(days=day)
+        plan = plan_garden(plants, history, feed_history, now_utc)
+        assert plan["plants_to_remind"] == [plant.id for plant, _ in entries]
+        assert plan["due_feeds_to_mark"] == [(plant.id, feed.id) for plant, feeds in entries for feed in feeds]
+        mark_plan_done(history, feed_history, plan, now_utc.isoformat())
+
+
+def test_json_output():
+    plants = compiled([
+        {"id": "rose", "name": "Роза", "waterFreq": 3, "stage": "foliage",
+         "feeds": [{"id": "succinic", "name": "Янтарка", "dose": "1/2", "intervalDays": 5, "months": [2]}]},
+        {"id": "cactus", "name": "Кактус", "waterFreq": 14, "stage": "dormant"},
+    ])
+    history = {"rose": {"last_reminded": (NOW - timedelta(days=1)).isoformat()}, "cactus": {"last_reminded": NOW.isoformat()}}
+
+    result = calendar_to_json(build_calendar(plants, history, {}, NOW, days=10), NOW)
+
+    assert result["days"] == 10
+    assert result["calendar"] == [
+        {"date": "2025-02-22", "water": [{"id": "rose", "name": "Роза"}],
+         "feed": [{"id": "rose", "name": "Роза", "feed": "succinic", "feed_name": "Янтарка", "dose": "1/2"}]},
+        {"date": "2025-02-25", "water": [{"id": "rose", "name": "Роза"}], "feed": []},
+        {"date": "2025-02-28", "water": [{"id": "rose", "name": "Роза"}],
+         "feed": [{"id": "rose", "name": "Роза", "feed": "succinic", "feed_name": "Янтарка", "dose": "1/2"}]},
+    ]
+
+
+def unfold(text: str) -> list:
+    return text.replace("\r\n ", "").split("\r\n")
+
+
+def test_ical_output_is_escaped_and_folded():
+    plants = compiled([
+        {"id": f"p{number}", "name": f"Очень длинное название растения №{number}; с запятой, и \\ слэшем",
+         "waterFreq": 2, "stage": "foliage",
+         "feeds": [{"id": "mkf", "name": "МКФ", "dose": "1/4–1/2 дозы", "intervalDays": 2}]}
+        for number in range(3)
+    ])
+
+    text = calendar_to_ical(build_calendar(plants, {}, {}, NOW, days=3), NOW)
+
+    assert text.endswith("END:VCALENDAR\r\n")
+    physical = text.split("\r\n")[:-1]
+    assert all(len(line.encode("utf-8")) <= ICAL_LINE_LIMIT for line in physical)
+    assert any(line.startswith(" ") for line in physical)
+    lines = unfold(text)[:-1]
+    assert lines.count("BEGIN:VEVENT") == 2
+    assert "DTSTART;VALUE=DATE:20250220" in lines
+    assert "DTEND;VALUE=DATE:20250221" in lines
+    assert "SUMMARY:🌿 Полив: 3\\, подкормок: 3" in lines
+    description = next(line for line in lines if line.startswith("DESCRIPTION:"))
+    assert description.startswith("DESCRIPTION:💧 Очень длинное название растения №0\\; с запятой\\, и \\\\ слэшем\\n💧")
+    assert description.endswith("🧪 Очень длинное название растения №2\\; с запятой\\, и \\\\ слэшем: МКФ — 1/4–1/2 дозы")
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+import plant_stream
+import send_tasks
+import validation
+from benchmarks.generate import generate_garden
+from plant_stream import convert_to_jsonl, scan_catalog
+
+NOW = datetime(2025, 5, 20, 6, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def catalogs(tmp_path, monkeypatch):
+    monkeypatch.setattr(validation, "VALIDATION_CACHE_FILE", str(tmp_path / "validation_cache.json"))
+    monkeypatch.setattr(validation, "_validated", None)
+    plants, history, feed_history = generate_garden(500, NOW, seed=7)
+    plants[10]["waterFreq"] = 0
+    plants[20] = "не растение"
+    plants[30]["id"] = plants[31]["id"]
+    source = tmp_path / "plants.json"
+    source.write_text(json.dumps({"plants": plants}, ensure_ascii=False, indent=2), encoding="utf-8")
+    target = tmp_path / "plants.jsonl"
+    assert convert_to_jsonl(str(source), str(target)) == len(plants)
+    return str(source), str(target), history, feed_history
+
+
+def test_jsonl_catalog_loads_like_json(catalogs, capsys):
+    source, target, _, _ = catalogs
+    expected = send_tasks.load_plants(source, strict=False)
+
+    assert len(expected) == 497
+    assert send_tasks.load_plants(target, strict=False) == expected
+    assert capsys.readouterr().out.count("осталось 497") == 2
+
+
+def test_streamed_json_array_matches_across_chunk_boundaries(catalogs, monkeypatch):
+    source, _, _, _ = catalogs
+    expected = send_tasks.load_plants(source, strict=False)
+    monkeypatch.setattr(plant_stream, "STREAM_CHUNK", 7)
+
+    kept, total = scan_catalog(source, send_tasks.md_escape)
+
+    assert total == 500
+    assert tuple(kept) == expected
+
+
+def test_streamed_due_plants_match_full_plan(catalogs):
+    source, target, history, feed_history = catalogs
+    plants = send_tasks.load_plants(source, strict=False)
+
+    due, total = send_tasks.stream_due_plants(target, history, NOW, strict=False)
+
+    assert total == 500
+    assert send_tasks.plan_garden(due, history, feed_history, NOW) == send_tasks.plan_garden(plants, history, feed_history, NOW)
+    assert len(due) < len(plants)
@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from benchmarks.generate import generate_garden
+from catalog import compile_plant
+from rules import build_plant_block
+from send_tasks import md_escape, parse_iso_dt
+
+
+def reference_feed_status(plant: dict, feed: dict, feed_history: dict, now_utc: datetime):
+    stage = str(plant.get("stage", "")).strip().lower()
+    flags = plant.get("flags", {}) if isinstance(plant.get("flags"), dict) else {}
+    feed_name = feed.get("name", "Подкормка")
+    dose = feed.get("dose", "по инструкции")
+    months = feed.get("months", [])
+    only_stages = [str(x).strip().lower() for x in feed.get("onlyStages", [])]
+
+    if stage in ("dormant", "покой", "recover", "восстановление"):
+        return False, f"{feed_name} — сейчас нельзя, растение в режиме покоя/восстановления"
+    if months and now_utc.month not in months:
+        return False, f"{feed_name} — не сезон"
+    if only_stages and stage not in only_stages:
+        return False, f"{feed_name} — не подходит для текущей стадии"
+    for cond in (str(x).strip().lower() for x in feed.get("conditions", [])):
+        if not flags.get(cond, cond == "active_growth"):
+            if cond == "buds":
+                return False, f"{feed_name} — только если есть бутоны"
+            if cond == "flower_spike":
+                return False, f"{feed_name} — только если есть цветонос"
+            return False, f"{feed_name} — пока не выполнены условия"
+
+    feed_entry = feed_history.get(plant.get("id"), {}).get(feed.get("id"), {})
+    last_done = parse_iso_dt(feed_entry.get("last_done"))
+    if last_done is not None:
+        remaining = int(feed.get("intervalDays", 999)) - (now_utc - last_done).days
+        if remaining > 0:
+            return False, f"{feed_name} — {dose}, через {remaining} дн."
+    return True, f"{feed_name} — {dose}, сделать сегодня"
+
+
+def reference_block(plant: dict, feed_history: dict, now_utc: datetime):
+    stage = str(plant.get("stage", "")).strip().lower()
+    lines = [f"📍 *{md_escape(plant.get('name', 'Без имени'))}*", "💧 *Полив*"]
+    due_feeds = []
+    if stage in ("dormant", "покой"):
+        lines.append("❄️ Режим покоя: *только вода*")
+    elif stage in ("recover", "восстановление"):
+        lines.append("🚑 Восстановление: без удобрений")
+    else:
+        for feed in plant.get("feeds", []):
+            due, message = reference_feed_status(plant, feed, feed_history, now_utc)
+            lines.append(f"🧪 {md_escape(message)}")
+            if due:
+                due_feeds.append(feed.get("id"))
+    return "\n".join(lines), due_feeds
+
+
+@pytest.mark.parametrize("month", range(1, 13))
+def test_compiled_rules_match_reference(month):
+    now_utc = datetime(2025, month, 15, 6, tzinfo=timezone.utc)
+    plants, _, feed_history = generate_garden(300, now_utc, seed=month)
+    for plant in plants:
+        assert build_plant_block(compile_plant(plant, md_escape), feed_history, now_utc, parse_iso_dt) == reference_block(
+            plant, feed_history, now_utc
+        )
+
+
+def test_wait_message_is_escaped_once():
+    now_utc = datetime(2025, 6, 15, 6, tzinfo=timezone.utc)
+    plant = {"id": "rose", "name": "Роза", "stage": "bloom", "feeds": [{"id": "amber", "name": "Янтарка", "dose": "1/2", "intervalDays": 14}]}
+    feed_history = {"rose": {"amber": {"last_done": "2025-06-04T06:00:00+00:00"}}}
+
+    block, due_feeds = build_plant_block(compile_plant(plant, md_escape), feed_history, now_utc, parse_iso_dt)
+
+    assert block.splitlines()[-1] == "🧪 Янтарка — 1/2, через 3 дн\\."
+    assert "\\\\" not in block
+    assert due_feeds == []
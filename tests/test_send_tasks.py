@@ -0,0 +1,77 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import send_tasks
+import validation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("catalog", ["plants.json", "plants.jsonl"])
+def test_dry_run_touches_no_state(tmp_path, monkeypatch, capsys, catalog):
+    for name in ("history.json", "feed_history.json"):
+        shutil.copy(os.path.join(ROOT, name), tmp_path / name)
+    with open(os.path.join(ROOT, "plants.json"), encoding="utf-8") as f:
+        plants = json.load(f)["plants"]
+    with open(tmp_path / catalog, "w", encoding="utf-8") as f:
+        if catalog.endswith(".jsonl"):
+            f.writelines(json.dumps(plant, ensure_ascii=False) + "\n" for plant in plants)
+        else:
+            json.dump({"plants": plants}, f, ensure_ascii=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(send_tasks, "PLANTS_FILE", catalog)
+    monkeypatch.setattr(validation, "_validated", None)
+    before = {path.name: path.read_bytes() for path in tmp_path.iterdir()}
+
+    send_tasks.main(["--dry-run"])
+
+    assert "ПЛАН САДА" in capsys.readouterr().out
+    assert {path.name: path.read_bytes() for path in tmp_path.iterdir()} == before
+
+
+@pytest.mark.parametrize("catalog", ["catalog/*.jsonl", "catalog"])
+def test_run_on_jsonl_catalog_set(tmp_path, monkeypatch, capsys, catalog):
+    with open(os.path.join(ROOT, "plants.json"), encoding="utf-8") as f:
+        plants = json.load(f)["plants"]
+    (tmp_path / "catalog").mkdir()
+    for part, chunk in enumerate((plants[::2], plants[1::2])):
+        with open(tmp_path / "catalog" / f"part{part}.jsonl", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(plant, ensure_ascii=False) + "\n" for plant in chunk)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(send_tasks, "PLANTS_FILE", catalog)
+    monkeypatch.setattr(validation, "_validated", None)
+    metrics = send_tasks.Metrics()
+
+    send_tasks.run(metrics, dry_run=True)
+
+    out = capsys.readouterr().out
+    assert "ПЛАН САДА" in out
+    assert "ERROR" not in out
+    assert metrics.counters["plants_total"] == len(plants)
+    for plant in plants:
+        assert send_tasks.md_escape(plant["name"]) in out
+
+
+@pytest.mark.parametrize("catalog", ["plants.json", "plants.jsonl"])
+def test_both_catalog_paths_report_same_metrics(tmp_path, monkeypatch, capsys, catalog):
+    with open(os.path.join(ROOT, "plants.json"), encoding="utf-8") as f:
+        plants = json.load(f)["plants"]
+    with open(tmp_path / catalog, "w", encoding="utf-8") as f:
+        if catalog.endswith(".jsonl"):
+            f.writelines(json.dumps(plant, ensure_ascii=False) + "\n" for plant in plants)
+        else:
+            json.dump({"plants": plants}, f, ensure_ascii=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(send_tasks, "PLANTS_FILE", catalog)
+    monkeypatch.setattr(validation, "_validated", None)
+    metrics = send_tasks.Metrics()
+
+    send_tasks.run(metrics, dry_run=True)
+
+    assert "ERROR" not in capsys.readouterr().out
+    assert metrics.counters["plants_total"] == len(plants)
+    assert metrics.counters["plants_scanned"] == len(plants)
+    assert metrics.counters["due_waterings"] == len(plants)
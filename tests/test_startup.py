@@ -0,0 +1,10 @@
+import pytest
+
+from benchmarks.startup import DEFAULT_BUDGET_MS, DEFAULT_MODULES, DEFAULT_REPEAT, measure
+
+
+@pytest.mark.parametrize("module", DEFAULT_MODULES)
+def test_import_within_budget(module):
+    result = measure(module, DEFAULT_REPEAT)
+    assert result["lazy_loaded"] == []
+    assert result["ms"] <= DEFAULT_BUDGET_MS
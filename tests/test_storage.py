@@ -0,0 +1,133 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import storage
+from storage import JsonStorage, ShardedStorage, SqliteStorage
+
+
+def json_pair(tmp_path):
+    tmp_path.mkdir()
+    files = (str(tmp_path / "history.json"), str(tmp_path / "feed_history.json"), str(tmp_path / "last_weather.json"))
+    return JsonStorage(*files), JsonStorage(*files)
+
+
+def sharded_pair(tmp_path):
+    return ShardedStorage(str(tmp_path), "g", 4), ShardedStorage(str(tmp_path), "g", 4)
+
+
+def sqlite_pair(tmp_path):
+    tmp_path.mkdir()
+    return SqliteStorage(str(tmp_path / "garden.db")), SqliteStorage(str(tmp_path / "garden.db"))
+
+
+def writer_pairs(tmp_path):
+    return json_pair(tmp_path / "json"), sharded_pair(tmp_path / "sharded"), sqlite_pair(tmp_path / "sqlite")
+
+
+def test_overlapping_history_writers_keep_both_fields(tmp_path):
+    for sender, poller in writer_pairs(tmp_path):
+        first = sender.load_history()
+        first["p"] = {"last_reminded": "2025-10-01T06:00:00+00:00"}
+        sender.save_history(first)
+
+        history = sender.load_history()
+        watered = poller.load_history()
+        watered["p"]["last_watered"] = "2025-10-02T09:00:00+00:00"
+        poller.save_history(watered)
+        history["p"]["last_reminded"] = "2025-10-05T06:00:00+00:00"
+        sender.save_history(history)
+
+        assert poller.load_history()["p"] == {
+            "last_reminded": "2025-10-05T06:00:00+00:00",
+            "last_watered": "2025-10-02T09:00:00+00:00",
+        }
+
+
+def test_overlapping_writers_create_same_plant(tmp_path):
+    for sender, poller in writer_pairs(tmp_path):
+        history = sender.load_history()
+        watered = poller.load_history()
+        poller.save_history(dict(watered, p={"last_watered": "2025-10-02T09:00:00+00:00"}))
+        sender.save_history(dict(history, p={"last_reminded": "2025-10-05T06:00:00+00:00"}))
+
+        assert sender.load_history()["p"] == {
+            "last_reminded": "2025-10-05T06:00:00+00:00",
+            "last_watered": "2025-10-02T09:00:00+00:00",
+        }
+
+
+def test_merge_changes_removes_deleted_fields_only():
+    current = {"p": {"a": 1, "b": 2, "c": 3}, "q": {"a": 1}}
+    before = {"p": {"a": 1, "b": 2}, "q": {"a": 1}}
+    after = {"p": {"a": 5}}
+
+    assert storage.merge_changes(current, before, after, depth=2) == {"p": {"a": 5, "c": 3}}
+
+
+def write_repeatedly(filepath, payload):
+    for _ in range(30):
+        storage.save_json_file(filepath, payload)
+
+
+def test_concurrent_json_writes_never_tear(tmp_path, capfd):
+    filepath = str(tmp_path / "weather_cache.json")
+    payloads = [{str(key): "x" * 100 * writer for key in range(2000)} for writer in range(1, 9)]
+
+    with ProcessPoolExecutor(max_workers=8, mp_context=get_context("fork")) as pool:
+        list(pool.map(write_repeatedly, [filepath] * len(payloads), payloads))
+
+    assert "Ошибка сохранения" not in capfd.readouterr().out
+    with open(filepath, encoding="utf-8") as f:
+        assert json.load(f) in payloads
+    assert [path.name for path in tmp_path.iterdir()] == ["weather_cache.json"]
+
+
+def test_sharded_part_touches_only_owned_files(tmp_path):
+    full = ShardedStorage(str(tmp_path), "g", 4)
+    history = {f"p{number}": {"last_reminded": "2025-10-01T06:00:00+00:00"} for number in range(40)}
+    full.load_history()
+    full.save_history(history)
+    files = {shard: tmp_path / "g" / f"{shard:03d}.json" for shard in range(4)}
+    foreign = {shard: files[shard].read_bytes() for shard in (1, 3)}
+
+    part = ShardedStorage(str(tmp_path), "g", 4, part="0/2")
+    assert part.owned == [0, 2]
+    owned = part.load_history()
+    assert sorted(owned) == sorted(plant for plant in history if storage.shard_of(plant, 4) in (0, 2))
+
+    stranger = next(plant for plant in history if not part.owns(plant))
+    for entry in owned.values():
+        entry["last_reminded"] = "2025-10-05T06:00:00+00:00"
+    owned[stranger] = {"last_reminded": "2025-10-05T06:00:00+00:00"}
+    part.save_history(owned)
+
+    assert {shard: files[shard].read_bytes() for shard in (1, 3)} == foreign
+    merged = ShardedStorage(str(tmp_path), "g", 4).load_history()
+    assert all(
+        entry["last_reminded"] == ("2025-10-05T06:00:00+00:00" if part.owns(plant) else "2025-10-01T06:00:00+00:00")
+        for plant, entry in merged.items()
+    )
+
+
+def test_overlapping_feed_history_writers_keep_both_fields(tmp_path):
+    for sender, poller in writer_pairs(tmp_path):
+        feeds = sender.load_feed_history()
+        feeds["p"] = {"succinic": {"last_done": "2025-09-01T06:00:00+00:00"}}
+        sender.save_feed_history(feeds)
+        sender.load_history()
+
+        feeds = sender.load_feed_history()
+        poller.load_history()
+        confirmed = poller.load_feed_history()
+        confirmed["p"]["succinic"]["confirmed_at"] = "2025-10-02T09:00:00+00:00"
+        confirmed["p"]["biohumus"] = {"last_done": "2025-10-02T09:00:00+00:00"}
+        poller.save_feed_history(confirmed)
+        feeds["p"]["succinic"]["last_done"] = "2025-10-05T06:00:00+00:00"
+        sender.save_feed_history(feeds)
+
+        poller.load_history()
+        assert poller.load_feed_history()["p"] == {
+            "succinic": {"last_done": "2025-10-05T06:00:00+00:00", "confirmed_at": "2025-10-02T09:00:00+00:00"},
+            "biohumus": {"last_done": "2025-10-02T09:00:00+00:00"},
+        }
@@ -0,0 +1,50 @@
+import telegram_client
+from telegram_client import MAX_RETRIES, TokenBucket, deliver_message
+
+
+class FakeResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.text = f"HTTP {status_code}"
+        self.headers = {}
+
+    def json(self):
+        return {}
+
+
+class FakeSession:
+    def __init__(self, statuses: list):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def post(self, url, json=None, timeout=None):
+        self.calls += 1
+        return FakeResponse(self.statuses.pop(0) if self.statuses else 500)
+
+
+def test_server_errors_back_off_only_between_attempts(monkeypatch):
+    sleeps = []
+    monkeypatch.setenv("TELEGRAM_TOKEN", "test")
+    monkeypatch.setattr(telegram_client, "get_chat_bucket", lambda chat_id: TokenBucket(1000))
+    monkeypatch.setattr(telegram_client.time, "sleep", sleeps.append)
+    session = FakeSession([])
+
+    result = deliver_message("текст", chat_id=42, session=session)
+
+    assert not result["ok"]
+    assert session.calls == MAX_RETRIES + 1
+    assert result["retries"] == MAX_RETRIES
+    assert sleeps == [2 ** attempt for attempt in range(MAX_RETRIES)]
+
+
+def test_server_error_then_success(monkeypatch):
+    sleeps = []
+    monkeypatch.setenv("TELEGRAM_TOKEN", "test")
+    monkeypatch.setattr(telegram_client, "get_chat_bucket", lambda chat_id: TokenBucket(1000))
+    monkeypatch.setattr(telegram_client.time, "sleep", sleeps.append)
+
+    result = deliver_message("текст", chat_id=42, session=FakeSession([502, 200]))
+
+    assert result["ok"]
+    assert result["retries"] == 1
+    assert sleeps == [1]
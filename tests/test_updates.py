@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+
+import due_index
+from daemon import default_garden
+from storage import load_json_file
+from updates import ACTION_FED, ACTION_WATERED, UpdatePoller, apply_care, seed_confirmations
+
+AT = "2025-10-02T09:00:00+00:00"
+
+
+def test_apply_care_creates_missing_entries():
+    history = {"old": {"last_reminded": "2025-10-01T06:00:00+00:00"}, "broken": "x"}
+    feed_history = {}
+    applied = apply_care(history, feed_history, [
+        (ACTION_WATERED, "new", None, AT),
+        (ACTION_WATERED, "broken", None, AT),
+        (ACTION_FED, "new", "succinic", AT),
+    ])
+
+    assert applied == 3
+    assert history["new"] == {"last_watered": AT}
+    assert history["broken"] == {"last_watered": AT}
+    assert feed_history == {"new": {"succinic": {"last_done": AT}}}
+
+
+def test_confirmed_care_ignores_unconfirmed_reminders(monkeypatch):
+    entry = {"last_reminded": "2025-10-05T06:00:00+00:00"}
+    assert due_index.last_care_at(entry) == "2025-10-05T06:00:00+00:00"
+
+    monkeypatch.setattr(due_index, "CARE_CONFIRM", True)
+    assert due_index.last_care_at(entry) is None
+    assert due_index.last_care_at(dict(entry, last_watered=AT)) == AT
+
+
+def test_seed_copies_reminders_once():
+    history = {
+        "a": {"last_reminded": "2025-10-01T06:00:00+00:00"},
+        "b": {"last_reminded": "2025-10-01T06:00:00+00:00", "last_watered": AT},
+        "c": {},
+    }
+
+    assert seed_confirmations(history) == 1
+    assert history["a"]["last_watered"] == "2025-10-01T06:00:00+00:00"
+    assert history["b"]["last_watered"] == AT
+    assert seed_confirmations(history) == 0
+
+
+class FakeSession:
+    def post(self, url, json=None, timeout=None):
+        return None
+
+
+def callback(update_id: int, chat_id, data: str = "w|rose") -> dict:
+    return {
+        "update_id": update_id,
+        "callback_query": {"id": str(update_id), "data": data, "message": {"chat": {"id": chat_id}}},
+    }
+
+
+@pytest.fixture
+def poller(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "42")
+    poller = UpdatePoller([default_garden()], str(tmp_path / "updates_state.json"), "token", FakeSession())
+    yield poller
+    poller.close()
+
+
+def test_offset_moves_only_after_history_is_saved(poller, monkeypatch):
+    apply = poller.apply
+
+    def failing_apply(events):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(poller, "apply", failing_apply)
+    with pytest.raises(OSError):
+        poller.handle_updates([callback(10, 42)])
+    assert poller.offset == 0
+    assert not poller.seen
+    assert load_json_file("updates_state.json", None) is None
+
+    monkeypatch.setattr(poller, "apply", apply)
+    assert poller.handle_updates([callback(10, 42)]) == 1
+    assert load_json_file("updates_state.json", {}) == {"offset": 11, "seen": [10]}
+    assert load_json_file("history.json", {})["rose"]["last_watered"]
+    assert poller.handle_updates([callback(10, 42)]) == 0
+    assert poller.stats["duplicates"] == 1
+
+
+def test_callbacks_from_other_chats_are_ignored(poller):
+    assert poller.handle_updates([callback(1, 7), callback(2, 42, "f|rose|succinic")]) == 1
+    assert poller.stats["ignored"] == 1
+    assert "rose" not in load_json_file("history.json", {})
+    assert load_json_file("feed_history.json", {})["rose"]["succinic"]["last_done"]
+
+
+def test_default_garden_without_chat_id_accepts_nothing(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("TELEGRAM_CHAT_ID", raising=False)
+    poller = UpdatePoller([default_garden()], str(tmp_path / "updates_state.json"), "token", FakeSession())
+    try:
+        assert poller.handle_updates([callback(1, 42)]) == 0
+    finally:
+        poller.close()
+    assert "не задан chat_id" in capsys.readouterr().out
+
+
+def test_serve_survives_storage_errors(poller, monkeypatch, capsys):
+    monkeypatch.setattr("updates.UPDATES_RETRY", 0)
+    stop = threading.Event()
+    attempts = []
+
+    def failing_apply(events):
+        attempts.append(events)
+        if len(attempts) == 2:
+            stop.set()
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(poller, "fetch", lambda timeout: [callback(10, 42)])
+    monkeypatch.setattr(poller, "apply", failing_apply)
+    poller.serve(stop, timeout=0)
+
+    assert len(attempts) == 2
+    assert poller.offset == 0
+    assert capsys.readouterr().out.count("Ошибка приёма нажатий: No space left on device") == 2
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import send_tasks
+import validation
+from validation import CatalogError, catalog_errors, drop_invalid, validate_plants
+
+VALID = {"id": "rose", "name": "Роза", "waterFreq": 3, "stage": "bloom", "feeds": [{"id": "succinic", "name": "Янтарная", "intervalDays": 14}]}
+
+
+def test_all_errors_are_reported_with_json_paths():
+    plants = [
+        VALID,
+        {"id": "fern", "name": "", "waterFreq": 0, "stage": "спячка"},
+        {"id": "ROSE", "name": "Роза 2", "waterFreq": 2, "stage": "foliage", "feeds": [
+            {"id": "a", "name": "A", "intervalDays": 7, "months": [0, 5], "conditions": ["rain"]},
+            {"id": "A", "name": "B", "intervalDays": "7"},
+        ]},
+        "не растение",
+    ]
+
+    errors = catalog_errors(plants)
+
+    assert [(index, path) for index, path, _ in errors] == [
+        (1, "$.plants[1].name"),
+        (1, "$.plants[1].waterFreq"),
+        (1, "$.plants[1].stage"),
+        (2, "$.plants[2].feeds[0].months[0]"),
+        (2, "$.plants[2].feeds[0].conditions[0]"),
+        (2, "$.plants[2].feeds[1].intervalDays"),
+        (2, "$.plants[2].feeds[1].id"),
+        (2, "$.plants[2].id"),
+        (3, "$.plants[3]"),
+    ]
+    assert drop_invalid(plants, errors) == [VALID]
+    with pytest.raises(CatalogError) as raised:
+        validate_plants(plants)
+    assert len(raised.value.errors) == len(errors)
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(validation, "VALIDATION_CACHE_FILE", str(tmp_path / "validation_cache.json"))
+    monkeypatch.setattr(validation, "_validated", None)
+    calls = []
+
+    def counted(plants, root):
+        calls.append(root)
+        return catalog_errors(plants, root)
+
+    monkeypatch.setattr(send_tasks, "catalog_errors", counted)
+    filepath = tmp_path / "plants.json"
+    filepath.write_text(json.dumps({"plants": [VALID]}, ensure_ascii=False), encoding="utf-8")
+    return filepath, calls
+
+
+def test_unchanged_file_skips_validation(catalog, monkeypatch):
+    filepath, calls = catalog
+    assert [plant.id for plant in send_tasks.load_plants(str(filepath))] == ["rose"]
+    assert len(calls) == 1
+
+    monkeypatch.setattr(validation, "_validated", None)
+    assert [plant.id for plant in send_tasks.load_plants(str(filepath))] == ["rose"]
+    assert len(calls) == 1
+
+
+def test_changed_file_is_validated_again(catalog, capsys):
+    filepath, calls = catalog
+    send_tasks.load_plants(str(filepath))
+    broken = dict(VALID, id="tulip", waterFreq=-1)
+    filepath.write_text(json.dumps({"plants": [VALID, broken]}, ensure_ascii=False), encoding="utf-8")
+
+    assert [plant.id for plant in send_tasks.load_plants(str(filepath))] == ["rose"]
+    assert len(calls) == 2
+    assert "$.plants[1].waterFreq" in capsys.readouterr().out
+    send_tasks.load_plants(str(filepath))
+    assert len(calls) == 3
+
+
+def test_unknown_only_stage_rejects_plant():
+    feed = dict(VALID["feeds"][0], onlyStages=["bloom", "цветение"])
+    plants = [dict(VALID, feeds=[feed])]
+
+    errors = catalog_errors(plants)
+
+    assert [(index, path) for index, path, _ in errors] == [(0, "$.plants[0].feeds[0].onlyStages[1]")]
+    assert drop_invalid(plants, errors) == []
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmarks.generate import generate_garden
+from catalog import compile_plant
+import send_tasks
+import vector_rules
+from send_tasks import md_escape, parse_iso_dt, plan_garden
+from vector_rules import due_plants_and_feeds
+
+EDGE_OFFSETS = [
+    None,
+    "",
+    "не дата",
+    timedelta(0),
+    timedelta(microseconds=1),
+    timedelta(days=-1),
+    timedelta(days=3),
+    timedelta(days=3, microseconds=-1),
+    timedelta(days=7),
+    timedelta(days=7, seconds=-1),
+    timedelta(days=14, hours=23, minutes=59, seconds=59),
+    timedelta(days=400),
+]
+
+
+def edge_value(now_utc: datetime, offset, style: int):
+    if not isinstance(offset, timedelta):
+        return offset
+    at = now_utc - offset
+    if style == 0:
+        return at.isoformat()
+    if style == 1:
+        return at.replace(tzinfo=None).isoformat(timespec="seconds") + "Z"
+    if style == 2:
+        return at.astimezone(timezone(timedelta(hours=3))).isoformat()
+    return at.replace(tzinfo=None).isoformat()
+
+
+def garden(now_utc: datetime, count: int = 400):
+    raw, history, feed_history = generate_garden(count, now_utc, seed=now_utc.month)
+    plants = [compile_plant(plant, md_escape) for plant in raw]
+    for position, plant in enumerate(plants[:len(EDGE_OFFSETS) * 4]):
+        offset = EDGE_OFFSETS[position % len(EDGE_OFFSETS)]
+        style = position // len(EDGE_OFFSETS)
+        history[plant.id] = {"last_reminded": edge_value(now_utc, offset, style)}
+        feed_history[plant.id] = {feed.id: {"last_done": edge_value(now_utc, offset, style)} for feed in plant.feeds}
+    history[plants[-1].id] = "повреждено"
+    history.pop(plants[-2].id, None)
+    feed_history[plants[-3].id] = "повреждено"
+    feed_history.pop(plants[-4].id, None)
+    return plants, history, feed_history
+
+
+def assert_parity(plants, history, feed_history, now_utc):
+    plan = plan_garden(plants, history, feed_history, now_utc, rules_engine="python")
+    plant_ids, feed_keys = due_plants_and_feeds(plants, history, feed_history, now_utc, parse_iso_dt)
+    assert list(plant_ids) == plan["plants_to_remind"]
+    assert list(feed_keys) == plan["due_feeds_to_mark"]
+
+
+@pytest.mark.parametrize("month", range(1, 13))
+def test_parity_on_month_boundaries(month):
+    first = datetime(2025, month, 1, tzinfo=timezone.utc)
+    last = (first + timedelta(days=32)).replace(day=1) - timedelta(microseconds=1)
+    for now_utc in (first, first + timedelta(hours=12, minutes=30), last):
+        assert_parity(*garden(now_utc), now_utc)
+
+
+def test_parity_with_empty_history():
+    now_utc = datetime(2025, 6, 15, 6, tzinfo=timezone.utc)
+    plants, _, _ = garden(now_utc)
+    assert_parity(plants, {}, {}, now_utc)
+
+
+def test_parity_on_leap_day():
+    now_utc = datetime(2024, 2, 29, 23, 59, 59, tzinfo=timezone.utc)
+    assert_parity(*garden(now_utc), now_utc)
+
+
+def test_numpy_engine_plans_same_message():
+    now_utc = datetime(2025, 3, 31, 23, 59, 59, tzinfo=timezone.utc)
+    plants, history, feed_history = garden(now_utc)
+    assert plan_garden(plants, history, feed_history, now_utc, rules_engine="numpy") == plan_garden(
+        plants, history, feed_history, now_utc, rules_engine="python"
+    )
+
+
+def test_numpy_engine_falls_back_without_numpy(monkeypatch, capsys):
+    now_utc = datetime(2025, 6, 15, 6, tzinfo=timezone.utc)
+    plants, history, feed_history = garden(now_utc)
+    monkeypatch.setattr(vector_rules, "np", None)
+    monkeypatch.setattr(send_tasks, "_numpy_missing_reported", False)
+
+    plan = plan_garden(plants, history, feed_history, now_utc, rules_engine="numpy")
+    plan_garden(plants, history, feed_history, now_utc, rules_engine="numpy")
+
+    assert plan == plan_garden(plants, history, feed_history, now_utc, rules_engine="python")
+    assert capsys.readouterr().out.count("numpy не установлен") == 1
@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+
+import pytest
+
+import circuit
+import weather
+
+
+@pytest.fixture
+def owm(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "test")
+    monkeypatch.setattr(circuit, "CIRCUIT_FILE", str(tmp_path / "circuits.json"))
+    monkeypatch.setattr(circuit, "_circuits", None)
+    monkeypatch.setattr(weather, "WEATHER_CACHE_FILE", str(tmp_path / "weather_cache.json"))
+    monkeypatch.setattr(weather, "_cache", None)
+    monkeypatch.setattr(weather, "_inflight", {})
+    monkeypatch.setattr(weather, "_stats", {"hits": 0, "misses": 0, "stale": 0})
+    calls = []
+
+    def fetch(city, api_key):
+        calls.append(city)
+        return {"available": True, "temp": 20 + len(calls), "hum": 50, "desc": "ясно", "wind": 1.0, "city": city}
+
+    monkeypatch.setattr(weather, "fetch_weather", fetch)
+    return calls
+
+
+def write_cache(city: str, temp: int, age: float):
+    with open(weather.WEATHER_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump({weather.normalize_city(city): {
+            "weather": {"available": True, "temp": temp, "hum": 40, "desc": "облачно", "wind": 2.0, "city": city},
+            "fetched_at": time.time() - age,
+        }}, f)
+
+
+def test_fresh_cache_is_served_without_request(owm):
+    write_cache("Moscow", 5, weather.WEATHER_CACHE_TTL - 60)
+
+    assert weather.get_weather(" moscow ")["temp"] == 5
+    assert owm == []
+    assert weather.weather_cache_stats()["hits"] == 1
+
+
+def test_expired_cache_is_refetched_and_saved(owm):
+    write_cache("Moscow", 5, weather.WEATHER_CACHE_TTL + 60)
+
+    assert weather.get_weather("Moscow")["temp"] == 21
+    assert owm == ["Moscow"]
+    with open(weather.WEATHER_CACHE_FILE, encoding="utf-8") as f:
+        assert json.load(f)["moscow"]["weather"]["temp"] == 21
+
+
+def test_failed_request_falls_back_to_stale_weather(owm, monkeypatch, capsys):
+    def broken(city, api_key):
+        raise RuntimeError("503")
+
+    monkeypatch.setattr(weather, "fetch_weather", broken)
+    write_cache("Moscow", 5, weather.WEATHER_STALE_MAX - 60)
+    stale = weather.get_weather("Moscow")
+    assert stale["temp"] == 5
+    assert stale["stale"] is True
+    assert "сохранённые данные" in capsys.readouterr().out
+
+    write_cache("Moscow", 5, weather.WEATHER_STALE_MAX + 60)
+    monkeypatch.setattr(weather, "_cache", None)
+    assert weather.get_weather("Moscow")["available"] is False
+    assert weather.weather_cache_stats()["stale"] == 1
+
+
+def test_concurrent_requests_for_one_city_are_coalesced(owm, monkeypatch):
+    fetch = weather.fetch_weather
+    release = threading.Event()
+
+    def slow(city, api_key):
+        release.wait(5)
+        return fetch(city, api_key)
+
+    monkeypatch.setattr(weather, "fetch_weather", slow)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(weather.get_weather("Moscow", persist=False))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while sum(weather.weather_cache_stats().values()) < 8 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert owm == ["Moscow"]
+    assert [result["temp"] for result in results] == [21] * 8
+    assert weather.weather_cache_stats() == {"hits": 7, "misses": 1, "stale": 0}
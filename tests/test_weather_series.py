@@ -0,0 +1,68 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pytest
+
+import weather_series
+from weather_series import WeatherSeries
+
+
+def test_appends_from_two_handles_share_one_ring(tmp_path):
+    filepath = str(tmp_path / "moscow.bin")
+    daemon = WeatherSeries(filepath, capacity=8)
+    cron = WeatherSeries(filepath)
+
+    assert daemon.append(1000, 10)
+    assert cron.append(2000, 11)
+    assert not daemon.append(2100, 12, min_gap=600)
+    assert daemon.append(3000, 13)
+
+    assert [record[0] for record in cron.recent(10_000, 3000)] == [1000, 2000, 3000]
+    assert daemon.last()[0] == cron.last()[0] == 3000
+
+
+def append_many(filepath, start):
+    series = WeatherSeries(filepath)
+    for ts in range(start, start + 50):
+        series.append(ts, ts % 30)
+    series.close()
+
+
+def test_concurrent_processes_never_overwrite_each_other(tmp_path):
+    filepath = str(tmp_path / "moscow.bin")
+    WeatherSeries(filepath, capacity=512).close()
+
+    starts = [1000 * number for number in range(1, 9)]
+    with ProcessPoolExecutor(max_workers=8, mp_context=get_context("fork")) as pool:
+        list(pool.map(append_many, [filepath] * len(starts), starts))
+
+    stamps = sorted(record[0] for record in WeatherSeries(filepath).recent(10**6, 10**6))
+    assert stamps == sorted(ts for start in starts for ts in range(start, start + 50))
+
+
+def test_open_series_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(weather_series, "WEATHER_SERIES_DIR", str(tmp_path))
+    monkeypatch.setattr(weather_series, "WEATHER_SERIES_OPEN_MAX", 2)
+    monkeypatch.setattr(weather_series, "_series", weather_series.OrderedDict())
+
+    moscow = weather_series.get_series("Moscow")
+    weather_series.get_series("Kazan")
+    assert weather_series.get_series("moscow ") is moscow
+    weather_series.get_series("Perm")
+
+    assert list(weather_series._series) == ["moscow", "perm"]
+    kazan = weather_series.get_series("Kazan")
+    assert list(weather_series._series) == ["perm", "kazan"]
+    assert moscow._map is None
+
+    assert moscow.append(1000, 5)
+    assert moscow.last()[0] == 1000
+    moscow.close()
+    kazan.close()
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    filepath = tmp_path / "broken.bin"
+    filepath.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        WeatherSeries(str(filepath))
@@ -0,0 +1,322 @@
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from due_index import CARE_CONFIRM
+from storage import get_storage, load_json_file, save_json_file
+from telegram_client import POOL_SIZE, api_url, get_session
+
+UPDATES_STATE_FILE = os.getenv("UPDATES_STATE_FILE", "updates_state.json")
+UPDATES_POLL_TIMEOUT = int(os.getenv("UPDATES_POLL_TIMEOUT", "25"))
+UPDATES_RETRY = float(os.getenv("UPDATES_RETRY", "5"))
+UPDATES_SEEN_MAX = int(os.getenv("UPDATES_SEEN_MAX", "10000"))
+UPDATES_LIMIT = 100
+CARE_BUTTONS = CARE_CONFIRM or os.getenv("CARE_BUTTONS", "").strip() not in ("", "0", "false", "no")
+CARE_BUTTONS_MAX = 90
+CALLBACK_DATA_LIMIT = 64
+
+ACTION_WATERED = "w"
+ACTION_FED = "f"
+ANSWERS = {
+    ACTION_WATERED: "💧 Полив отмечен",
+    ACTION_FED: "🧪 Подкормка отмечена",
+    None: "Кнопка устарела",
+}
+
+
+def care_button(text: str, *parts):
+    if any("|" in part for part in parts):
+        return None
+    data = "|".join(parts)
+    if len(data.encode("utf-8")) > CALLBACK_DATA_LIMIT:
+        return None
+    return {"text": text, "callback_data": data}
+
+
+def care_buttons(plant, due_feeds) -> list:
+    feed_names = {feed.id: feed.name for feed in plant.feeds}
+    row = [care_button(f"💧 {plant.name}", ACTION_WATERED, plant.id)]
+    for feed_id in due_feeds:
+        row.append(care_button(f"🧪 {feed_names.get(feed_id) or feed_id}", ACTION_FED, plant.id, feed_id))
+    return [button for button in row if button]
+
+
+def care_keyboard(plan: dict):
+    rows = []
+    left = CARE_BUTTONS_MAX
+    for row in plan.get("buttons", ()):
+        row = row[:left]
+        if row:
+            rows.append(row)
+            left -= len(row)
+    return {"inline_keyboard": rows} if rows else None
+
+
+def parse_callback(data):
+    parts = str(data or "").split("|")
+    if len(parts) == 2 and parts[0] == ACTION_WATERED and parts[1]:
+        return ACTION_WATERED, parts[1], None
+    if len(parts) == 3 and parts[0] == ACTION_FED and parts[1] and parts[2]:
+        return ACTION_FED, parts[1], parts[2]
+    return None
+
+
+def apply_care(history: dict, feed_history: dict, events: list) -> int:
+    applied = 0
+    for action, plant_id, feed_id, at in events:
+        if action == ACTION_WATERED:
+            if not isinstance(history.get(plant_id), dict):
+                history[plant_id] = {}
+            history[plant_id]["last_watered"] = at
+        else:
+            if not isinstance(feed_history.get(plant_id), dict):
+                feed_history[plant_id] = {}
+            if not isinstance(feed_history[plant_id].get(feed_id), dict):
+                feed_history[plant_id][feed_id] = {}
+            feed_history[plant_id][feed_id]["last_done"] = at
+        applied += 1
+    return applied
+
+
+def seed_confirmations(history: dict) -> int:
+    seeded = 0
+    for entry in history.values():
+        if isinstance(entry, dict) and entry.get("last_reminded") and not entry.get("last_watered"):
+            entry["last_watered"] = entry["last_reminded"]
+            seeded += 1
+    return seeded
+
+
+def seed_gardens(gardens: list) -> int:
+    seeded = 0
+    for garden in gardens:
+        storage = get_storage(
+            garden["history"],
+            garden["feed_history"],
+            garden["id"],
+            garden["last_weather"],
+            garden["journal"],
+        )
+        try:
+            history = storage.load_history()
+            count = seed_confirmations(history)
+            if count:
+                storage.save_history(history)
+            seeded += count
+        finally:
+            storage.close()
+    return seeded
+
+
+class UpdatePoller:
+    def __init__(self, gardens: list, state_file: str = UPDATES_STATE_FILE, token: str = None, session=None):
+        self.gardens = {}
+        for garden in gardens:
+            chat_id = garden.get("chat_id") or os.getenv("TELEGRAM_CHAT_ID")
+            if not chat_id:
+                print(f"WARNING: {garden['id']}: не задан chat_id, нажатия для этого сада не принимаются")
+                continue
+            self.gardens.setdefault(str(chat_id), []).append(garden)
+        self.state_file = state_file
+        state = load_json_file(state_file, {})
+        self.offset = state.get("offset", 0)
+        self.seen = OrderedDict.fromkeys(state.get("seen", []))
+        self.token = token
+        self.session = session or get_session()
+        self.answers = ThreadPoolExecutor(max_workers=POOL_SIZE)
+        self.stats = {"updates": 0, "applied": 0, "duplicates": 0, "ignored": 0, "batches": 0}
+
+    def route(self, chat_id) -> list:
+        return self.gardens.get(str(chat_id), [])
+
+    def fetch(self, timeout: int) -> list:
+        response = self.session.post(
+            api_url("getUpdates", self.token),
+            json={
+                "offset": self.offset,
+                "timeout": timeout,
+                "limit": UPDATES_LIMIT,
+                "allowed_updates": ["callback_query"],
+            },
+            timeout=timeout + 10,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data.get("ok"):
+            raise RuntimeError(data.get("description") or "getUpdates вернул ошибку")
+        return data.get("result", [])
+
+    def collect(self, updates: list):
+        events = {}
+        answers = []
+        offset = self.offset
+        seen = OrderedDict()
+        stats = {"updates": 0, "duplicates": 0, "ignored": 0}
+        at = datetime.now(timezone.utc).isoformat()
+
+        for update in updates:
+            update_id = update.get("update_id")
+            if not isinstance(update_id, int):
+                continue
+            offset = max(offset, update_id + 1)
+            stats["updates"] += 1
+            if update_id in self.seen or update_id in seen:
+                stats["duplicates"] += 1
+                continue
+            seen[update_id] = None
+
+            query = update.get("callback_query")
+            if not isinstance(query, dict):
+                stats["ignored"] += 1
+                continue
+            parsed = parse_callback(query.get("data"))
+            chat_id = (query.get("message") or {}).get("chat", {}).get("id")
+            gardens = self.route(chat_id) if parsed else []
+            if not gardens:
+                stats["ignored"] += 1
+                answers.append((query.get("id"), ANSWERS[None]))
+                continue
+            for garden in gardens:
+                events.setdefault(garden["id"], (garden, []))[1].append(parsed + (at,))
+            answers.append((query.get("id"), ANSWERS[parsed[0]]))
+
+        return events, answers, offset, seen, stats
+
+    def apply(self, events: dict) -> int:
+        applied = 0
+        for garden, garden_events in events.values():
+            storage = get_storage(
+                garden["history"],
+                garden["feed_history"],
+                garden["id"],
+                garden["last_weather"],
+                garden["journal"],
+            )
+            try:
+                history = storage.load_history()
+                feed_history = storage.load_feed_history()
+                count = apply_care(history, feed_history, garden_events)
+                if count:
+                    storage.save_history(history)
+                    storage.save_feed_history(feed_history)
+                applied += count
+            finally:
+                storage.close()
+        return applied
+
+    def save_state(self):
+        save_json_file(self.state_file, {"offset": self.offset, "seen": list(self.seen)})
+
+    def answer(self, query_id, text: str):
+        import requests
+
+        try:
+            self.session.post(
+                api_url("answerCallbackQuery", self.token),
+                json={"callback_query_id": query_id, "text": text},
+                timeout=10,
+            )
+        except requests.RequestException:
+            pass
+
+    def handle_updates(self, updates: list) -> int:
+        if not updates:
+            return 0
+        events, answers, offset, seen, stats = self.collect(updates)
+        applied = self.apply(events)
+        self.offset = offset
+        self.seen.update(seen)
+        while len(self.seen) > UPDATES_SEEN_MAX:
+            self.seen.popitem(last=False)
+        self.save_state()
+        for key, value in stats.items():
+            self.stats[key] += value
+        self.stats["applied"] += applied
+        self.stats["batches"] += 1
+        for query_id, text in answers:
+            if query_id:
+                self.answers.submit(self.answer, query_id, text)
+        return applied
+
+    def poll_once(self, timeout: int = 0) -> int:
+        updates = self.fetch(timeout)
+        self.handle_updates(updates)
+        return len(updates)
+
+    def drain(self) -> int:
+        total = 0
+        while True:
+            count = self.poll_once(0)
+            total += count
+            if count < UPDATES_LIMIT:
+                return total
+
+    def serve(self, stop: threading.Event, timeout: int = UPDATES_POLL_TIMEOUT):
+        while not stop.is_set():
+            try:
+                self.poll_once(timeout)
+            except (OSError, RuntimeError, ValueError) as e:
+                print(f"Ошибка приёма нажатий: {e}. Повтор через {UPDATES_RETRY:g} с.")
+                stop.wait(UPDATES_RETRY)
+
+    def close(self):
+        self.answers.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Приём нажатий «полил» и «подкормил» из Telegram")
+    parser.add_argument("manifest", nargs="?", help="JSON-файл со списком садов; без него — один сад из текущей папки")
+    parser.add_argument("--once", action="store_true", help="забрать накопившиеся нажатия и выйти")
+    parser.add_argument("--timeout", type=int, default=UPDATES_POLL_TIMEOUT, help="таймаут long polling, секунд")
+    parser.add_argument("--seed", action="store_true", help="перед включением CARE_CONFIRM: считать последние напоминания подтверждёнными поливами и выйти")
+    args = parser.parse_args(argv)
+
+    from batch import load_manifest
+    from daemon import default_garden
+
+    try:
+        gardens = load_manifest(args.manifest) if args.manifest else [default_garden()]
+    except Exception as e:
+        print(f"ERROR: manifest не загружен — {e}")
+        sys.exit(1)
+    if args.seed:
+        print(f"✅ Садов: {len(gardens)}, растений с перенесённой датой полива: {seed_gardens(gardens)}")
+        return
+
+    if not os.getenv("TELEGRAM_TOKEN"):
+        print("ERROR: не задан TELEGRAM_TOKEN")
+        sys.exit(1)
+
+    poller = UpdatePoller(gardens)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    started = time.perf_counter()
+    try:
+        if args.once:
+            poller.drain()
+        else:
+            print(f"📬 Приём нажатий запущен, садов: {len(gardens)}")
+            poller.serve(stop, args.timeout)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"ERROR: getUpdates — {e}")
+        sys.exit(1)
+    finally:
+        poller.close()
+
+    stats = poller.stats
+    print(
+        f"📬 Обновлений {stats['updates']}, отмечено {stats['applied']}, "
+        f"дублей {stats['duplicates']}, пропущено {stats['ignored']}, "
+        f"пачек {stats['batches']}, {time.perf_counter() - started:.2f} с"
+    )
+
+
+if __name__ == "__main__":
+    main()
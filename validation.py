@@ -0,0 +1,177 @@
+import os
+import threading
+
+from storage import load_json_file, save_json_file
+
+VALID_STAGES = {"foliage", "bloom", "dormant", "recover", "покой", "восстановление"}
+VALID_CONDITIONS = {"buds", "flower_spike", "active_growth"}
+VALIDATION_CACHE_FILE = os.getenv("VALIDATION_CACHE_FILE", "validation_cache.json")
+VALIDATION_CACHE_MAX_ENTRIES = 256
+VALIDATOR_VERSION = 2
+
+_validated = None
+_cache_lock = threading.Lock()
+
+
+class CatalogError(ValueError):
+    def __init__(self, errors: list):
+        self.errors = errors
+        super().__init__("; ".join(f"{path}: {message}" for _, path, message in errors))
+
+
+def is_non_empty_str(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+def feed_errors(feed, path: str) -> list:
+    if not isinstance(feed, dict):
+        return [(path, "должен быть объектом")]
+
+    errors = []
+    if not is_non_empty_str(feed.get("id")):
+        errors.append((f"{path}.id", "обязателен и должен быть строкой"))
+    if not is_non_empty_str(feed.get("name")):
+        errors.append((f"{path}.name", "обязателен и должен быть строкой"))
+
+    interval_days = feed.get("intervalDays")
+    if not isinstance(interval_days, int) or isinstance(interval_days, bool) or interval_days <= 0:
+        errors.append((f"{path}.intervalDays", "должен быть целым числом > 0"))
+
+    months = feed.get("months", [])
+    if months is not None:
+        if not isinstance(months, list):
+            errors.append((f"{path}.months", "должен быть списком"))
+        else:
+            for i, month in enumerate(months):
+                if not isinstance(month, int) or isinstance(month, bool) or month < 1 or month > 12:
+                    errors.append((f"{path}.months[{i}]", f"недопустимый месяц {month!r}"))
+
+    only_stages = feed.get("onlyStages", [])
+    if only_stages is not None:
+        if not isinstance(only_stages, list):
+            errors.append((f"{path}.onlyStages", "должен быть списком"))
+        else:
+            for i, stage in enumerate(only_stages):
+                if not is_non_empty_str(stage):
+                    errors.append((f"{path}.onlyStages[{i}]", "некорректное значение"))
+                elif stage.strip().lower() not in VALID_STAGES:
+                    errors.append((f"{path}.onlyStages[{i}]", f"неизвестная стадия '{stage}'"))
+
+    conditions = feed.get("conditions", [])
+    if conditions is not None:
+        if not isinstance(conditions, list):
+            errors.append((f"{path}.conditions", "должен быть списком"))
+        else:
+            for i, cond in enumerate(conditions):
+                if not is_non_empty_str(cond):
+                    errors.append((f"{path}.conditions[{i}]", "некорректное значение"))
+                elif cond.strip().lower() not in VALID_CONDITIONS:
+                    errors.append((f"{path}.conditions[{i}]", f"неизвестное условие '{cond}'"))
+    return errors
+
+
+def plant_errors(plant, path: str) -> list:
+    if not isinstance(plant, dict):
+        return [(path, "должен быть объектом")]
+
+    errors = []
+    if not is_non_empty_str(plant.get("id")):
+        errors.append((f"{path}.id", "обязателен и должен быть строкой"))
+    if not is_non_empty_str(plant.get("name")):
+        errors.append((f"{path}.name", "обязателен и должен быть строкой"))
+
+    water_freq = plant.get("waterFreq")
+    if not isinstance(water_freq, int) or isinstance(water_freq, bool) or water_freq <= 0:
+        errors.append((f"{path}.waterFreq", "должен быть целым числом > 0"))
+
+    stage = plant.get("stage")
+    if not is_non_empty_str(stage):
+        errors.append((f"{path}.stage", "обязателен и должен быть строкой"))
+    elif stage.strip().lower() not in VALID_STAGES:
+        errors.append((f"{path}.stage", f"неизвестная стадия '{stage}'"))
+
+    flags = plant.get("flags", {})
+    if flags is not None and not isinstance(flags, dict):
+        errors.append((f"{path}.flags", "должен быть объектом"))
+
+    feeds = plant.get("feeds", [])
+    if feeds is None:
+        return errors
+    if not isinstance(feeds, list):
+        errors.append((f"{path}.feeds", "должен быть списком"))
+        return errors
+
+    seen_feed_ids = set()
+    for i, feed in enumerate(feeds):
+        feed_path = f"{path}.feeds[{i}]"
+        errors.extend(feed_errors(feed, feed_path))
+        if isinstance(feed, dict) and is_non_empty_str(feed.get("id")):
+            feed_id = feed["id"].strip().lower()
+            if feed_id in seen_feed_ids:
+                errors.append((f"{feed_path}.id", f"дублирующийся id подкормки '{feed['id']}'"))
+            seen_feed_ids.add(feed_id)
+    return errors
+
+
+def catalog_errors(plants, root: str = "$.plants") -> list:
+    if not isinstance(plants, list):
+        return [(None, root, "должен быть списком растений")]
+
+    errors = []
+    seen_ids = {}
+    for index, plant in enumerate(plants):
+        path = f"{root}[{index}]"
+        errors.extend((index, error_path, message) for error_path, message in plant_errors(plant, path))
+        if isinstance(plant, dict) and is_non_empty_str(plant.get("id")):
+            plant_id = plant["id"].strip().lower()
+            if plant_id in seen_ids:
+                errors.append((
+                    index, f"{path}.id",
+                    f"дублирующийся id растения '{plant['id']}' (уже есть в {root}[{seen_ids[plant_id]}])",
+                ))
+            else:
+                seen_ids[plant_id] = index
+    return errors
+
+
+def validate_plants(plants, root: str = "$.plants"):
+    errors = catalog_errors(plants, root)
+    if errors:
+        raise CatalogError(errors)
+
+
+def drop_invalid(plants, errors: list) -> list:
+    if not isinstance(plants, list) or any(index is None for index, _, _ in errors):
+        return []
+    invalid = {index for index, _, _ in errors}
+    return [plant for index, plant in enumerate(plants) if index not in invalid]
+
+
+def print_errors(filepath: str, errors: list):
+    print(f"ERROR: {filepath}: ошибок валидации — {len(errors)}")
+    for _, path, message in errors:
+        print(f"  {path}: {message}")
+
+
+def _load_validated() -> dict:
+    global _validated
+    if _validated is None:
+        data = load_json_file(VALIDATION_CACHE_FILE, {})
+        hashes = data.get("hashes", []) if data.get("version") == VALIDATOR_VERSION else []
+        _validated = dict.fromkeys(digest for digest in hashes if isinstance(digest, str))
+    return _validated
+
+
+def is_validated(digest: str) -> bool:
+    with _cache_lock:
+        return digest in _load_validated()
+
+
+def mark_validated(digest: str):
+    with _cache_lock:
+        validated = _load_validated()
+        validated.pop(digest, None)
+        validated[digest] = None
+        while len(validated) > VALIDATION_CACHE_MAX_ENTRIES:
+            validated.pop(next(iter(validated)))
+        save_json_file(VALIDATION_CACHE_FILE, {"version": VALIDATOR_VERSION, "hashes": list(validated)})
@@ -0,0 +1,194 @@
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from due_index import last_care_at
+
+MISSING = np.iinfo(np.int64).min if np is not None else None
+MISSING_HISTORY_DAYS = 999
+US_PER_DAY = 86400 * 1_000_000
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def epoch_us(dt: datetime) -> int:
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("для векторного движка нужен numpy: pip install numpy")
+
+
+class VectorCatalog:
+    def __init__(self, plants):
+        require_numpy()
+        self.plant_ids = [plant.id for plant in plants]
+        self.water_freq = np.array([plant.water_freq for plant in plants], dtype=np.int64)
+        self.stage = np.array([plant.stage for plant in plants], dtype=np.int64)
+        self.feeding_allowed = np.array([plant.feeding_allowed for plant in plants], dtype=bool)
+        self.flag_mask = np.array([plant.flag_mask for plant in plants], dtype=np.int64)
+
+        feed_plant = []
+        self.feed_keys = []
+        interval_days = []
+        month_mask = []
+        stage_mask = []
+        cond_mask = []
+        for position, plant in enumerate(plants):
+            for feed in plant.feeds:
+                feed_plant.append(position)
+                self.feed_keys.append((plant.id, feed.id))
+                interval_days.append(feed.interval_days)
+                month_mask.append(feed.month_mask)
+                stage_mask.append(feed.stage_mask)
+                cond_mask.append(feed.cond_mask)
+
+        self.feed_plant = np.array(feed_plant, dtype=np.int64)
+        self.interval_days = np.array(interval_days, dtype=np.int64)
+        self.month_mask = np.array(month_mask, dtype=np.int64)
+        self.stage_mask = np.array(stage_mask, dtype=np.int64)
+        self.cond_mask = np.array(cond_mask, dtype=np.int64)
+
+
+def parse_epochs_us(values: list, parse_iso_dt):
+    require_numpy()
+    result = np.full(len(values), MISSING, dtype=np.int64)
+    fast_positions = []
+    fast_values = []
+    for position, value in enumerate(values):
+        if not value:
+            continue
+        if isinstance(value, str):
+            core = value[:-6] if value.endswith("+00:00") else value[:-1] if value.endswith("Z") else None
+            if core is not None and len(core) in (19, 26) and core[10] == "T":
+                fast_positions.append(position)
+                fast_values.append(core)
+                continue
+        dt = parse_iso_dt(value)
+        if dt is not None:
+            result[position] = epoch_us(dt)
+
+    if fast_values:
+        try:
+            parsed = np.array(fast_values, dtype="datetime64[us]").astype(np.int64)
+        except ValueError:
+            parsed = [
+                epoch_us(dt) if dt is not None else MISSING
+                for dt in (parse_iso_dt(f"{value}+00:00") for value in fast_values)
+            ]
+        result[np.array(fast_positions, dtype=np.int64)] = parsed
+    return result
+
+
+def load_epochs(vc: VectorCatalog, history: dict, feed_history: dict, parse_iso_dt):
+    reminded = [last_care_at(history.get(plant_id)) for plant_id in vc.plant_ids]
+
+    done = []
+    for plant_id, feed_id in vc.feed_keys:
+        feeds = feed_history.get(plant_id, {})
+        entry = feeds.get(feed_id, {}) if isinstance(feeds, dict) else {}
+        done.append(entry.get("last_done") if isinstance(entry, dict) else None)
+
+    return parse_epochs_us(reminded, parse_iso_dt), parse_epochs_us(done, parse_iso_dt)
+
+
+def days_passed(last_us, now_us: int):
+    days = np.full(len(last_us), MISSING_HISTORY_DAYS, dtype=np.int64)
+    known = last_us != MISSING
+    days[known] = (now_us - last_us[known]) // US_PER_DAY
+    return days, known
+
+
+def evaluate(vc: VectorCatalog, last_reminded_us, last_done_us, now_utc: datetime):
+    now_us = epoch_us(now_utc)
+
+    plant_days, _ = days_passed(last_reminded_us, now_us)
+    plant_due = plant_days >= vc.water_freq
+
+    fp = vc.feed_plant
+    month_ok = (vc.month_mask & (1 << now_utc.month)) != 0
+    stage_ok = (vc.stage_mask == 0) | ((vc.stage_mask & (np.int64(1) << vc.stage[fp])) != 0)
+    cond_ok = (vc.cond_mask & ~vc.flag_mask[fp]) == 0
+    feed_days, feed_known = days_passed(last_done_us, now_us)
+    interval_ok = ~feed_known | (feed_days >= vc.interval_days)
+
+    feed_due = plant_due[fp] & vc.feeding_allowed[fp] & month_ok & stage_ok & cond_ok & interval_ok
+    return np.flatnonzero(plant_due), np.flatnonzero(feed_due)
+
+
+def due_plant_positions(plants, history: dict, now_utc: datetime, parse_iso_dt):
+    require_numpy()
+    water_freq = np.array([plant.water_freq for plant in plants], dtype=np.int64)
+    last_us = parse_epochs_us([last_care_at(history.get(plant.id)) for plant in plants], parse_iso_dt)
+    days, _ = days_passed(last_us, epoch_us(now_utc))
+    return np.flatnonzero(days >= water_freq).tolist()
+
+
+def due_plants_and_feeds(plants, history: dict, feed_history: dict, now_utc: datetime, parse_iso_dt):
+    vc = VectorCatalog(plants)
+    last_reminded_us, last_done_us = load_epochs(vc, history, feed_history, parse_iso_dt)
+    plant_positions, feed_positions = evaluate(vc, last_reminded_us, last_done_us, now_utc)
+    return (
+        [vc.plant_ids[i] for i in plant_positions],
+        [vc.feed_keys[i] for i in feed_positions],
+    )
+
+
+def scalar_due_plants_and_feeds(plants, history: dict, feed_history: dict, now_utc: datetime):
+    from send_tasks import plan_garden
+
+    plan = plan_garden(plants, history, feed_history, now_utc, rules_engine="python")
+    return plan["plants_to_remind"], plan["due_feeds_to_mark"]
+
+
+def check_parity(plants, history: dict, feed_history: dict, now_utc: datetime, parse_iso_dt) -> bool:
+    started = time.perf_counter()
+    vector = due_plants_and_feeds(plants, history, feed_history, now_utc, parse_iso_dt)
+    vector_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scalar = scalar_due_plants_and_feeds(plants, history, feed_history, now_utc)
+    scalar_elapsed = time.perf_counter() - started
+
+    ok = list(vector[0]) == list(scalar[0]) and list(vector[1]) == list(scalar[1])
+    print(
+        f"{'✅' if ok else '❌'} "
+        f"numpy: {len(vector[0])} поливов, {len(vector[1])} подкормок за {vector_elapsed:.3f} с; "
+        f"rules.py: {len(scalar[0])} поливов, {len(scalar[1])} подкормок за {scalar_elapsed:.3f} с"
+    )
+    return ok
+
+
+def main(argv=None):
+    from send_tasks import load_plants, parse_iso_dt
+    from storage import get_storage
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] != ["check"]:
+        print("Использование: python vector_rules.py check")
+        sys.exit(2)
+
+    plants = load_plants()
+    storage = get_storage()
+    try:
+        history = storage.load_history()
+        feed_history = storage.load_feed_history()
+    finally:
+        storage.close()
+
+    ok = True
+    now_utc = datetime.now(timezone.utc)
+    for month in range(1, 13):
+        month_start = now_utc.replace(month=month, day=1)
+        ok = check_parity(plants, history, feed_history, month_start, parse_iso_dt) and ok
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,188 @@
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+from circuit import CircuitCall, check_circuit
+from storage import atomic_open
 
+WEATHER_CACHE_FILE = "weather_cache.json"
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "1800"))
+WEATHER_STALE_MAX = int(os.getenv("WEATHER_STALE_MAX", "21600"))
+WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", "10"))
+WEATHER_CIRCUIT = "weather"
+OPENWEATHER_API_URL = os.getenv("OPENWEATHER_API_URL", "https://api.openweathermap.org/data/2.5").rstrip("/")
 
-def get_weather():
+_cache = None
+_cache_lock = threading.Lock()
+_save_lock = threading.Lock()
+_inflight = {}
+_stats = {"hits": 0, "misses": 0, "stale": 0}
+
+
+def normalize_city(city) -> str:
+    return " ".join(str(city or "").split()).casefold()
+
+
+def unavailable_weather(city):
+    return {
+        "available": False,
+        "temp": None,
+        "hum": None,
+        "desc": "нет данных",
+        "wind": None,
+        "city": city,
+    }
+
+
+def fetch_weather(city: str, api_key: str) -> dict:
+    import requests
+
+    url = (
+        f"{OPENWEATHER_API_URL}/weather"
+        f"?q={city}&appid={api_key}&units=metric&lang=ru"
+    )
+    response = requests.get(url, timeout=WEATHER_TIMEOUT)
+    response.raise_for_status()
+    res = response.json()
+
+    if not isinstance(res, dict):
+        raise ValueError("Некорректный ответ API")
+
+    return {
+        "available": True,
+        "temp": round(res.get("main", {}).get("temp", 0)),
+        "hum": int(res.get("main", {}).get("humidity", 0)),
+        "desc": res.get("weather", [{}])[0].get("description", "нет данных"),
+        "wind": float(res.get("wind", {}).get("speed", 0)),
+        "city": city,
+    }
+
+
+def load_weather_cache() -> dict:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = {}
+            try:
+                with open(WEATHER_CACHE_FILE, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    _cache = data
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Ошибка чтения {WEATHER_CACHE_FILE}: {e}")
+        return _cache
+
+
+def save_weather_cache():
+    cache = load_weather_cache()
+    with _cache_lock:
+        snapshot = dict(cache)
+    with _save_lock:
+        try:
+            with atomic_open(WEATHER_CACHE_FILE) as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"Ошибка сохранения {WEATHER_CACHE_FILE}: {e}")
+
+
+def cached_weather(key: str, max_age: float):
+    cache = load_weather_cache()
+    with _cache_lock:
+        entry = cache.get(key)
+    if not isinstance(entry, dict) or not isinstance(entry.get("weather"), dict):
+        return None
+    if time.time() - entry.get("fetched_at", 0) > max_age:
+        return None
+    return dict(entry["weather"])
+
+
+def resolve_city(city=None) -> str:
+    return (city or os.getenv("CITY_NAME", "Moscow")).strip() or "Moscow"
+
+
+def fallback_weather(city=None) -> dict:
+    city = resolve_city(city)
+    stale = cached_weather(normalize_city(city), WEATHER_STALE_MAX)
+    if stale is None:
+        return unavailable_weather(city)
+    print(f"Погода для {city}: используются сохранённые данные")
+    stale["stale"] = True
+    with _cache_lock:
+        _stats["stale"] += 1
+    return stale
+
+
+def get_weather(city=None, persist=True, call=None):
     api_key = os.getenv("OPENWEATHER_API_KEY", "").strip()
-    city = os.getenv("CITY_NAME", "Moscow").strip() or "Moscow"
+    city = resolve_city(city)
 
     if not api_key:
-        return {
-            "available": False,
-            "temp": None,
-            "hum": None,
-            "desc": "нет данных",
-            "wind": None,
-            "city": city,
-        }
+        return unavailable_weather(city)
+
+    key = normalize_city(city)
+    weather = cached_weather(key, WEATHER_CACHE_TTL)
+    if weather is not None:
+        with _cache_lock:
+            _stats["hits"] += 1
+        return weather
+
+    with _cache_lock:
+        slot = _inflight.get(key)
+        owner = slot is None
+        if owner:
+            slot = _inflight[key] = {"event": threading.Event(), "weather": None}
+            _stats["misses"] += 1
+        else:
+            _stats["hits"] += 1
 
+    if not owner:
+        slot["event"].wait()
+        return dict(slot["weather"] or unavailable_weather(city))
+
+    weather = unavailable_weather(city)
     try:
-        url = (
-            f"https://api.openweathermap.org/data/2.5/weather"
-            f"?q={city}&appid={api_key}&units=metric&lang=ru"
-        )
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        res = response.json()
-
-        if not isinstance(res, dict):
-            raise ValueError("Некорректный ответ API")
-
-        return {
-            "available": True,
-            "temp": round(res.get("main", {}).get("temp", 0)),
-            "hum": int(res.get("main", {}).get("humidity", 0)),
-            "desc": res.get("weather", [{}])[0].get("description", "нет данных"),
-            "wind": float(res.get("wind", {}).get("speed", 0)),
-            "city": city,
-        }
+        check_circuit(WEATHER_CIRCUIT)
+        call = call or CircuitCall(WEATHER_CIRCUIT)
+        try:
+            weather = fetch_weather(city, api_key)
+        except Exception:
+            call.settle(False)
+            raise
+        call.settle(True)
+        cache = load_weather_cache()
+        with _cache_lock:
+            cache[key] = {"weather": weather, "fetched_at": time.time()}
+        if persist:
+            save_weather_cache()
     except Exception as e:
         print(f"Ошибка погоды: {e}")
-        return {
-            "available": False,
-            "temp": None,
-            "hum": None,
-            "desc": "нет данных",
-            "wind": None,
-            "city": city,
-        }
+        weather = fallback_weather(city)
+    finally:
+        slot["weather"] = weather
+        with _cache_lock:
+            _inflight.pop(key, None)
+        slot["event"].set()
+    return dict(weather)
+
+
+def weather_cache_stats() -> dict:
+    with _cache_lock:
+        return dict(_stats)
+
+
+def prefetch_weather(cities, workers: int = 8) -> dict:
+    distinct = {}
+    for city in cities:
+        city = resolve_city(city)
+        distinct.setdefault(normalize_city(city), city)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        results = dict(zip(distinct, pool.map(lambda c: get_weather(c, persist=False), distinct.values())))
+
+    if results:
+        save_weather_cache()
+    return results
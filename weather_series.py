@@ -0,0 +1,208 @@
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+WEATHER_SERIES_DIR = os.getenv("WEATHER_SERIES_DIR", "weather_series")
+WEATHER_SERIES_CAPACITY = int(os.getenv("WEATHER_SERIES_CAPACITY", "1024"))
+WEATHER_SERIES_MIN_GAP = int(os.getenv("WEATHER_SERIES_MIN_GAP", "600"))
+WEATHER_SERIES_OPEN_MAX = int(os.getenv("WEATHER_SERIES_OPEN_MAX", "32"))
+TREND_WINDOW = 3 * 86400
+
+MAGIC = b"GWS1"
+HEADER = struct.Struct("<4sHHIII")
+RECORD = struct.Struct("<dfff")
+FIELDS = {"temp": 1, "hum": 2, "wind": 3}
+
+_series = OrderedDict()
+_series_lock = threading.Lock()
+
+
+def series_filename(city: str) -> str:
+    key = " ".join(str(city or "").split()).casefold()
+    return re.sub(r"[^\w-]+", "_", key) or "_"
+
+
+def to_float(value) -> float:
+    return float("nan") if value is None else float(value)
+
+
+class WeatherSeries:
+    def __init__(self, filepath: str, capacity: int = WEATHER_SERIES_CAPACITY):
+        self.filepath = filepath
+        self.capacity = capacity
+        self.count = 0
+        self.head = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        with self._lock:
+            self.open()
+
+    def open(self):
+        f = open(os.open(self.filepath, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                f.truncate(HEADER.size + self.capacity * RECORD.size)
+                f.write(HEADER.pack(MAGIC, 1, RECORD.size, self.capacity, 0, 0))
+                f.flush()
+            else:
+                magic, _, record_size, capacity, _, _ = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC or record_size != RECORD.size or size != HEADER.size + capacity * RECORD.size:
+                    raise ValueError(f"{self.filepath}: неизвестный формат ряда погоды")
+                self.capacity = capacity
+            self._map = mmap.mmap(f.fileno(), 0)
+        except Exception:
+            f.close()
+            raise
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        self._file = f
+
+    @contextmanager
+    def locked(self, exclusive: bool):
+        with self._lock:
+            if self._map is None:
+                self.open()
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                _, _, _, _, self.count, self.head = HEADER.unpack_from(self._map, 0)
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def offset(self, slot: int) -> int:
+        return HEADER.size + slot * RECORD.size
+
+    def append(self, ts: float, temp=None, hum=None, wind=None, min_gap: float = 0) -> bool:
+        with self.locked(True):
+            if min_gap and self.count:
+                last_ts = RECORD.unpack_from(self._map, self.offset((self.head - 1) % self.capacity))[0]
+                if ts - last_ts < min_gap:
+                    return False
+            RECORD.pack_into(self._map, self.offset(self.head), ts, to_float(temp), to_float(hum), to_float(wind))
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            HEADER.pack_into(self._map, 0, MAGIC, 1, RECORD.size, self.capacity, self.count, self.head)
+            self._map.flush()
+            return True
+
+    def last(self):
+        with self.locked(False):
+            if not self.count:
+                return None
+            return RECORD.unpack_from(self._map, self.offset((self.head - 1) % self.capacity))
+
+    def recent(self, seconds: float, now_ts: float) -> list:
+        since = now_ts - seconds
+        records = []
+        with self.locked(False):
+            for i in range(1, self.count + 1):
+                record = RECORD.unpack_from(self._map, self.offset((self.head - i) % self.capacity))
+                if record[0] < since:
+                    break
+                records.append(record)
+        records.reverse()
+        return records
+
+    def close(self):
+        with self._lock:
+            if self._map is None:
+                return
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+
+def get_series(city: str) -> WeatherSeries:
+    key = series_filename(city)
+    with _series_lock:
+        series = _series.get(key)
+        if series is not None:
+            _series.move_to_end(key)
+            return series
+        os.makedirs(WEATHER_SERIES_DIR, exist_ok=True)
+        series = _series[key] = WeatherSeries(os.path.join(WEATHER_SERIES_DIR, f"{key}.bin"))
+        while len(_series) > WEATHER_SERIES_OPEN_MAX:
+            _series.popitem(last=False)[1].close()
+        return series
+
+
+def field_values(records: list, field: str) -> list:
+    index = FIELDS[field]
+    return [record[index] for record in records if not math.isnan(record[index])]
+
+
+def window_mean(records: list, field: str):
+    values = field_values(records, field)
+    return sum(values) / len(values) if values else None
+
+
+def window_change(records: list, field: str):
+    values = field_values(records, field)
+    return values[-1] - values[0] if len(values) >= 2 else None
+
+
+def window_swing(records: list, field: str):
+    values = field_values(records, field)
+    return max(values) - min(values) if len(values) >= 2 else None
+
+
+def rounded(value):
+    return None if value is None else round(value, 1)
+
+
+def weather_trend(city: str, now_ts: float, seconds: float = TREND_WINDOW) -> dict:
+    records = get_series(city).recent(seconds, now_ts)
+    return {
+        "samples": len(records),
+        "temp_mean": rounded(window_mean(records, "temp")),
+        "temp_change": rounded(window_change(records, "temp")),
+        "temp_swing": rounded(window_swing(records, "temp")),
+        "hum_mean": rounded(window_mean(records, "hum")),
+        "wind_max": rounded(max(field_values(records, "wind"), default=None)),
+    }
+
+
+def record_observation(weather: dict, now_ts: float) -> bool:
+    if not weather.get("available") or weather.get("stale") or weather.get("temp") is None:
+        return False
+    return get_series(weather.get("city")).append(
+        now_ts, weather.get("temp"), weather.get("hum"), weather.get("wind"), WEATHER_SERIES_MIN_GAP
+    )
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) not in (2, 3) or argv[0] != "show":
+        print("Использование: python weather_series.py show ГОРОД [ДНЕЙ]")
+        sys.exit(2)
+
+    days = float(argv[2]) if len(argv) == 3 else TREND_WINDOW / 86400
+    now_ts = time.time()
+    for ts, temp, hum, wind in get_series(argv[1]).recent(days * 86400, now_ts):
+        at = datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M")
+        print(f"{at}  {temp:6.1f}°C  {hum:5.0f}%  {wind:5.1f} м/с")
+    print(weather_trend(argv[1], now_ts, days * 86400))
+
+
+if __name__ == "__main__":
+    main()